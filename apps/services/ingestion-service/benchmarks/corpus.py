@@ -0,0 +1,138 @@
+"""
+Benchmark-Korpus
+Synthetische Dokumente (Plain Text, HTML, PDF, DOCX) in vorgegebener Größe, reproduzierbar per Seed
+"""
+import io
+import zipfile
+from typing import Dict, Iterator, List, Tuple
+from xml.sax.saxutils import escape
+
+from benchmarks.pii_benchmark import generate_document
+
+FORMATS = ("txt", "html", "pdf", "docx")
+
+# Zeichen pro PDF-Zeile bzw. Zeilen pro Seite (Helvetica 10pt auf A4)
+PDF_LINE_CHARS = 90
+PDF_PAGE_LINES = 60
+
+
+def _paragraphs(text: str) -> List[str]:
+    return [paragraph.strip() for paragraph in text.split("\n\n") if paragraph.strip()]
+
+
+def to_html(text: str) -> bytes:
+    body = "".join(f"<p>{escape(paragraph)}</p>\n" for paragraph in _paragraphs(text))
+    return (
+        "<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>Benchmark</title>"
+        "<style>p { margin: 0 }</style></head><body>\n" + body + "</body></html>\n"
+    ).encode("utf-8")
+
+
+def _pdf_string(line: str) -> bytes:
+    line = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return b"(" + line.encode("cp1252", "replace") + b")"
+
+
+def to_pdf(text: str) -> bytes:
+    """Mehrseitiges PDF mit Textebene (Type1-Font, WinAnsi), ohne Abhängigkeiten"""
+    lines: List[str] = []
+    for paragraph in _paragraphs(text):
+        while paragraph:
+            cut = paragraph.rfind(" ", 0, PDF_LINE_CHARS) if len(paragraph) > PDF_LINE_CHARS else -1
+            cut = cut if cut > 0 else min(len(paragraph), PDF_LINE_CHARS)
+            lines.append(paragraph[:cut])
+            paragraph = paragraph[cut:].lstrip()
+        lines.append("")
+    pages = [lines[i:i + PDF_PAGE_LINES] for i in range(0, len(lines), PDF_PAGE_LINES)] or [[]]
+
+    # 1: Katalog, 2: Seitenbaum, 3: Font, danach je Seite Seitenobjekt + Inhalt
+    objects: List[bytes] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    kids = []
+    for page in pages:
+        stream = b"BT /F1 10 Tf 12 TL 50 800 Td\n" + b"".join(
+            _pdf_string(line) + b" Tj T*\n" for line in page
+        ) + b"ET"
+        page_id = len(objects) + 1
+        kids.append(b"%d 0 R" % page_id)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 3 0 R >> >> >>" % (page_id + 1)
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objects[1] = b"<< /Type /Pages /Kids [" + b" ".join(kids) + b"] /Count %d >>" % len(pages)
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    out.write(b"".join(b"%010d 00000 n \n" % offset for offset in offsets))
+    out.write(
+        b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    )
+    return out.getvalue()
+
+
+def to_docx(text: str) -> bytes:
+    """Minimales WordprocessingML-Dokument (ein Absatz pro Textabsatz)"""
+    body = "".join(
+        f"<w:p><w:r><w:t xml:space=\"preserve\">{escape(paragraph)}</w:t></w:r></w:p>"
+        for paragraph in _paragraphs(text)
+    )
+    document = (
+        "<?xml version=\"1.0\" encoding=\"UTF-8\" standalone=\"yes\"?>"
+        "<w:document xmlns:w=\"http://schemas.openxmlformats.org/wordprocessingml/2006/main\">"
+        f"<w:body>{body}</w:body></w:document>"
+    )
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(
+            "[Content_Types].xml",
+            "<?xml version=\"1.0\" encoding=\"UTF-8\"?>"
+            "<Types xmlns=\"http://schemas.openxmlformats.org/package/2006/content-types\">"
+            "<Default Extension=\"xml\" ContentType=\"application/xml\"/>"
+            "<Override PartName=\"/word/document.xml\" ContentType=\"application/"
+            "vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml\"/></Types>",
+        )
+        archive.writestr("word/document.xml", document)
+    return buffer.getvalue()
+
+
+CONVERTERS = {
+    "txt": lambda text: text.encode("utf-8"),
+    "html": to_html,
+    "pdf": to_pdf,
+    "docx": to_docx,
+}
+
+
+def generate_corpus(
+    count: int,
+    formats: List[str],
+    sizes: List[int],
+    run_id: str,
+    pii_density: float = 0.01,
+    seed: int = 42,
+) -> Iterator[Tuple[str, bytes]]:
+    """count Dokumente (Dateiname, Inhalt), reihum über Formate und Textgrößen (Bytes).
+
+    Der Text pro Größe wird einmal erzeugt; eine Kopfzeile mit run_id und laufender Nummer macht
+    jedes Dokument eindeutig, damit die Deduplizierung nichts überspringt.
+    """
+    texts: Dict[int, str] = {
+        size: generate_document(size, pii_density, seed=seed + index)
+        for index, size in enumerate(sizes)
+    }
+    variants = [(fmt, size) for size in sizes for fmt in formats]
+
+    for number in range(count):
+        fmt, size = variants[number % len(variants)]
+        text = f"Benchmark {run_id} Dokument {number}\n\n{texts[size]}"
+        yield f"bench_{number:06d}_{size // 1024}k.{fmt}", CONVERTERS[fmt](text)
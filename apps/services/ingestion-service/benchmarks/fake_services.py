@@ -0,0 +1,208 @@
+"""
+Stand-ins für Benchmarks
+LLM-Gateway und RAG-Service (aiohttp) mit einstellbarer Latenz und Fehlerrate, optional Redis
+(fakeredis als TCP-Server); alles in einem eigenen Prozess, damit der Service allein misst
+
+Eigenständig (aus dem Service-Verzeichnis):
+    python -m benchmarks.fake_services --port 8800 --gateway-latency 0.05 --error-rate 0.01
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import socket
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from aiohttp import web
+
+
+class FakeServices:
+    """/v1/embeddings, /vectors/upsert und /vectors/delete auf einem Port; GET /stats zählt mit.
+
+    Latenzen in Sekunden (gateway_item_latency zusätzlich pro Input), error_rate 0..1 pro Request.
+    """
+
+    def __init__(
+        self,
+        dimensions: int = 1536,
+        gateway_latency: float = 0.05,
+        gateway_item_latency: float = 0.0005,
+        rag_latency: float = 0.02,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        seed: int = 42,
+    ):
+        self.gateway_latency = gateway_latency
+        self.gateway_item_latency = gateway_item_latency
+        self.rag_latency = rag_latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rng = random.Random(seed)
+        # Ein fester Vektor für alle Inputs: die Antwort soll nicht an der JSON-Kodierung hängen
+        self.vector = json.dumps([0.0123] * dimensions).encode()
+        self.stats: Dict[str, int] = {
+            "embedding_requests": 0,
+            "embedding_inputs": 0,
+            "upsert_requests": 0,
+            "upsert_bytes": 0,
+            "delete_requests": 0,
+            "errors": 0,
+        }
+
+    def _fail(self) -> bool:
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.stats["errors"] += 1
+            return True
+        return False
+
+    async def embeddings(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        inputs = body.get("input") or []
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        self.stats["embedding_requests"] += 1
+
+        await asyncio.sleep(self.gateway_latency + self.gateway_item_latency * len(inputs))
+        if self._fail():
+            return web.Response(status=self.error_status)
+
+        self.stats["embedding_inputs"] += len(inputs)
+        items = b",".join(
+            b'{"index":%d,"embedding":%s}' % (index, self.vector) for index in range(len(inputs))
+        )
+        return web.Response(body=b'{"data":[' + items + b"]}", content_type="application/json")
+
+    async def upsert(self, request: web.Request) -> web.Response:
+        # aiohttp entpackt Content-Encoding: gzip selbst
+        body = await request.read()
+        self.stats["upsert_requests"] += 1
+        await asyncio.sleep(self.rag_latency)
+        if self._fail():
+            return web.Response(status=self.error_status)
+
+        self.stats["upsert_bytes"] += len(body)
+        return web.json_response({"success": True})
+
+    async def delete(self, request: web.Request) -> web.Response:
+        await request.read()
+        self.stats["delete_requests"] += 1
+        await asyncio.sleep(self.rag_latency)
+        if self._fail():
+            return web.Response(status=self.error_status)
+        return web.json_response({"success": True})
+
+    async def get_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats)
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=1024 ** 3)
+        app.router.add_post("/v1/embeddings", self.embeddings)
+        app.router.add_post("/vectors/upsert", self.upsert)
+        app.router.add_post("/vectors/delete", self.delete)
+        app.router.add_get("/stats", self.get_stats)
+        return app
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_memory_redis(port: int) -> Any:
+    """Redis-kompatiblen Server (fakeredis inkl. Lua) im Hintergrund-Thread starten"""
+    try:
+        from fakeredis import TcpFakeServer
+    except ImportError:
+        raise RuntimeError("In-memory Redis requires fakeredis[lua] (pip install 'fakeredis[lua]')")
+
+    server = TcpFakeServer(("127.0.0.1", port), server_type="redis")
+    threading.Thread(target=server.serve_forever, name="fake-redis", daemon=True).start()
+
+    # Der TCP-Server von fakeredis schließt die Verbindung bei jeder Fehlerantwort, auch bei
+    # NOSCRIPT; daher alle Queue-Skripte vorab laden, damit EVALSHA direkt trifft
+    import redis
+
+    from src.queue import scripts
+
+    client = redis.Redis(host="127.0.0.1", port=port)
+    for name in dir(scripts):
+        script = getattr(scripts, name)
+        if name.isupper() and not name.startswith("_") and isinstance(script, str):
+            client.script_load(script)
+    client.close()
+    return server
+
+
+async def _serve(options: Dict[str, Any], port: int, ready: Optional[Any] = None):
+    runner = web.AppRunner(FakeServices(**options).app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    if ready is not None:
+        ready.set()
+    await asyncio.Event().wait()
+
+
+def _run(options: Dict[str, Any], port: int, redis_port: int, ready: Any):
+    if redis_port:
+        start_memory_redis(redis_port)
+    asyncio.run(_serve(options, port, ready))
+
+
+def start_stand_ins(
+    options: Dict[str, Any], memory_redis: bool = False
+) -> Tuple[multiprocessing.Process, str, Optional[str]]:
+    """Stand-in-Prozess starten: (Prozess, Basis-URL der Services, Redis-URL bzw. None).
+
+    options sind die Parameter von FakeServices.
+    """
+    port = free_port()
+    redis_port = free_port() if memory_redis else 0
+    context = multiprocessing.get_context("spawn")
+    ready = context.Event()
+    process = context.Process(
+        target=_run,
+        args=(options, port, redis_port, ready),
+        name="benchmark-stand-ins",
+        daemon=True,
+    )
+    process.start()
+    if not ready.wait(30):
+        process.kill()
+        raise RuntimeError("Benchmark stand-ins did not start")
+
+    redis_url = f"redis://127.0.0.1:{redis_port}" if redis_port else None
+    return process, f"http://127.0.0.1:{port}", redis_url
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--redis-port", type=int, default=0, help="zusätzlich In-Memory-Redis")
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--gateway-latency", type=float, default=0.05)
+    parser.add_argument("--gateway-item-latency", type=float, default=0.0005)
+    parser.add_argument("--rag-latency", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    options = {
+        "dimensions": args.dimensions,
+        "gateway_latency": args.gateway_latency,
+        "gateway_item_latency": args.gateway_item_latency,
+        "rag_latency": args.rag_latency,
+        "error_rate": args.error_rate,
+        "seed": args.seed,
+    }
+    if args.redis_port:
+        start_memory_redis(args.redis_port)
+        print(f"Redis: redis://127.0.0.1:{args.redis_port}")
+    print(f"LLM_GATEWAY_URL=RAG_SERVICE_URL=http://127.0.0.1:{args.port}")
+    asyncio.run(_serve(options, args.port))
+
+
+if __name__ == "__main__":
+    main()
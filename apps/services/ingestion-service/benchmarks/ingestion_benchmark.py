@@ -0,0 +1,470 @@
+"""
+Ingestion-Benchmark
+Dokumente/s, MB/s, Latenz (p50/p99) und Peak-RSS für Upload, File-Watcher und Worker-Verarbeitung,
+gegen lokale Stand-ins für LLM-Gateway, RAG-Service und Redis
+
+Aufruf (aus dem Service-Verzeichnis):
+    python -m benchmarks.ingestion_benchmark --docs 200
+    python -m benchmarks.ingestion_benchmark --mode upload --formats pdf,docx --sizes 64,512
+    python -m benchmarks.ingestion_benchmark --error-rate 0.02 --gateway-latency 0.2
+    python -m benchmarks.ingestion_benchmark --redis-url redis://localhost:6379 --json results.json
+    python -m benchmarks.ingestion_benchmark --queue-backend memory --mode process
+    python -m benchmarks.ingestion_benchmark --compare results.json --tolerance 0.1
+
+Latenz: upload = Request bis completed, watcher = Datei geschrieben bis completed (inkl.
+WATCHER_DEBOUNCE), process = Dequeue bis completed (alle Jobs vorab eingereiht).
+Ohne --redis-url läuft Redis als fakeredis-Server im Stand-in-Prozess (erfordert fakeredis[lua]);
+mit --queue-backend memory entfällt Redis.
+"""
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.corpus import FORMATS, generate_corpus
+from benchmarks.fake_services import free_port, start_stand_ins
+
+MODES = ("upload", "watcher", "process")
+FINAL_STATUSES = ("completed", "failed")
+
+Corpus = List[Tuple[str, bytes]]
+
+
+class RssSampler:
+    """Peak-RSS des Benchmark-Prozesses inkl. Kindprozesse (Extraktions-Pool), periodisch gemessen"""
+
+    def __init__(self, exclude: Tuple[int, ...] = (), interval: float = 0.1):
+        self.exclude = set(exclude)
+        self.interval = interval
+        self.peak = 0
+        self._task: Optional[asyncio.Task] = None
+        self._page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+    def _rss(self, pid: int) -> int:
+        try:
+            with open(f"/proc/{pid}/statm") as f:
+                return int(f.read().split()[1]) * self._page_size
+        except (OSError, ValueError, IndexError):
+            return 0
+
+    def sample(self) -> int:
+        if not os.path.exists("/proc/self/statm"):
+            # Ohne /proc: Höchstwert seit Prozessstart (Linux KB, macOS Bytes)
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return peak if sys.platform == "darwin" else peak * 1024
+
+        total = self._rss(os.getpid())
+        for child in multiprocessing.active_children():
+            if child.pid not in self.exclude:
+                total += self._rss(child.pid)
+        return total
+
+    async def _run(self):
+        while True:
+            self.peak = max(self.peak, self.sample())
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self.peak = 0
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> int:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.peak = max(self.peak, self.sample())
+        return self.peak
+
+
+def _epoch(value: Optional[str]) -> Optional[float]:
+    """ISO-Zeitstempel der Status-API (UTC) als Epoch-Sekunden"""
+    if not value:
+        return None
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+async def wait_for_documents(
+    fetch: Callable[[List[str]], Awaitable[Dict[str, Optional[Dict[str, Any]]]]],
+    document_ids: List[str],
+    timeout: float,
+    interval: float = 0.25,
+) -> Dict[str, Dict[str, Any]]:
+    """Status abfragen (in Gruppen zu 500), bis alle Dokumente completed bzw. failed sind"""
+    deadline = time.monotonic() + timeout
+    finished: Dict[str, Dict[str, Any]] = {}
+
+    while True:
+        pending = [document_id for document_id in document_ids if document_id not in finished]
+        for start in range(0, len(pending), 500):
+            statuses = await fetch(pending[start:start + 500])
+            for document_id, status in statuses.items():
+                if status and status.get("status") in FINAL_STATUSES:
+                    finished[document_id] = status
+
+        if len(finished) == len(document_ids):
+            return finished
+        if time.monotonic() > deadline:
+            print(f"  Timeout: {len(document_ids) - len(finished)} Dokumente nicht fertig")
+            return finished
+        await asyncio.sleep(interval)
+
+
+def summarize(
+    mode: str,
+    submitted: Dict[str, Tuple[float, int]],
+    finished: Dict[str, Dict[str, Any]],
+    started: float,
+    peak_rss: int,
+    latency_from: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Kennzahlen eines Laufs; latency_from = Status-Feld als Startpunkt statt Einreichzeit"""
+    completed = {
+        document_id: status
+        for document_id, status in finished.items()
+        if status.get("status") == "completed"
+    }
+    end = max(
+        (_epoch(status.get("completed_at") or status.get("updated_at")) or started
+         for status in finished.values()),
+        default=started,
+    )
+    seconds = max(end - started, 1e-6)
+    completed_bytes = sum(submitted[document_id][1] for document_id in completed)
+
+    latencies = []
+    for document_id, status in completed.items():
+        begin = _epoch(status.get(latency_from)) if latency_from else submitted[document_id][0]
+        latencies.append(_epoch(status["completed_at"]) - begin)
+
+    return {
+        "mode": mode,
+        "documents": len(submitted),
+        "completed": len(completed),
+        "failed": len(finished) - len(completed),
+        "unfinished": len(submitted) - len(finished),
+        "bytes": completed_bytes,
+        "seconds": round(seconds, 3),
+        "docs_per_s": round(len(completed) / seconds, 2),
+        "mb_per_s": round(completed_bytes / seconds / (1024 * 1024), 3),
+        "p50": _percentile(latencies, 0.5),
+        "p99": _percentile(latencies, 0.99),
+        "peak_rss_mb": round(peak_rss / (1024 * 1024), 1),
+    }
+
+
+class ServiceUnderTest:
+    """FastAPI-App mit Lifespan (Worker-Pool, File-Watcher) per uvicorn im Benchmark-Prozess"""
+
+    async def __aenter__(self) -> str:
+        import uvicorn
+
+        import main
+
+        port = free_port()
+        self.server = uvicorn.Server(
+            uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning")
+        )
+        self.task = asyncio.create_task(self.server.serve())
+        while not self.server.started:
+            if self.task.done():
+                self.task.result()
+            await asyncio.sleep(0.05)
+        return f"http://127.0.0.1:{port}"
+
+    async def __aexit__(self, *exc):
+        self.server.should_exit = True
+        await self.task
+
+
+def _status_fetcher(session, base_url: str):
+    async def fetch(document_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        async with session.post(
+            f"{base_url}/status/batch", json={"document_ids": document_ids}
+        ) as response:
+            response.raise_for_status()
+            return (await response.json())["statuses"]
+    return fetch
+
+
+async def run_upload(corpus: Corpus, args, sampler: RssSampler) -> Dict[str, Any]:
+    """POST /upload mit --concurrency parallelen Requests"""
+    import aiohttp
+
+    knowledge_space_id = f"bench_{uuid.uuid4().hex[:8]}"
+    submitted: Dict[str, Tuple[float, int]] = {}
+    slots = asyncio.Semaphore(args.concurrency)
+
+    async with ServiceUnderTest() as base_url, aiohttp.ClientSession() as session:
+        async def upload(filename: str, content: bytes):
+            async with slots:
+                form = aiohttp.FormData()
+                form.add_field("file", content, filename=filename)
+                sent = time.time()
+                async with session.post(
+                    f"{base_url}/upload",
+                    params={"knowledge_space_id": knowledge_space_id},
+                    data=form,
+                ) as response:
+                    response.raise_for_status()
+                    document_id = (await response.json())["document_id"]
+                submitted[document_id] = (sent, len(content))
+
+        sampler.start()
+        started = time.time()
+        await asyncio.gather(*(upload(filename, content) for filename, content in corpus))
+        finished = await wait_for_documents(
+            _status_fetcher(session, base_url), list(submitted), args.timeout
+        )
+        peak = await sampler.stop()
+
+    return summarize("upload", submitted, finished, started, peak)
+
+
+async def run_watcher(corpus: Corpus, args, sampler: RssSampler) -> Dict[str, Any]:
+    """Dateien in ein überwachtes Verzeichnis schreiben (POST /watch/start)"""
+    import aiohttp
+
+    from src.processing.dedup import document_id_for
+
+    directory = Path(tempfile.mkdtemp(prefix="ingestion-bench-watch-")).resolve()
+    submitted: Dict[str, Tuple[float, int]] = {}
+
+    def write(filename: str, content: bytes):
+        path = directory / filename
+        path.write_bytes(content)
+        submitted[document_id_for(str(path))] = (time.time(), len(content))
+
+    async with ServiceUnderTest() as base_url, aiohttp.ClientSession() as session:
+        async with session.post(f"{base_url}/watch/start", params={"path": str(directory)}) as response:
+            response.raise_for_status()
+
+        sampler.start()
+        started = time.time()
+        for filename, content in corpus:
+            await asyncio.to_thread(write, filename, content)
+        finished = await wait_for_documents(
+            _status_fetcher(session, base_url), list(submitted), args.timeout
+        )
+        peak = await sampler.stop()
+
+        async with session.post(f"{base_url}/watch/stop", params={"path": str(directory)}):
+            pass
+    shutil.rmtree(directory, ignore_errors=True)
+
+    return summarize("watcher", submitted, finished, started, peak)
+
+
+async def run_process(corpus: Corpus, args, sampler: RssSampler) -> Dict[str, Any]:
+    """Alle Jobs vorab einreihen, dann Worker-Pool (process_job) ohne API starten"""
+    from src.config import get_settings
+    from src.processing.processor import DocumentProcessor
+    from src.processing.workers import WorkerPool
+    from src.queue.queue_manager import create_queue_manager
+
+    settings = get_settings()
+    queue_manager = create_queue_manager(settings)
+    processor = DocumentProcessor(queue_manager)
+    knowledge_space_id = f"bench_{uuid.uuid4().hex[:8]}"
+    submitted: Dict[str, Tuple[float, int]] = {}
+
+    for start in range(0, len(corpus), 500):
+        entries = []
+        for filename, content in corpus[start:start + 500]:
+            entries.append((filename, await processor.spool.write_bytes(content), None))
+        results = await processor.enqueue_blobs(entries, knowledge_space_id)
+        for (filename, content), result in zip(corpus[start:start + 500], results):
+            if result["status"] == "queued":
+                submitted[result["document_id"]] = (time.time(), len(content))
+
+    pool = WorkerPool(
+        queue_manager,
+        processor,
+        workers=settings.ingestion_workers,
+        knowledge_space_concurrency=settings.knowledge_space_concurrency,
+        reaper_interval=settings.queue_reaper_interval,
+        name="benchmark",
+    )
+    try:
+        sampler.start()
+        started = time.time()
+        await pool.start()
+        finished = await wait_for_documents(
+            queue_manager.get_document_statuses, list(submitted), args.timeout
+        )
+        peak = await sampler.stop()
+    finally:
+        await pool.stop(drain=False)
+        await processor.close()
+        await queue_manager.close()
+
+    return summarize("process", submitted, finished, started, peak, latency_from="started_at")
+
+
+RUNNERS = {"upload": run_upload, "watcher": run_watcher, "process": run_process}
+
+
+def _seconds(value: Optional[float]) -> str:
+    return f"{value:8.3f}" if value is not None else f"{'-':>8}"
+
+
+def print_results(results: List[Dict[str, Any]]):
+    print(
+        f"{'Modus':<8} {'Dok.':>6} {'fertig':>7} {'Fehler':>7} {'Dok./s':>8} {'MB/s':>8} "
+        f"{'p50 s':>8} {'p99 s':>8} {'Peak RSS':>10}"
+    )
+    for result in results:
+        print(
+            f"{result['mode']:<8} {result['documents']:>6} {result['completed']:>7} "
+            f"{result['failed'] + result['unfinished']:>7} {result['docs_per_s']:>8.2f} "
+            f"{result['mb_per_s']:>8.3f} {_seconds(result['p50'])} {_seconds(result['p99'])} "
+            f"{result['peak_rss_mb']:>7.1f} MB"
+        )
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, tolerance: float) -> bool:
+    """Gegen eine frühere --json-Ausgabe vergleichen; False bei Regression über tolerance"""
+    with open(baseline_path) as f:
+        baseline = {result["mode"]: result for result in json.load(f)["results"]}
+
+    ok = True
+    print(f"\nVergleich mit {baseline_path} (Toleranz {tolerance:.0%}):")
+    for result in results:
+        before = baseline.get(result["mode"])
+        if not before:
+            continue
+        # (Kennzahl, höher ist besser)
+        for key, higher_is_better in (("docs_per_s", True), ("p99", False), ("peak_rss_mb", False)):
+            old, new = before.get(key), result.get(key)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            regressed = change < -tolerance if higher_is_better else change > tolerance
+            ok = ok and not regressed
+            marker = "REGRESSION" if regressed else ""
+            print(f"  {result['mode']:<8} {key:<12} {old:>10.3f} -> {new:>10.3f} {change:+8.1%} {marker}")
+    return ok
+
+
+def _list(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+async def run(args, corpus: Corpus, stand_ins_pid: int) -> List[Dict[str, Any]]:
+    sampler = RssSampler(exclude=(stand_ins_pid,))
+    results = []
+    for mode in args.mode or MODES:
+        print(f"{mode}: {len(corpus)} Dokumente ...")
+        results.append(await RUNNERS[mode](corpus, args, sampler))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mode", action="append", choices=MODES, help="mehrfach möglich, Standard: alle")
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--formats", default=",".join(FORMATS))
+    parser.add_argument("--sizes", default="4,64,512", help="Textgrößen in KB (reihum)")
+    parser.add_argument("--pii-density", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--concurrency", type=int, default=16, help="parallele Uploads")
+    parser.add_argument("--workers", type=int, default=4, help="INGESTION_WORKERS")
+    parser.add_argument("--redis-url", default=None, help="Standard: In-Memory-Redis (fakeredis)")
+    parser.add_argument(
+        "--queue-backend", choices=("redis", "redis-streams", "memory"), default="redis"
+    )
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--gateway-latency", type=float, default=0.05)
+    parser.add_argument("--gateway-item-latency", type=float, default=0.0005)
+    parser.add_argument("--rag-latency", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Anteil 503-Antworten")
+    parser.add_argument("--timeout", type=float, default=600.0, help="Sekunden pro Modus")
+    parser.add_argument("--json", default=None, help="Ergebnisse als JSON speichern")
+    parser.add_argument("--compare", default=None, help="frühere --json-Ausgabe als Baseline")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    formats = _list(args.formats)
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        parser.error(f"unbekannte Formate: {', '.join(sorted(unknown))}")
+    sizes = [int(float(size) * 1024) for size in _list(args.sizes)]
+
+    options = {
+        "dimensions": args.dimensions,
+        "gateway_latency": args.gateway_latency,
+        "gateway_item_latency": args.gateway_item_latency,
+        "rag_latency": args.rag_latency,
+        "error_rate": args.error_rate,
+        "seed": args.seed,
+    }
+    use_redis = args.queue_backend != "memory"
+    stand_ins, services_url, memory_redis_url = start_stand_ins(
+        options, memory_redis=use_redis and not args.redis_url
+    )
+
+    # Vor dem ersten Import von src.config setzen (Einstellungen werden gecacht)
+    work_dir = tempfile.mkdtemp(prefix="ingestion-bench-")
+    os.environ.update(
+        LLM_GATEWAY_URL=services_url,
+        RAG_SERVICE_URL=services_url,
+        INGESTION_WORKERS=str(args.workers),
+        QUEUE_BACKEND=args.queue_backend,
+    )
+    if use_redis:
+        os.environ["REDIS_URL"] = args.redis_url or memory_redis_url
+    if memory_redis_url:
+        # fakeredis kennt kein INFO (Redis-Speicher der Admission Control)
+        os.environ.setdefault("ADMISSION_REDIS_MEMORY_RATIO", "0")
+    os.environ.setdefault("SPOOL_DIR", os.path.join(work_dir, "spool"))
+    os.environ.setdefault("EMBEDDING_CACHE_BACKEND", "none")
+    os.environ.setdefault("WATCH_REGISTRY_PATH", "")
+
+    run_id = uuid.uuid4().hex[:8]
+    corpus = list(generate_corpus(args.docs, formats, sizes, run_id, args.pii_density, args.seed))
+    total = sum(len(content) for _, content in corpus)
+    print(
+        f"Korpus: {len(corpus)} Dokumente, {total / (1024 * 1024):.1f} MB ({', '.join(formats)}; "
+        f"Text {args.sizes} KB), Worker: {args.workers}, "
+        f"Queue: {args.queue_backend} ({args.redis_url or 'in-memory'})"
+    )
+
+    try:
+        results = asyncio.run(run(args, corpus, stand_ins.pid))
+    finally:
+        stand_ins.kill()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print()
+    print_results(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"arguments": vars(args), "results": results}, f, indent=2)
+    if args.compare and not compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Job-Codec-Benchmark
+Größe, Redis-Speicher und Kodier-/Dekodier-Kosten von Queue-Einträgen: JSON (v1) gegen v2-Formate
+
+Aufruf (aus dem Service-Verzeichnis):
+    python -m benchmarks.job_codec_benchmark --jobs 20000
+    python -m benchmarks.job_codec_benchmark --content-kb 64 --redis-url redis://localhost:6379
+"""
+import argparse
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.pii_benchmark import generate_document
+from src.queue.codec import JobCodec
+
+CODECS: Dict[str, Callable[[], JobCodec]] = {
+    "json (v1, bisher)": lambda: JobCodec(encoding="json-v1"),
+    "v2 json": lambda: JobCodec(encoding="json", compression="none"),
+    "v2 msgpack": lambda: JobCodec(encoding="msgpack", compression="none"),
+    "v2 msgpack+zstd": lambda: JobCodec(encoding="msgpack", compression="zstd"),
+    "v2 msgpack+zlib": lambda: JobCodec(encoding="msgpack", compression="zlib"),
+}
+
+
+def generate_jobs(count: int, content_bytes: int) -> List[Dict[str, Any]]:
+    """Jobs wie von enqueue_many erzeugt; content_bytes > 0 = Inhalt im Job (früheres Format)"""
+    content = generate_document(content_bytes, 0.0) if content_bytes else None
+    created_at = datetime.now(timezone.utc).isoformat()
+    jobs = []
+    for i in range(count):
+        data: Dict[str, Any] = {
+            "document_id": f"doc_{uuid.uuid4().hex[:16]}",
+            "filename": f"Bescheid_{i:06d}.pdf",
+            "content_hash": uuid.uuid4().hex * 2,
+            "knowledge_space_id": f"ks_{i % 10}",
+        }
+        if content is not None:
+            data["content"] = content
+        else:
+            data["blob"] = {
+                "path": f"./data/spool/{data['content_hash'][:2]}/{data['content_hash']}",
+                "size": 48213,
+                "sha256": data["content_hash"],
+            }
+        jobs.append({
+            "id": str(uuid.uuid4()),
+            "data": data,
+            "priority": "bulk",
+            "attempts": 0,
+            "created_at": created_at,
+        })
+    return jobs
+
+
+def redis_memory(client, raws: List[bytes]) -> int:
+    """Speicherbedarf der Einträge als Liste in Redis (MEMORY USAGE, alle Elemente gezählt)"""
+    key = f"benchmark:job_codec:{uuid.uuid4().hex}"
+    try:
+        for start in range(0, len(raws), 1000):
+            client.rpush(key, *raws[start:start + 1000])
+        return client.memory_usage(key, samples=0)
+    finally:
+        client.delete(key)
+
+
+def measure(name: str, codec: JobCodec, jobs: List[Dict[str, Any]], client: Optional[Any]):
+    started = time.perf_counter()
+    raws = [codec.encode(job) for job in jobs]
+    encode = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for raw in raws:
+        codec.decode(raw)
+    decode = time.perf_counter() - started
+
+    # Retry-Pfad: attempts/last_error ändern (v1: ganzer Eintrag neu kodiert, v2: nur Header)
+    started = time.perf_counter()
+    for raw in raws:
+        codec.replace_fields(raw, {"attempts": 1, "last_error": "timeout"})
+    retry = time.perf_counter() - started
+
+    size = sum(len(raw) for raw in raws) / len(raws)
+    line = (
+        f"{name:<20} {size:10.0f} B {encode / len(jobs) * 1e6:9.2f} µs "
+        f"{decode / len(jobs) * 1e6:9.2f} µs {retry / len(jobs) * 1e6:9.2f} µs"
+    )
+    if client is not None:
+        line += f" {redis_memory(client, raws) / len(raws):10.0f} B"
+    print(line)
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=20000)
+    parser.add_argument(
+        "--content-kb", type=float, default=0.0,
+        help="Dokumentinhalt im Job (0 = nur Blob-Referenz wie aktuell)",
+    )
+    parser.add_argument("--redis-url", default=None, help="zusätzlich MEMORY USAGE messen")
+    args = parser.parse_args()
+
+    client = None
+    if args.redis_url:
+        import redis
+
+        client = redis.Redis.from_url(args.redis_url)
+
+    jobs = generate_jobs(args.jobs, int(args.content_kb * 1024))
+    print(f"{args.jobs} Jobs, Inhalt im Job: {args.content_kb} KB")
+    header = f"{'Format':<20} {'Eintrag':>12} {'encode':>12} {'decode':>12} {'retry':>12}"
+    if client is not None:
+        header += f" {'Redis':>12}"
+    print(header)
+
+    baseline = None
+    for name, factory in CODECS.items():
+        size = measure(name, factory(), jobs, client)
+        baseline = baseline or size
+        if size != baseline:
+            print(f"{'':<20} {size / baseline:11.0%} der JSON-Größe")
+
+
+if __name__ == "__main__":
+    main()
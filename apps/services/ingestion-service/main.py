@@ -2,43 +2,102 @@
 Ingestion Service (FastAPI)
 Watcher, Queue, Status-Tracking für Dokument-Ingestion
 """
-from fastapi import FastAPI, HTTPException, UploadFile, File
+import json
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, File, HTTPException, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, List
-import uvicorn
-from contextlib import asynccontextmanager
 
-from src.watcher.file_watcher import FileWatcher
-from src.queue.queue_manager import QueueManager
+from src.config import get_settings
+from src.observability.metrics import QUEUE_DEPTH, QUEUE_JOBS, EventLoopMonitor, render_metrics
+from src.observability.tracing import setup_tracing, shutdown_tracing
 from src.processing.processor import DocumentProcessor
+from src.processing.workers import WorkerPool, WorkerProcessManager
+from src.queue.admission import AdmissionController, AdmissionRejectedError
+from src.queue.queue_manager import (
+    PRIORITY_BULK,
+    PRIORITY_CLASSES,
+    PRIORITY_INTERACTIVE,
+    QueueManager,
+    UnsupportedOperationError,
+    create_queue_manager,
+)
+from src.queue.status_events import StatusEventBroker
+from src.storage.archives import ArchiveLimitError
+from src.storage.blob_spool import BlobTooLargeError
+from src.watcher.file_watcher import FileWatcher
+
+logger = logging.getLogger(__name__)
 
 # Global services
 file_watcher: Optional[FileWatcher] = None
 queue_manager: Optional[QueueManager] = None
+status_events: Optional[StatusEventBroker] = None
+admission: Optional[AdmissionController] = None
 processor: Optional[DocumentProcessor] = None
+worker_pool: Optional[WorkerPool] = None
+worker_processes: Optional[WorkerProcessManager] = None
+loop_monitor: Optional[EventLoopMonitor] = None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown"""
-    global file_watcher, queue_manager, processor
+    global file_watcher, queue_manager, status_events, processor, worker_pool, worker_processes
+    global loop_monitor, admission
+
+    settings = get_settings()
 
     # Startup
-    queue_manager = QueueManager()
+    setup_tracing(settings)
+    loop_monitor = EventLoopMonitor(settings.metrics_loop_lag_interval)
+    loop_monitor.start()
+    queue_manager = create_queue_manager(settings)
+    status_events = StatusEventBroker(queue_manager, buffer_size=settings.status_stream_buffer)
     processor = DocumentProcessor(queue_manager)
+    admission = AdmissionController(queue_manager, settings, limiter=processor.embedding_limiter)
     file_watcher = FileWatcher(processor)
-
-    # Start watcher
+    worker_pool = WorkerPool(
+        queue_manager,
+        processor,
+        workers=settings.ingestion_workers,
+        drain_timeout=settings.worker_drain_timeout,
+        reaper_interval=settings.queue_reaper_interval,
+    )
+    worker_processes = WorkerProcessManager(
+        settings.ingestion_worker_processes,
+        workers=settings.ingestion_workers,
+        drain_timeout=settings.worker_drain_timeout,
+    )
+
+    # Start watcher and workers
     file_watcher.start()
+    await worker_pool.start()
+    worker_processes.start()
 
     yield
 
-    # Shutdown
+    # Shutdown: erst keine neuen Dateien mehr annehmen, dann laufende Jobs abschließen
     if file_watcher:
         file_watcher.stop()
+    if worker_pool:
+        await worker_pool.stop(drain=True)
+    if worker_processes:
+        await worker_processes.stop()
+    if status_events:
+        await status_events.close()
+    if processor:
+        await processor.close()
     if queue_manager:
         await queue_manager.close()
+    if loop_monitor:
+        await loop_monitor.stop()
+    shutdown_tracing()
 
 
 app = FastAPI(
@@ -64,11 +123,64 @@ class UploadResponse(BaseModel):
     message: str
 
 
+class BulkUploadResponse(BaseModel):
+    batch_id: str
+    queued: int
+    skipped: int
+    rejected: int
+    documents: List[Dict[str, Any]]
+
+
 class StatusResponse(BaseModel):
     document_id: str
     status: str
     progress: Optional[float] = None
     error: Optional[str] = None
+    job_id: Optional[str] = None
+    filename: Optional[str] = None
+    priority: Optional[str] = None
+    attempts: Optional[int] = None
+    created_at: Optional[str] = None
+    started_at: Optional[str] = None
+    updated_at: Optional[str] = None
+    completed_at: Optional[str] = None
+
+
+class StatusBatchRequest(BaseModel):
+    document_ids: List[str]
+
+
+class KnowledgeSpaceLimits(BaseModel):
+    weight: Optional[float] = None
+    rate_limit: Optional[float] = None
+
+
+def _parse_document_ids(document_ids: Optional[str]) -> List[str]:
+    """Kommagetrennte Dokument-IDs (Reihenfolge erhalten, ohne Duplikate)"""
+    ids = list(dict.fromkeys(i.strip() for i in (document_ids or "").split(",") if i.strip()))
+    if len(ids) > get_settings().status_batch_max_ids:
+        raise HTTPException(status_code=400, detail="Too many document IDs")
+    return ids
+
+
+def _too_many_requests(e: AdmissionRejectedError) -> HTTPException:
+    return HTTPException(
+        status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)}
+    )
+
+
+async def _admit(knowledge_space_id: Optional[str], count: int = 1):
+    """Admission Control vor dem Einreihen; bei Überlast 429 mit Retry-After"""
+    if not admission:
+        return
+    try:
+        await admission.check(knowledge_space_id, count)
+    except AdmissionRejectedError as e:
+        raise _too_many_requests(e)
+
+
+def _sse(event: Dict[str, Any]) -> str:
+    return f"event: status\ndata: {json.dumps(event)}\n\n"
 
 
 @app.get("/health")
@@ -80,20 +192,33 @@ async def health():
 async def upload_document(
     file: UploadFile = File(...),
     knowledge_space_id: Optional[str] = None,
+    priority: str = PRIORITY_INTERACTIVE,
+    source: Optional[str] = None,
+    document_id: Optional[str] = None,
 ):
-    """Dokument hochladen und zur Verarbeitung in Queue einreihen"""
+    """Dokument hochladen und zur Verarbeitung in Queue einreihen.
+
+    Mit source (z.B. Pfad im Quellsystem) bzw. document_id ersetzt ein erneuter Upload das
+    Dokument inkrementell; ohne beides ist die Dokument-ID an den Inhalt gebunden.
+    """
     if not processor:
         raise HTTPException(status_code=503, detail="Processor not initialized")
+    if priority not in PRIORITY_CLASSES:
+        raise HTTPException(status_code=400, detail=f"Unknown priority class: {priority}")
+    await _admit(knowledge_space_id)
 
     try:
-        # Datei lesen
-        content = await file.read()
+        # Datei blockweise in den Spool streamen (gehasht, nicht komplett im Speicher)
+        blob = await processor.spool.write_upload(file)
 
-        # Zur Verarbeitung einreihen
-        document_id = await processor.enqueue_document(
+        # Zur Verarbeitung einreihen (nur Referenz auf den Blob)
+        document_id = await processor.enqueue_blob(
             file.filename or "unknown",
-            content,
+            blob,
             knowledge_space_id,
+            source=source,
+            priority=priority,
+            document_id=document_id,
         )
 
         return UploadResponse(
@@ -101,10 +226,97 @@ async def upload_document(
             status="queued",
             message="Document queued for processing",
         )
+    except BlobTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/upload/bulk", response_model=BulkUploadResponse)
+async def upload_bulk(
+    files: List[UploadFile] = File(...),
+    knowledge_space_id: Optional[str] = None,
+    priority: str = PRIORITY_BULK,
+):
+    """Mehrere Dateien bzw. ZIP-/TAR-Archive hochladen und als Batch einreihen.
+
+    Admission Control zählt Dokumente, nicht Uploads: Archive werden gruppenweise beim
+    Entpacken zugelassen.
+    """
+    if not processor:
+        raise HTTPException(status_code=503, detail="Processor not initialized")
+    if priority not in PRIORITY_CLASSES:
+        raise HTTPException(status_code=400, detail=f"Unknown priority class: {priority}")
+
+    try:
+        result = await processor.ingest_bulk(files, knowledge_space_id, priority, admission)
+        return BulkUploadResponse(**result)
+    except AdmissionRejectedError as e:
+        raise _too_many_requests(e)
+    except ArchiveLimitError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/batches/{batch_id}")
+async def get_batch(batch_id: str):
+    """Aggregierten Fortschritt eines Bulk-Uploads abrufen"""
+    if not queue_manager:
+        raise HTTPException(status_code=503, detail="Queue manager not initialized")
+
+    batch = await queue_manager.get_batch(batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    return batch
+
+
+@app.post("/status/batch")
+async def get_status_batch(body: StatusBatchRequest):
+    """Status mehrerer Dokumente in einem Aufruf abrufen (unbekannte IDs: null)"""
+    if not processor:
+        raise HTTPException(status_code=503, detail="Processor not initialized")
+
+    document_ids = list(dict.fromkeys(body.document_ids))
+    if len(document_ids) > get_settings().status_batch_max_ids:
+        raise HTTPException(status_code=400, detail="Too many document IDs")
+
+    statuses = await processor.get_statuses(document_ids)
+    return {
+        "statuses": statuses,
+        "found": sum(1 for status in statuses.values() if status),
+    }
+
+
+@app.get("/status/stream")
+async def stream_status(request: Request, document_ids: Optional[str] = None):
+    """Status-Änderungen als Server-Sent Events (kommagetrennte IDs, ohne IDs: alle Dokumente)"""
+    if not processor or not status_events:
+        raise HTTPException(status_code=503, detail="Processor not initialized")
+
+    ids = _parse_document_ids(document_ids)
+    heartbeat = get_settings().status_stream_heartbeat
+
+    async def events():
+        # Erst abonnieren, dann den aktuellen Stand senden, damit kein Wechsel verloren geht
+        async with status_events.subscribe(ids) as subscription:
+            if ids:
+                for status in (await processor.get_statuses(ids)).values():
+                    if status:
+                        yield _sse(status)
+
+            while not await request.is_disconnected():
+                event = await subscription.get(timeout=heartbeat)
+                yield _sse(event) if event else ": keep-alive\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.get("/status/{document_id}", response_model=StatusResponse)
 async def get_status(document_id: str):
     """Status eines Dokuments abrufen"""
@@ -126,9 +338,119 @@ async def get_queue_stats():
         raise HTTPException(status_code=503, detail="Queue manager not initialized")
 
     stats = await queue_manager.get_stats()
+    if admission:
+        stats["admission"] = admission.stats()
     return stats
 
 
+@app.get("/queue/knowledge-spaces")
+async def get_knowledge_space_stats():
+    """Wartende Jobs, Fair-Share-Zustand und Limits pro Knowledge Space"""
+    if not queue_manager:
+        raise HTTPException(status_code=503, detail="Queue manager not initialized")
+
+    spaces = await queue_manager.get_knowledge_space_stats()
+    return {"knowledge_spaces": spaces, "count": len(spaces)}
+
+
+@app.put("/queue/knowledge-spaces/{knowledge_space_id}")
+async def set_knowledge_space_limits(knowledge_space_id: str, limits: KnowledgeSpaceLimits):
+    """Gewicht und Rate-Limit (Jobs/Sekunde, 0 = unbegrenzt) eines Knowledge Space setzen"""
+    if not queue_manager:
+        raise HTTPException(status_code=503, detail="Queue manager not initialized")
+    if (limits.weight is not None and limits.weight <= 0) or (
+        limits.rate_limit is not None and limits.rate_limit < 0
+    ):
+        raise HTTPException(status_code=400, detail="Invalid weight or rate limit")
+
+    try:
+        await queue_manager.set_knowledge_space_limits(
+            knowledge_space_id, weight=limits.weight, rate_limit=limits.rate_limit
+        )
+    except UnsupportedOperationError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    return {"knowledge_space_id": knowledge_space_id, **limits.model_dump(exclude_none=True)}
+
+
+@app.get("/workers/stats")
+async def get_worker_stats():
+    """Worker-Statistiken abrufen"""
+    if not worker_pool or not worker_processes:
+        raise HTTPException(status_code=503, detail="Worker pool not initialized")
+
+    return {
+        "pool": worker_pool.stats(),
+        "processes": worker_processes.stats(),
+        "extraction": processor.extraction.stats() if processor else None,
+    }
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus-Metriken (Stages, Downstream-Requests, Queue, Worker, Event Loop)"""
+    if queue_manager:
+        # Queue-Bestand beim Scrape aus den inkrementellen Zählern lesen
+        try:
+            stats = await queue_manager.get_stats()
+            for priority, entry in stats["classes"].items():
+                QUEUE_DEPTH.labels(priority).set(entry["depth"])
+            for state in ("in_flight", "delayed", "dead_letters"):
+                QUEUE_JOBS.labels(state).set(stats[state])
+        except Exception as e:
+            logger.warning(f"Failed to read queue stats for metrics: {e}")
+
+    body, content_type = render_metrics()
+    # Content-Type unverändert übernehmen (media_type würde ein zweites charset anhängen)
+    return Response(content=body, headers={"Content-Type": content_type})
+
+
+@app.get("/embeddings/cache/stats")
+async def get_embedding_cache_stats():
+    """Trefferquoten des Embedding-Caches abrufen"""
+    if not processor:
+        raise HTTPException(status_code=503, detail="Processor not initialized")
+
+    if not processor.embedding_cache:
+        return {"enabled": False}
+
+    return {"enabled": True, **processor.embedding_cache.stats()}
+
+
+@app.get("/http/stats")
+async def get_http_stats():
+    """Verbindungswiederverwendung, Circuit Breaker und adaptive Parallelität der Downstream-Clients"""
+    if not processor:
+        raise HTTPException(status_code=503, detail="Processor not initialized")
+
+    stats = processor.http.stats()
+    if processor.embedding_limiter:
+        stats["llm-gateway"]["concurrency"] = processor.embedding_limiter.stats()
+    return stats
+
+
+@app.get("/queue/dead-letter")
+async def get_dead_letters(limit: int = 50):
+    """Jobs der Dead-Letter-Liste abrufen"""
+    if not queue_manager:
+        raise HTTPException(status_code=503, detail="Queue manager not initialized")
+
+    jobs = await queue_manager.list_dead_letters(limit)
+    return {"jobs": jobs, "count": len(jobs)}
+
+
+@app.post("/queue/dead-letter/requeue")
+async def requeue_dead_letters(job_id: Optional[str] = None):
+    """Dead-Letter-Jobs erneut einreihen (alle oder einen bestimmten)"""
+    if not queue_manager:
+        raise HTTPException(status_code=503, detail="Queue manager not initialized")
+
+    requeued = await queue_manager.requeue_dead_letters(job_id)
+    if job_id and not requeued:
+        raise HTTPException(status_code=404, detail="Job not found in dead-letter list")
+
+    return {"requeued": requeued, "count": len(requeued)}
+
+
 @app.post("/watch/start")
 async def start_watching(path: str):
     """File-Watcher für einen Pfad starten"""
@@ -139,6 +461,15 @@ async def start_watching(path: str):
     return {"message": f"Watching started for path: {path}"}
 
 
+@app.get("/watch/stats")
+async def get_watch_stats():
+    """Überwachte Pfade, Events und übersprungene (unveränderte) Dateien"""
+    if not file_watcher:
+        raise HTTPException(status_code=503, detail="File watcher not initialized")
+
+    return file_watcher.stats()
+
+
 @app.post("/watch/stop")
 async def stop_watching(path: str):
     """File-Watcher für einen Pfad stoppen"""
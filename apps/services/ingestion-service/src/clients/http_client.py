@@ -0,0 +1,329 @@
+"""
+HTTP Clients
+Geteilte Keep-Alive-Sessions pro Downstream-Service mit Limits, Timeouts und Circuit Breaker
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+import aiohttp
+
+from src.observability.metrics import HTTP_CONCURRENCY_LIMIT, HTTP_DURATION, HTTP_REQUESTS
+from src.observability.tracing import inject_context, span
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Circuit Breaker ist offen, Request wird nicht gesendet"""
+
+
+class CircuitBreaker:
+    """Öffnet nach aufeinanderfolgenden Fehlern und lässt nach Ablauf einen Probe-Request durch"""
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+
+    def before_request(self):
+        """Prüfen, ob ein Request gesendet werden darf"""
+        if self.state == "closed":
+            return
+
+        now = time.monotonic()
+        if (
+            (self.state == "open" and now - self.opened_at >= self.reset_timeout)
+            # Probe ohne Ergebnis (z.B. verlorener Task): nach reset_timeout neu proben
+            or (self.state == "half_open" and now - self.probe_started >= self.reset_timeout)
+        ):
+            # Ein Probe-Request; weitere Requests bleiben bis zu dessen Ergebnis gesperrt
+            self.state = "half_open"
+            self.probe_started = now
+            logger.info(f"Circuit {self.name} half-open, probing")
+            return
+
+        self.rejected += 1
+        raise CircuitOpenError(f"Circuit {self.name} is open")
+
+    def record_success(self):
+        if self.state != "closed":
+            logger.info(f"Circuit {self.name} closed")
+        self.state = "closed"
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.times_opened += 1
+                logger.warning(f"Circuit {self.name} opened after {self.failures} failure(s)")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def abandon_probe(self):
+        """Request ohne Ergebnis (abgebrochen): offen lassen, der nächste Request probt erneut"""
+        if self.state == "half_open":
+            self.state = "open"
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+        }
+
+
+class AdaptiveLimiter:
+    """Obergrenze paralleler Requests nach AIMD: wird die Grenze ausgeschöpft und antwortet der
+    Service zügig, steigt sie um 1 pro Fenster; bei Überlast (429/503, Timeouts, Latenz über dem
+    Ziel) halbiert sie sich, höchstens einmal pro Round-Trip
+    """
+
+    # Multiplikativer Rückgang bei Überlast und Glättung der Latenz (EWMA)
+    BACKOFF = 0.5
+    SMOOTHING = 0.2
+
+    def __init__(self, name: str, maximum: int, minimum: int = 1, latency_target: float = 0.0):
+        self.name = name
+        self.maximum = max(1, maximum)
+        self.minimum = min(max(1, minimum), self.maximum)
+        self.latency_target = latency_target
+        # Start an der statischen Obergrenze: ohne Überlast verhält sich der Limiter wie bisher
+        self.limit = float(self.maximum)
+        self.in_flight = 0
+        self.latency: Optional[float] = None
+        self.decreases = 0
+        self._decreased_at = 0.0
+        self._waiters: Deque[asyncio.Future] = deque()
+        HTTP_CONCURRENCY_LIMIT.labels(name).set(self.maximum)
+
+    async def acquire(self):
+        """Auf einen freien Slot warten (FIFO)"""
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Slot wurde schon zugeteilt: weitergeben
+                self.in_flight -= 1
+                self._wake()
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self, latency: Optional[float] = None, overloaded: bool = False):
+        """Slot freigeben; latency (Sekunden) nur bei erfolgreichen Requests, sonst None"""
+        saturated = self.in_flight >= int(self.limit)
+        self.in_flight -= 1
+
+        if latency is not None:
+            self.latency = (
+                latency if self.latency is None
+                else self.latency + self.SMOOTHING * (latency - self.latency)
+            )
+        if overloaded or (self.latency_target and latency and self.latency > self.latency_target):
+            self._decrease()
+        elif latency is not None and saturated:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            HTTP_CONCURRENCY_LIMIT.labels(self.name).set(int(self.limit))
+
+        self._wake()
+
+    def _decrease(self):
+        now = time.monotonic()
+        if self.limit <= self.minimum or now - self._decreased_at < (self.latency or 1.0):
+            return
+        self._decreased_at = now
+        self.limit = max(self.minimum, self.limit * self.BACKOFF)
+        self.decreases += 1
+        HTTP_CONCURRENCY_LIMIT.labels(self.name).set(int(self.limit))
+        logger.info(f"Concurrency limit for {self.name} reduced to {int(self.limit)}")
+
+    def _wake(self):
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": int(self.limit),
+            "minimum": self.minimum,
+            "maximum": self.maximum,
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "latency_seconds": round(self.latency, 4) if self.latency is not None else None,
+            "decreases": self.decreases,
+        }
+
+
+class ServiceClient:
+    """Keep-Alive-Session für einen Downstream-Service (Basis-URL) inkl. Verbindungsmetriken"""
+
+    def __init__(
+        self,
+        name: str,
+        base_url: str,
+        pool_size: int = 32,
+        keepalive_timeout: float = 30.0,
+        connect_timeout: float = 5.0,
+        request_timeout: float = 60.0,
+        dns_cache_ttl: int = 300,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = pool_size
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = aiohttp.ClientTimeout(total=request_timeout, connect=connect_timeout)
+        self.dns_cache_ttl = dns_cache_ttl
+        self.breaker = breaker or CircuitBreaker(name)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.metrics = {
+            "requests": 0,
+            "errors": 0,
+            "connections_created": 0,
+            "connections_reused": 0,
+            "pool_waits": 0,
+        }
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        def count(metric: str):
+            async def handler(session, context, params):
+                self.metrics[metric] += 1
+            return handler
+
+        trace_config.on_request_start.append(count("requests"))
+        trace_config.on_request_exception.append(count("errors"))
+        trace_config.on_connection_create_end.append(count("connections_created"))
+        trace_config.on_connection_reuseconn.append(count("connections_reused"))
+        trace_config.on_connection_queued_start.append(count("pool_waits"))
+        return trace_config
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Session lazy im laufenden Event Loop erzeugen"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                limit_per_host=self.pool_size,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_cache_ttl,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+                trace_configs=[self._trace_config()],
+            )
+        return self._session
+
+    @asynccontextmanager
+    async def request(self, method: str, path: str, **kwargs) -> AsyncIterator[aiohttp.ClientResponse]:
+        """Request über den Circuit Breaker; 5xx, Timeouts und Verbindungsfehler zählen als Fehler"""
+        try:
+            self.breaker.before_request()
+        except CircuitOpenError:
+            HTTP_REQUESTS.labels(self.name, path, "circuit_open").inc()
+            raise
+
+        kwargs["headers"] = inject_context(dict(kwargs.get("headers") or {}))
+        outcome = "error"
+        status: Optional[int] = None
+        failed = False
+        started = time.perf_counter()
+        try:
+            attributes = {"http.method": method, "http.route": path, "peer.service": self.name}
+            with span(f"{self.name} {method} {path}", **attributes):
+                async with self.session.request(method, f"{self.base_url}{path}", **kwargs) as response:
+                    status = response.status
+                    if status >= 500:
+                        outcome = "server_error"
+                    else:
+                        outcome = "client_error" if status >= 400 else "ok"
+                    yield response
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            # Auch beim Lesen der Antwort im with-Block des Aufrufers
+            failed = True
+            raise
+        finally:
+            # Genau ein Ergebnis pro Request, erst nach dem with-Block des Aufrufers
+            if failed or (status is not None and status >= 500):
+                self.breaker.record_failure()
+            elif status is not None:
+                self.breaker.record_success()
+            else:
+                # Abgebrochen (CancelledError) bzw. Fehler vor der Antwort: eine laufende Probe
+                # darf den Breaker nicht dauerhaft halb offen lassen
+                self.breaker.abandon_probe()
+            # Dauer inkl. Lesen der Antwort im with-Block des Aufrufers
+            HTTP_DURATION.labels(self.name, path).observe(time.perf_counter() - started)
+            HTTP_REQUESTS.labels(self.name, path, outcome).inc()
+
+    def post(self, path: str, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        connections = self.metrics["connections_created"] + self.metrics["connections_reused"]
+        return {
+            "base_url": self.base_url,
+            **self.metrics,
+            "reuse_rate": (
+                round(self.metrics["connections_reused"] / connections, 4) if connections else None
+            ),
+            "circuit": self.breaker.stats(),
+        }
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class HttpClients:
+    """Clients für LLM-Gateway und RAG-Service"""
+
+    def __init__(self, settings):
+        def create(name: str, base_url: str) -> ServiceClient:
+            return ServiceClient(
+                name,
+                base_url,
+                pool_size=settings.http_pool_size,
+                keepalive_timeout=settings.http_keepalive_timeout,
+                connect_timeout=settings.http_connect_timeout,
+                request_timeout=settings.http_request_timeout,
+                dns_cache_ttl=settings.http_dns_cache_ttl,
+                breaker=CircuitBreaker(
+                    name,
+                    failure_threshold=settings.circuit_failure_threshold,
+                    reset_timeout=settings.circuit_reset_timeout,
+                ),
+            )
+
+        self.gateway = create("llm-gateway", settings.llm_gateway_url)
+        self.rag = create("rag-service", settings.rag_service_url)
+
+    def stats(self) -> Dict[str, Any]:
+        return {client.name: client.stats() for client in (self.gateway, self.rag)}
+
+    async def close(self):
+        await self.gateway.close()
+        await self.rag.close()
@@ -0,0 +1,147 @@
+"""
+Service-Konfiguration
+Zentrale Einstellungen des Ingestion-Service (aus Umgebungsvariablen)
+"""
+from functools import lru_cache
+
+from pydantic_settings import BaseSettings
+
+
+class Settings(BaseSettings):
+    """Einstellungen, einmalig beim Start aus der Umgebung gelesen"""
+
+    # Downstream-Services
+    llm_gateway_url: str = "http://localhost:3002"
+    rag_service_url: str = "http://localhost:3005"
+
+    # HTTP-Clients (pro Downstream-Service)
+    http_pool_size: int = 32
+    http_keepalive_timeout: float = 30.0
+    http_connect_timeout: float = 5.0
+    http_request_timeout: float = 60.0
+    http_dns_cache_ttl: int = 300
+    circuit_failure_threshold: int = 5
+    circuit_reset_timeout: float = 30.0
+
+    # Redis / Queue
+    # redis (Listen mit Fair Share) | redis-streams (Consumer Group) | memory (im Prozess)
+    queue_backend: str = "redis"
+    redis_url: str = "redis://localhost:6379"
+    redis_pool_size: int = 20
+    redis_blocking_pool_size: int = 0
+    queue_dequeue_timeout: float = 1.0
+    queue_visibility_timeout: float = 300.0
+    queue_max_retries: int = 3
+    queue_retry_backoff: float = 5.0
+    queue_retry_backoff_max: float = 600.0
+    queue_reaper_interval: float = 15.0
+    # Scheduling: jeder n-te Dequeue bedient zuerst Bulk-Jobs (0 = strikte Priorität)
+    queue_bulk_every: int = 10
+    queue_scan_limit: int = 32
+    # Fair Share und Rate-Limit pro Knowledge Space (Defaults, per API überschreibbar)
+    knowledge_space_default_weight: float = 1.0
+    knowledge_space_rate_limit: float = 0.0
+    knowledge_space_rate_burst: int = 10
+    # Format der Queue-Einträge: msgpack | json | json-v1 (nur für Rolling Upgrades alter Worker)
+    queue_job_encoding: str = "msgpack"
+    queue_job_compression: str = "zstd"  # zstd | zlib | none
+    queue_job_compression_threshold: int = 1024  # Payload-Bytes
+    # Fortschritts-Updates höchstens so oft (Sekunden) gebündelt nach Redis schreiben
+    status_flush_interval: float = 0.5
+
+    # Admission Control für Uploads (429 mit Retry-After; 0 = Grenze aus)
+    admission_max_queued: int = 0  # wartende Jobs insgesamt
+    admission_max_wait: float = 0.0  # geschätzte Wartezeit in Sekunden (Tiefe / Durchsatz)
+    admission_space_max_queued: int = 0  # wartende Jobs pro Knowledge Space
+    admission_redis_memory_ratio: float = 0.9  # Anteil von maxmemory (ohne maxmemory: aus)
+    admission_gateway_latency_max: float = 0.0  # Sekunden pro Embedding-Request (geglättet)
+    admission_refresh_interval: float = 1.0  # Sekunden zwischen Messungen von Queue und Redis
+
+    # Status-API
+    status_batch_max_ids: int = 1000
+    status_stream_buffer: int = 100
+    status_stream_heartbeat: float = 15.0
+
+    # Embeddings
+    embedding_model: str = "text-embedding-3-small"
+    embedding_batch_size: int = 64
+    embedding_batch_tokens: int = 8000
+    embedding_concurrency: int = 4
+    # Adaptive Obergrenze paralleler Embedding-Requests pro Prozess (AIMD)
+    embedding_adaptive_concurrency: bool = True
+    embedding_concurrency_max: int = 0  # 0 = INGESTION_WORKERS × EMBEDDING_CONCURRENCY
+    embedding_concurrency_min: int = 1
+    embedding_latency_target: float = 0.0  # Sekunden pro Request (geglättet), 0 = nur 429/503/Timeouts
+    embedding_max_retries: int = 3
+    embedding_retry_backoff: float = 0.5
+    # Standard disk: der Cache wächst mit jedem neuen Text und gehört nicht in die Queue-Redis
+    # (deren Speicher die Admission Control begrenzt)
+    embedding_cache_backend: str = "disk"  # disk | redis | memory | none
+    embedding_cache_redis_url: str = ""  # eigene Redis-Instanz für backend=redis, leer = REDIS_URL
+    embedding_cache_memory_mb: int = 64
+    embedding_cache_dir: str = "./data/embedding-cache"
+    embedding_cache_disk_mb: int = 1024  # Obergrenze des Disk-Caches, 0 = unbegrenzt
+    embedding_cache_ttl: int = 30 * 86400
+
+    # Chunking
+    # sentence: Chunk-Grenzen an Sätzen/Absätzen bleiben nach Änderungen stabil (fixed verschiebt
+    # alle folgenden Fenster, sodass fast alle Chunks neu eingebettet werden)
+    chunk_strategy: str = "sentence"  # sentence | fixed | token
+    chunk_size: int = 1000  # Zeichen (fixed/sentence) bzw. Tokens (token)
+    chunk_overlap: int = 200
+    chunk_batch_size: int = 256
+    pipeline_queue_size: int = 2  # Batches Vorlauf zwischen den Stages
+
+    # Vector-Upserts (RAG-Service)
+    vector_upsert_batch_bytes: int = 4 * 1024 * 1024  # unkomprimiert
+    vector_upsert_batch_size: int = 256
+    vector_upsert_concurrency: int = 4
+    vector_upsert_max_retries: int = 3
+    vector_upsert_retry_backoff: float = 0.5
+    vector_upsert_encoding: str = "json"  # json | float32
+    vector_upsert_compression: str = "gzip"  # gzip | none
+
+    # PII-Redaction (kommagetrennt, leer = deaktiviert)
+    pii_detectors: str = "email,phone,iban,tax_id,address"
+
+    # Upload / Spool
+    spool_dir: str = "./data/spool"
+    spool_chunk_size: int = 1024 * 1024
+    upload_max_bytes: int = 0
+
+    # Bulk-Upload (mehrere Dateien bzw. ZIP-/TAR-Archive)
+    bulk_max_files: int = 100000  # pro Archiv, 0 = unbegrenzt
+    bulk_max_bytes: int = 0  # entpackte Größe pro Archiv, 0 = unbegrenzt
+    bulk_enqueue_batch_size: int = 500  # Dokumente pro Redis-Pipeline
+
+    # Text-Extraktion (PDF, DOCX, HTML im Prozess-Pool)
+    extraction_processes: int = 0  # 0 = Anzahl CPU-Kerne
+    extraction_timeout: float = 120.0  # Sekunden pro Dokument, 0 = unbegrenzt
+    extraction_memory_limit: int = 2 * 1024 * 1024 * 1024  # Adressraum pro Prozess, 0 = unbegrenzt
+    extraction_max_tasks_per_child: int = 100  # Prozess danach ersetzen, 0 = nie
+
+    # File-Watcher
+    watcher_debounce: float = 1.0  # Ruhefenster pro Datei in Sekunden
+    watcher_concurrency: int = 8
+    watcher_ignore_patterns: str = ".*,*~,*.tmp,*.part,*.swp,*.crdownload"
+    watch_registry_path: str = "./data/watch-registry.sqlite"  # leer = nicht persistieren
+    watch_registry_flush_interval: float = 2.0
+
+    # Worker
+    ingestion_workers: int = 4
+    ingestion_worker_processes: int = 0
+    knowledge_space_concurrency: int = 0
+    worker_drain_timeout: float = 30.0
+
+    # Monitoring (Prometheus-Metriken, OpenTelemetry-Tracing)
+    metrics_loop_lag_interval: float = 0.5  # Sekunden, 0 = Event-Loop-Lag nicht messen
+    worker_metrics_port: int = 0  # /metrics eigenständiger Worker, 0 = aus
+    otel_enabled: bool = False
+    otel_exporter_type: str = "console"  # console | otlp | zipkin
+    otel_service_name: str = "ingestion-service"
+
+
+@lru_cache
+def get_settings() -> Settings:
+    """Einstellungen laden (gecacht)"""
+    return Settings()
@@ -0,0 +1,189 @@
+"""
+Metriken
+Prometheus-Metriken der Ingestion-Pipeline: Stages, Downstream-Requests, Queue, Worker und Event Loop
+"""
+import asyncio
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+from src.observability.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Mit PROMETHEUS_MULTIPROC_DIR schreiben alle Prozesse (API, Worker-Prozesse) in gemeinsame
+# Dateien; /metrics aggregiert sie. Gauges brauchen dafür einen Aggregationsmodus.
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+BYTES_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8, 1e9)
+CHUNK_BUCKETS = (1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 50000)
+WAIT_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 1800, 3600, 14400, 86400)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+# Stages (pro Dokument)
+STAGE_DURATION = Histogram(
+    "ingestion_stage_duration_seconds",
+    "Aktive Zeit pro Dokument und Stage",
+    ["stage"],
+    buckets=DURATION_BUCKETS,
+)
+STAGE_BYTES = Histogram(
+    "ingestion_stage_bytes",
+    "Eingangsgröße pro Dokument und Stage in Bytes",
+    ["stage"],
+    buckets=BYTES_BUCKETS,
+)
+STAGE_CHUNKS = Histogram(
+    "ingestion_stage_chunks",
+    "Verarbeitete Chunks pro Dokument und Stage",
+    ["stage"],
+    buckets=CHUNK_BUCKETS,
+)
+JOB_DURATION = Histogram(
+    "ingestion_job_duration_seconds",
+    "Laufzeit eines Jobs vom Dequeue bis Ack/Nack",
+    ["outcome"],
+    buckets=DURATION_BUCKETS,
+)
+JOBS = Counter("ingestion_jobs_total", "Verarbeitete Jobs nach Ergebnis", ["outcome"])
+
+# Downstream-Services (LLM-Gateway, RAG-Service)
+HTTP_DURATION = Histogram(
+    "ingestion_http_request_duration_seconds",
+    "Dauer der Requests an Downstream-Services (inkl. Lesen der Antwort)",
+    ["service", "path"],
+    buckets=DURATION_BUCKETS,
+)
+HTTP_REQUESTS = Counter(
+    "ingestion_http_requests_total",
+    "Requests an Downstream-Services nach Ergebnis "
+    "(ok, client_error, server_error, error, circuit_open)",
+    ["service", "path", "outcome"],
+)
+
+HTTP_CONCURRENCY_LIMIT = Gauge(
+    "ingestion_http_concurrency_limit",
+    "Adaptive Obergrenze paralleler Requests an einen Downstream-Service (AIMD)",
+    ["service"],
+    multiprocess_mode="livesum",
+)
+
+# Queue
+QUEUE_WAIT = Histogram(
+    "ingestion_queue_wait_seconds",
+    "Wartezeit vom Enqueue bis zum ersten Dequeue",
+    ["priority"],
+    buckets=WAIT_BUCKETS,
+)
+QUEUE_DEPTH = Gauge(
+    "ingestion_queue_depth",
+    "Wartende Jobs pro Prioritätsklasse (beim Scrape gelesen)",
+    ["priority"],
+    multiprocess_mode="mostrecent",
+)
+QUEUE_JOBS = Gauge(
+    "ingestion_queue_jobs",
+    "Jobs in Bearbeitung, im Retry-Backoff bzw. in der Dead-Letter-Liste (beim Scrape gelesen)",
+    ["state"],
+    multiprocess_mode="mostrecent",
+)
+ADMISSION_REJECTED = Counter(
+    "ingestion_admission_rejected_total",
+    "Mit 429 abgewiesene Uploads nach Grund",
+    ["reason"],
+)
+
+# Worker
+WORKERS = Gauge("ingestion_workers", "Gestartete Worker", multiprocess_mode="livesum")
+WORKERS_BUSY = Gauge(
+    "ingestion_workers_busy", "Worker mit laufendem Job", multiprocess_mode="livesum"
+)
+WORKER_BUSY_SECONDS = Counter(
+    "ingestion_worker_busy_seconds",
+    "Summe der Zeit, in der Worker einen Job bearbeitet haben (Auslastung = rate / Worker)",
+)
+
+# Event Loop
+LOOP_LAG = Histogram(
+    "ingestion_event_loop_lag_seconds",
+    "Verzögerung geplanter Callbacks im Event Loop",
+    buckets=LAG_BUCKETS,
+)
+
+
+def observe_stage(
+    stage: str, seconds: float, size: Optional[int] = None, chunks: Optional[int] = None
+):
+    """Dauer und optional Größe bzw. Chunk-Anzahl einer Stage für ein Dokument erfassen"""
+    STAGE_DURATION.labels(stage).observe(seconds)
+    if size is not None:
+        STAGE_BYTES.labels(stage).observe(size)
+    if chunks is not None:
+        STAGE_CHUNKS.labels(stage).observe(chunks)
+
+
+@contextmanager
+def timed_stage(
+    stage: str, size: Optional[int] = None, chunks: Optional[int] = None, **attributes: Any
+) -> Iterator[Optional[Any]]:
+    """Stage als Span ausführen und bei Erfolg Dauer, Größe und Chunks erfassen"""
+    started = time.perf_counter()
+    with span(f"ingestion.{stage}", **attributes) as current:
+        yield current
+    observe_stage(stage, time.perf_counter() - started, size=size, chunks=chunks)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """(Body, Content-Type) für /metrics; im Multiprozess-Modus über alle Prozesse aggregiert"""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int):
+    """Live-Gauges eines beendeten Worker-Prozesses verwerfen"""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(pid)
+
+
+class EventLoopMonitor:
+    """Misst periodisch, wie spät ein Sleep im Event Loop zurückkehrt (blockierender Code)"""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            LOOP_LAG.observe(max(0.0, time.monotonic() - started - self.interval))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
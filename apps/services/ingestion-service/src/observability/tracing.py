@@ -0,0 +1,106 @@
+"""
+Tracing
+Optionale OpenTelemetry-Spans pro Job und Stage (OTEL_ENABLED); ohne Pakete bzw. deaktiviert no-op
+"""
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+try:
+    from opentelemetry import propagate, trace
+except ImportError:
+    propagate = None
+    trace = None
+
+logger = logging.getLogger(__name__)
+
+_tracer = None
+_provider = None
+
+
+def _create_exporter(exporter_type: str):
+    """Exporter wie im Shared-Package: otlp, zipkin oder console (Endpunkt aus OTEL_EXPORTER_*)"""
+    if exporter_type == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        return OTLPSpanExporter()
+    if exporter_type == "zipkin":
+        from opentelemetry.exporter.zipkin.json import ZipkinExporter
+
+        return ZipkinExporter()
+
+    from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+    return ConsoleSpanExporter()
+
+
+def setup_tracing(settings):
+    """Tracer-Provider einmal pro Prozess einrichten (API und jeder Worker-Prozess)"""
+    global _tracer, _provider
+
+    if not settings.otel_enabled or _tracer is not None:
+        return
+    if trace is None:
+        logger.warning("OpenTelemetry not installed, tracing disabled")
+        return
+
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+    except ImportError:
+        logger.warning("opentelemetry-sdk not installed, tracing disabled")
+        return
+
+    try:
+        exporter = _create_exporter(settings.otel_exporter_type)
+    except ImportError as e:
+        logger.warning(
+            f"Failed to initialize {settings.otel_exporter_type} exporter, "
+            f"falling back to console: {e}"
+        )
+        exporter = ConsoleSpanExporter()
+
+    resource = Resource.create({"service.name": settings.otel_service_name})
+    _provider = TracerProvider(resource=resource)
+    _provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(_provider)
+    _tracer = trace.get_tracer("ingestion-service")
+    logger.info(f"OpenTelemetry tracing enabled ({type(exporter).__name__})")
+
+
+def shutdown_tracing():
+    """Ausstehende Spans exportieren"""
+    global _tracer, _provider
+
+    if _provider is not None:
+        _provider.shutdown()
+    _tracer = None
+    _provider = None
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Any]]:
+    """Span als aktuellen Kontext öffnen (auch um await herum); Exceptions werden erfasst"""
+    if _tracer is None:
+        yield None
+        return
+
+    attributes = {key: value for key, value in attributes.items() if value is not None}
+    with _tracer.start_as_current_span(name, attributes=attributes) as current:
+        yield current
+
+
+def mark_error(current: Optional[Any], description: str):
+    """Span als fehlgeschlagen markieren (Fehler, die nicht als Exception durchlaufen)"""
+    if current is not None:
+        from opentelemetry.trace import Status, StatusCode
+
+        current.set_status(Status(StatusCode.ERROR, description))
+
+
+def inject_context(headers: Dict[str, str]) -> Dict[str, str]:
+    """Trace-Kontext (traceparent) in ausgehende Request-Header schreiben"""
+    if _tracer is not None:
+        propagate.inject(headers)
+    return headers
@@ -0,0 +1,234 @@
+"""
+Chunking
+Streamende Chunker (fixed, sentence, token) über Offsets in den Quelltext
+"""
+import logging
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Type
+
+from src.processing.dedup import chunk_hash
+from src.processing.embedder import CHARS_PER_TOKEN
+
+logger = logging.getLogger(__name__)
+
+# Satzende (., !, ?, …) gefolgt von Leerraum bzw. Absatzgrenze
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?…])\s+|\n\s*\n")
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+WORD = re.compile(r"\S+")
+
+
+class Chunk:
+    """Chunk als Offset-Bereich im Quelltext; der Inhalt wird erst bei Bedarf ausgeschnitten"""
+
+    __slots__ = ("id", "document_id", "source", "start", "end", "index", "metadata", "text")
+
+    def __init__(
+        self,
+        chunk_id: str,
+        document_id: str,
+        source: str,
+        start: int,
+        end: int,
+        index: int,
+        metadata: Dict[str, Any],
+    ):
+        self.id = chunk_id
+        self.document_id = document_id
+        self.source = source
+        self.start = start
+        self.end = end
+        self.index = index
+        # Geteilt zwischen allen Chunks eines Chunkers, nicht kopiert
+        self.metadata = metadata
+        # Überschriebener Inhalt (statt Ausschnitt aus dem Quelltext)
+        self.text: Optional[str] = None
+
+    @property
+    def content(self) -> str:
+        if self.text is not None:
+            return self.text
+        return self.source[self.start:self.end]
+
+
+class ChunkIds:
+    """Inhaltsbasierte Chunk-IDs eines Dokuments: unveränderte Chunks behalten ihre ID,
+    gleiche Inhalte werden in Dokumentreihenfolge durchnummeriert
+    """
+
+    def __init__(self, document_id: str):
+        self.document_id = document_id
+        self.seen: Dict[str, int] = {}
+
+    def __call__(self, content: str) -> str:
+        digest = chunk_hash(content)[:16]
+        occurrence = self.seen.get(digest, 0)
+        self.seen[digest] = occurrence + 1
+        chunk_id = f"{self.document_id}_chunk_{digest}"
+        return f"{chunk_id}_{occurrence}" if occurrence else chunk_id
+
+
+class Chunker:
+    """Basisklasse: Unterklassen liefern (start, end)-Bereiche"""
+
+    name = "base"
+
+    def __init__(self, chunk_size: int = 1000, overlap: int = 200):
+        self.chunk_size = max(1, chunk_size)
+        self.overlap = max(0, min(overlap, self.chunk_size - 1))
+        self.metadata = {
+            "strategy": self.name,
+            "chunk_size": self.chunk_size,
+            "overlap": self.overlap,
+        }
+
+    def spans(self, text: str) -> Iterator[Tuple[int, int]]:
+        raise NotImplementedError
+
+    def chunk(self, text: str, document_id: str) -> Iterator[Chunk]:
+        """Chunks lazy erzeugen, mit inhaltsbasierten IDs"""
+        ids = ChunkIds(document_id)
+
+        for index, (start, end) in enumerate(self.spans(text)):
+            yield Chunk(ids(text[start:end]), document_id, text, start, end, index, self.metadata)
+
+
+class FixedChunker(Chunker):
+    """Feste Fenstergröße mit Overlap"""
+
+    name = "fixed"
+
+    def spans(self, text: str) -> Iterator[Tuple[int, int]]:
+        start = 0
+        length = len(text)
+
+        while start < length:
+            end = min(start + self.chunk_size, length)
+            yield start, end
+
+            if end == length:
+                break
+            start = end - self.overlap
+
+
+class SentenceChunker(Chunker):
+    """Packt ganze Sätze bis zur Chunk-Größe; Overlap aus ganzen Sätzen.
+
+    An Absatzgrenzen wird ab halber Chunk-Größe vorzeitig geschnitten, damit sich Chunk-Grenzen
+    nach einer Änderung wieder synchronisieren und unveränderte Absätze ihre Chunk-IDs behalten.
+    """
+
+    name = "sentence"
+
+    def _sentences(self, text: str) -> Iterator[Tuple[int, int, bool]]:
+        """(start, end, endet_mit_absatz) je Satz"""
+        start = 0
+        for match in SENTENCE_BOUNDARY.finditer(text):
+            if match.start() > start:
+                yield start, match.start(), bool(PARAGRAPH_BREAK.search(match.group()))
+            start = match.end()
+        if start < len(text):
+            yield start, len(text), True
+
+    def _split_long(self, start: int, end: int) -> Iterator[Tuple[int, int]]:
+        """Überlange Sätze hart teilen"""
+        while end - start > self.chunk_size:
+            yield start, start + self.chunk_size
+            start += self.chunk_size
+        yield start, end
+
+    def spans(self, text: str) -> Iterator[Tuple[int, int]]:
+        window: List[Tuple[int, int]] = []
+
+        for start, end, paragraph_end in self._sentences(text):
+            for piece_start, piece_end in self._split_long(start, end):
+                if window and piece_end - window[0][0] > self.chunk_size:
+                    yield window[0][0], window[-1][1]
+                    window = self._overlap_tail(window, piece_start, piece_end)
+
+                window.append((piece_start, piece_end))
+
+            if paragraph_end and window[-1][1] - window[0][0] >= self.chunk_size // 2:
+                yield window[0][0], window[-1][1]
+                window = []
+
+        if window:
+            yield window[0][0], window[-1][1]
+
+    def _overlap_tail(
+        self, window: List[Tuple[int, int]], next_start: int, next_end: int
+    ) -> List[Tuple[int, int]]:
+        """Letzte Sätze des Fensters behalten, solange sie in Overlap und Chunk-Größe passen"""
+        tail: List[Tuple[int, int]] = []
+        for sentence in reversed(window):
+            if next_start - sentence[0] > self.overlap or next_end - sentence[0] > self.chunk_size:
+                break
+            tail.insert(0, sentence)
+        return tail
+
+
+class TokenChunker(Chunker):
+    """An Wortgrenzen ausgerichtete Fenster mit Budget in (geschätzten) Tokens"""
+
+    name = "token"
+
+    def __init__(self, chunk_size: int = 256, overlap: int = 32):
+        super().__init__(chunk_size, overlap)
+        self.max_chars = self.chunk_size * CHARS_PER_TOKEN
+        self.overlap_chars = self.overlap * CHARS_PER_TOKEN
+
+    def spans(self, text: str) -> Iterator[Tuple[int, int]]:
+        window: List[Tuple[int, int]] = []
+
+        for match in WORD.finditer(text):
+            start, end = match.span()
+            # Überlange "Wörter" (z.B. Base64) hart teilen
+            while end - start > self.max_chars:
+                if window:
+                    yield window[0][0], window[-1][1]
+                    window = []
+                yield start, start + self.max_chars
+                start += self.max_chars
+
+            if window and end - window[0][0] > self.max_chars:
+                yield window[0][0], window[-1][1]
+                tail_start = window[-1][1] - self.overlap_chars
+                window = [word for word in window if word[0] >= tail_start]
+
+            window.append((start, end))
+
+        if window:
+            yield window[0][0], window[-1][1]
+
+
+CHUNKERS: Dict[str, Type[Chunker]] = {
+    FixedChunker.name: FixedChunker,
+    SentenceChunker.name: SentenceChunker,
+    TokenChunker.name: TokenChunker,
+}
+
+
+def register_chunker(chunker_class: Type[Chunker]) -> Type[Chunker]:
+    """Eigene Chunking-Strategie registrieren (als Decorator nutzbar)"""
+    CHUNKERS[chunker_class.name] = chunker_class
+    return chunker_class
+
+
+def create_chunker(strategy: str, chunk_size: int, overlap: int) -> Chunker:
+    """Chunker für eine Strategie erzeugen"""
+    try:
+        chunker_class = CHUNKERS[strategy]
+    except KeyError:
+        raise ValueError(f"Unknown chunking strategy: {strategy}") from None
+    return chunker_class(chunk_size, overlap)
+
+
+def batched(chunks: Iterable[Chunk], size: int) -> Iterator[List[Chunk]]:
+    """Chunks in Batches fester Größe gruppieren (lazy)"""
+    batch: List[Chunk] = []
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,95 @@
+"""
+Content Index
+Content-adressierte Deduplizierung und inkrementelle Re-Ingestion über Redis
+"""
+import hashlib
+import logging
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+def document_id_for(source: str, knowledge_space_id: Optional[str] = None) -> str:
+    """Stabile Dokument-ID einer Quelle (Dateipfad bzw. Dateiname pro Knowledge Space)"""
+    source_key = f"{knowledge_space_id or ''}:{source}"
+    return f"doc_{hashlib.sha256(source_key.encode('utf-8')).hexdigest()[:16]}"
+
+
+def chunk_hash(content: str) -> str:
+    """Hash eines Chunk-Inhalts"""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class ContentIndex:
+    """Index aus Content-Hashes (Dokumente) und Chunk-IDs (Chunks) pro Dokument"""
+
+    def __init__(self, queue_manager):
+        self.queue_manager = queue_manager
+        self.prefix = queue_manager.queue_name
+
+    def _content_key(self, content_hash: str, knowledge_space_id: Optional[str]) -> str:
+        return f"{self.prefix}:content:{knowledge_space_id or '-'}:{content_hash}"
+
+    def _document_key(self, document_id: str) -> str:
+        return f"{self.prefix}:document:{document_id}"
+
+    def _chunks_key(self, document_id: str) -> str:
+        return f"{self.prefix}:document:{document_id}:chunks"
+
+    async def find_duplicate(
+        self, content_hash: str, knowledge_space_id: Optional[str] = None
+    ) -> Optional[str]:
+        """Dokument-ID mit identischem, bereits verarbeitetem Inhalt suchen"""
+        client = await self.queue_manager.get_client()
+        return await client.get(self._content_key(content_hash, knowledge_space_id))
+
+    async def find_duplicates(
+        self, content_hashes: List[str], knowledge_space_id: Optional[str] = None
+    ) -> List[Optional[str]]:
+        """find_duplicate für mehrere Inhalte in einem Round-Trip"""
+        if not content_hashes:
+            return []
+        client = await self.queue_manager.get_client()
+        return await client.mget(
+            [self._content_key(content_hash, knowledge_space_id) for content_hash in content_hashes]
+        )
+
+    async def get_chunk_ids(self, document_id: str) -> Set[str]:
+        """IDs der aktuell im Vector Store gespeicherten Chunks eines Dokuments"""
+        client = await self.queue_manager.get_client()
+        return set(await client.smembers(self._chunks_key(document_id)))
+
+    async def commit(
+        self,
+        document_id: str,
+        content_hash: Optional[str],
+        knowledge_space_id: Optional[str],
+        added: Iterable[str],
+        removed: Iterable[str],
+    ):
+        """Neuen Stand eines Dokuments speichern (ohne content_hash nur die Chunks)"""
+        client = await self.queue_manager.get_client()
+        document_key = self._document_key(document_id)
+        previous_hash = await client.hget(document_key, "content_hash")
+        added = list(added)
+        removed = list(removed)
+
+        async with client.pipeline(transaction=True) as pipe:
+            if removed:
+                pipe.srem(self._chunks_key(document_id), *removed)
+            if added:
+                pipe.sadd(self._chunks_key(document_id), *added)
+            if previous_hash and previous_hash != content_hash:
+                # Alter Inhalt ist nicht mehr im Vector Store
+                pipe.delete(self._content_key(previous_hash, knowledge_space_id))
+                pipe.hdel(document_key, "content_hash")
+            if content_hash:
+                pipe.set(self._content_key(content_hash, knowledge_space_id), document_id)
+                pipe.hset(document_key, "content_hash", content_hash)
+            pipe.hset(document_key, "updated_at", datetime.now(timezone.utc).isoformat())
+            await pipe.execute()
+
+        logger.info(
+            f"Content index updated for {document_id}: +{len(added)} / -{len(removed)} chunks"
+        )
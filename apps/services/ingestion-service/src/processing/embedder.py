@@ -0,0 +1,224 @@
+"""
+Batch Embedder
+Bündelt Chunk-Texte zu wenigen Embedding-Requests an das LLM-Gateway
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Sequence
+
+import aiohttp
+
+from src.clients.http_client import AdaptiveLimiter, CircuitOpenError, ServiceClient
+
+logger = logging.getLogger(__name__)
+
+# Grobe Schätzung: ~4 Zeichen pro Token
+CHARS_PER_TOKEN = 4
+
+# Status-Codes, bei denen derselbe Batch erneut versucht wird
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+# Status-Codes, die auf ein überlastetes Gateway hindeuten (adaptive Parallelität sinkt)
+OVERLOAD_STATUS = {429, 503, 504}
+
+
+def estimate_tokens(text: str) -> int:
+    """Token-Anzahl eines Textes grob schätzen"""
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+class EmbeddingRequestError(Exception):
+    """Embedding-Request fehlgeschlagen"""
+
+    def __init__(self, message: str, retryable: bool = True, overloaded: bool = False):
+        super().__init__(message)
+        self.retryable = retryable
+        self.overloaded = overloaded
+
+
+class BatchEmbedder:
+    """Embedder mit Batching, begrenzter Parallelität und Teil-Retries"""
+
+    def __init__(
+        self,
+        client: ServiceClient,
+        model: str = "text-embedding-3-small",
+        max_batch_items: int = 64,
+        max_batch_tokens: int = 8000,
+        concurrency: int = 4,
+        max_retries: int = 3,
+        retry_backoff: float = 0.5,
+        cache=None,
+        limiter: Optional[AdaptiveLimiter] = None,
+    ):
+        self.client = client
+        self.model = model
+        self.max_batch_items = max(1, max_batch_items)
+        self.max_batch_tokens = max(1, max_batch_tokens)
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max(0, max_retries)
+        self.retry_backoff = retry_backoff
+        self.cache = cache
+        # Prozessweite, adaptive Obergrenze zusätzlich zur Parallelität pro Aufruf
+        self.limiter = limiter
+
+    async def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        """Embeddings für alle Texte erzeugen (Reihenfolge wie Eingabe, [] bei Fehler)"""
+        results: List[List[float]] = [[] for _ in texts]
+        if not texts:
+            return results
+
+        pending = range(len(texts))
+        if self.cache:
+            cached = await self.cache.get_many(self.model, texts)
+            pending = [index for index, vector in enumerate(cached) if vector is None]
+            for index, vector in enumerate(cached):
+                if vector is not None:
+                    results[index] = vector
+
+        # Identische Texte nur einmal anfragen
+        positions: Dict[str, List[int]] = {}
+        for index in pending:
+            positions.setdefault(texts[index], []).append(index)
+        if not positions:
+            return results
+
+        unique_texts = list(positions)
+        vectors = await self._embed_uncached(unique_texts)
+        for text, vector in zip(unique_texts, vectors):
+            for index in positions[text]:
+                results[index] = vector
+
+        if self.cache:
+            await self.cache.put_many(self.model, unique_texts, vectors)
+
+        return results
+
+    async def _embed_uncached(self, texts: Sequence[str]) -> List[List[float]]:
+        results: List[List[float]] = [[] for _ in texts]
+        batches = self._plan_batches(texts)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        await asyncio.gather(
+            *(self._embed_batch(semaphore, batch, texts, results) for batch in batches)
+        )
+
+        return results
+
+    def _plan_batches(self, texts: Sequence[str]) -> List[List[int]]:
+        """Indizes in Batches aufteilen (begrenzt durch Anzahl und Token-Budget)"""
+        batches: List[List[int]] = []
+        current: List[int] = []
+        current_tokens = 0
+
+        for index, text in enumerate(texts):
+            tokens = estimate_tokens(text)
+            if current and (
+                len(current) >= self.max_batch_items
+                or current_tokens + tokens > self.max_batch_tokens
+            ):
+                batches.append(current)
+                current = []
+                current_tokens = 0
+
+            current.append(index)
+            current_tokens += tokens
+
+        if current:
+            batches.append(current)
+
+        return batches
+
+    async def _embed_batch(
+        self,
+        semaphore: asyncio.Semaphore,
+        batch: List[int],
+        texts: Sequence[str],
+        results: List[List[float]],
+    ):
+        """Einen Batch senden; fehlerhafte Batches halbieren und nur die Hälften wiederholen"""
+        inputs = [texts[i] for i in batch]
+        last_error: Optional[EmbeddingRequestError] = None
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                await asyncio.sleep(self.retry_backoff * (2 ** (attempt - 1)))
+            try:
+                async with semaphore:
+                    vectors = await self._limited_request(inputs)
+                for index, vector in zip(batch, vectors):
+                    results[index] = vector
+                return
+            except EmbeddingRequestError as e:
+                last_error = e
+                if not e.retryable:
+                    break
+
+        # Nicht wiederholbare Fehler (z.B. 400/413) liegen oft an einzelnen Inputs
+        if len(batch) > 1 and last_error and not last_error.retryable:
+            middle = len(batch) // 2
+            logger.warning(
+                f"Embedding batch of {len(batch)} failed ({last_error}), splitting and retrying"
+            )
+            await asyncio.gather(
+                self._embed_batch(semaphore, batch[:middle], texts, results),
+                self._embed_batch(semaphore, batch[middle:], texts, results),
+            )
+        else:
+            logger.warning(f"Failed to generate {len(batch)} embedding(s): {last_error}")
+
+    async def _limited_request(self, inputs: List[str]) -> List[List[float]]:
+        """Request über den Limiter; Latenz und Überlast-Signale passen dessen Grenze an"""
+        if not self.limiter:
+            return await self._request(inputs)
+
+        await self.limiter.acquire()
+        started = time.monotonic()
+        latency: Optional[float] = None
+        overloaded = False
+        try:
+            vectors = await self._request(inputs)
+            latency = time.monotonic() - started
+            return vectors
+        except EmbeddingRequestError as e:
+            overloaded = e.overloaded
+            raise
+        finally:
+            self.limiter.release(latency, overloaded)
+
+    async def _request(self, inputs: List[str]) -> List[List[float]]:
+        """Einzelnen /v1/embeddings-Request über den geteilten Gateway-Client ausführen"""
+        try:
+            async with self.client.post(
+                "/v1/embeddings",
+                json={"model": self.model, "input": inputs},
+                headers={"Content-Type": "application/json"},
+            ) as response:
+                if response.status != 200:
+                    raise EmbeddingRequestError(
+                        f"HTTP {response.status}",
+                        retryable=response.status in RETRYABLE_STATUS,
+                        overloaded=response.status in OVERLOAD_STATUS,
+                    )
+                data = await response.json()
+        except asyncio.TimeoutError as e:
+            raise EmbeddingRequestError(str(e) or type(e).__name__, overloaded=True) from e
+        except (aiohttp.ClientError, CircuitOpenError) as e:
+            raise EmbeddingRequestError(str(e) or type(e).__name__) from e
+
+        items = data.get("data") or []
+        if len(items) != len(inputs):
+            raise EmbeddingRequestError(
+                f"expected {len(inputs)} embeddings, got {len(items)}", retryable=False
+            )
+
+        # Gateway kann die Reihenfolge ändern, daher über "index" zuordnen
+        vectors: List[List[float]] = [[] for _ in inputs]
+        for position, item in enumerate(items):
+            index = item.get("index", position)
+            if not 0 <= index < len(inputs):
+                raise EmbeddingRequestError(f"invalid embedding index {index}", retryable=False)
+            vectors[index] = item.get("embedding", [])
+
+        return vectors
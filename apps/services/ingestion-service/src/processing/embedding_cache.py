@@ -0,0 +1,357 @@
+"""
+Embedding Cache
+Zweistufiger Cache (In-Process-LRU + Redis/Disk) für Embeddings, Schlüssel: hash(Modell, Text)
+"""
+import asyncio
+import contextlib
+import hashlib
+import logging
+import os
+import struct
+import tempfile
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import redis.asyncio as redis
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(model: str, text: str) -> str:
+    """Cache-Schlüssel für Modell und Text"""
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+def encode_vector(vector: Sequence[float]) -> bytes:
+    """Vektor kompakt als float32-Bytes kodieren"""
+    return array("f", vector).tobytes()
+
+
+def decode_vector(data: bytes) -> List[float]:
+    """float32-Bytes zurück in einen Vektor wandeln"""
+    values = array("f")
+    values.frombytes(data)
+    return values.tolist()
+
+
+class LRUCache:
+    """In-Process-LRU mit Begrenzung auf die Gesamtgröße in Bytes"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[bytes]:
+        data = self._entries.get(key)
+        if data is not None:
+            self._entries.move_to_end(key)
+        return data
+
+    def put(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size -= len(previous)
+
+        self._entries[key] = data
+        self.size += len(data)
+
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+
+class RedisEmbeddingStore:
+    """Geteilte zweite Stufe in Redis (binäre Werte, mit TTL)"""
+
+    def __init__(self, redis_url: str, ttl: int, pool_size: int = 10):
+        self.redis_url = redis_url
+        self.ttl = ttl
+        self.pool_size = pool_size
+        self.prefix = "embedding_cache"
+        self.client: Optional[redis.Redis] = None
+
+    async def _client(self) -> redis.Redis:
+        if not self.client:
+            self.client = redis.Redis.from_pool(
+                redis.BlockingConnectionPool.from_url(
+                    self.redis_url, max_connections=self.pool_size
+                )
+            )
+        return self.client
+
+    async def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        client = await self._client()
+        return await client.mget([f"{self.prefix}:{key}" for key in keys])
+
+    async def put_many(self, items: Dict[str, bytes]):
+        client = await self._client()
+        async with client.pipeline(transaction=False) as pipe:
+            for key, data in items.items():
+                pipe.set(f"{self.prefix}:{key}", data, ex=self.ttl)
+            await pipe.execute()
+
+    async def close(self):
+        if self.client:
+            await self.client.aclose()
+            self.client = None
+
+
+class DiskEmbeddingStore:
+    """Zweite Stufe als Dateien auf Disk (eine Datei pro Embedding, mit Längen-Header).
+
+    Einträge älter als ttl gelten als Miss; überschreitet das Verzeichnis max_bytes, werden die
+    ältesten Dateien (mtime) entfernt. Mehrere Prozesse können dasselbe Verzeichnis nutzen.
+    """
+
+    HEADER = struct.Struct("<I")
+    # Nach Überschreitung von max_bytes bis auf diesen Anteil räumen
+    EVICT_TO = 0.9
+    # Abgelaufene Einträge spätestens nach so vielen Sekunden entfernen
+    SWEEP_INTERVAL = 3600.0
+
+    def __init__(self, directory: str, ttl: int = 0, max_bytes: int = 0):
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        # Geschätzte Belegung; None bis zum ersten Durchlauf über das Verzeichnis
+        self.size: Optional[int] = None
+        self.evicted = 0
+        self._swept_at = 0.0
+        self._lock = threading.Lock()
+        self._sweeping = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.f32"
+
+    def _unpack(self, data: bytes) -> Optional[bytes]:
+        """Vektor-Bytes prüfen; unvollständige bzw. fremde Dateien sind ein Miss"""
+        if len(data) < self.HEADER.size:
+            return None
+        (length,) = self.HEADER.unpack_from(data)
+        if not length or length % 4 or len(data) != self.HEADER.size + length:
+            return None
+        return data[self.HEADER.size:]
+
+    def _read(self, keys: List[str]) -> List[Optional[bytes]]:
+        now = time.time()
+        results: List[Optional[bytes]] = []
+        for key in keys:
+            try:
+                with open(self._path(key), "rb") as f:
+                    data = f.read()
+                    modified = os.fstat(f.fileno()).st_mtime
+            except FileNotFoundError:
+                results.append(None)
+                continue
+            if self.ttl and now - modified > self.ttl:
+                results.append(None)
+            else:
+                results.append(self._unpack(data))
+        return results
+
+    def _write(self, items: Dict[str, bytes]):
+        written = 0
+        for key, data in items.items():
+            path = self._path(key)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Eigene Temp-Datei pro Schreibvorgang: parallele Writer (auch andere Prozesse)
+            # ersetzen die Zieldatei nur mit vollständigen Inhalten
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(self.HEADER.pack(len(data)))
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(tmp_path)
+                raise
+            written += self.HEADER.size + len(data)
+
+        with self._lock:
+            if self.size is not None:
+                self.size += written
+            due = (
+                self.size is None
+                or (self.max_bytes and self.size > self.max_bytes)
+                or (self.ttl and time.time() - self._swept_at > min(self.ttl, self.SWEEP_INTERVAL))
+            )
+        if due:
+            self._sweep()
+
+    def _sweep(self):
+        """Abgelaufene und (über max_bytes) die ältesten Einträge löschen, Belegung neu messen"""
+        if not self._sweeping.acquire(blocking=False):
+            return
+        try:
+            now = time.time()
+            entries: List[Tuple[float, int, str]] = []
+            total = 0
+            evicted = 0
+
+            for directory in os.scandir(self.directory):
+                if not directory.is_dir():
+                    continue
+                for entry in os.scandir(directory.path):
+                    try:
+                        stat = entry.stat()
+                        if entry.name.endswith(".tmp"):
+                            # Reste abgebrochener Schreibvorgänge
+                            if now - stat.st_mtime > self.SWEEP_INTERVAL:
+                                os.unlink(entry.path)
+                            continue
+                        if self.ttl and now - stat.st_mtime > self.ttl:
+                            os.unlink(entry.path)
+                            evicted += 1
+                            continue
+                    except FileNotFoundError:
+                        # Parallel von einem anderen Prozess entfernt
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+
+            if self.max_bytes and total > self.max_bytes:
+                target = self.max_bytes * self.EVICT_TO
+                entries.sort()
+                for _, size, path in entries:
+                    if total <= target:
+                        break
+                    with contextlib.suppress(FileNotFoundError):
+                        os.unlink(path)
+                    total -= size
+                    evicted += 1
+
+            with self._lock:
+                self.size = total
+                self.evicted += evicted
+                self._swept_at = now
+            if evicted:
+                logger.info(f"Embedding disk cache: {evicted} entries evicted, {total} bytes in use")
+        finally:
+            self._sweeping.release()
+
+    async def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        return await asyncio.to_thread(self._read, keys)
+
+    async def put_many(self, items: Dict[str, bytes]):
+        await asyncio.to_thread(self._write, items)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"bytes": self.size, "max_bytes": self.max_bytes or None, "evicted": self.evicted}
+
+    async def close(self):
+        pass
+
+
+class EmbeddingCache:
+    """Zweistufiger Embedding-Cache mit Trefferquoten-Metriken"""
+
+    def __init__(self, memory_bytes: int, store=None):
+        self.memory = LRUCache(memory_bytes)
+        self.store = store
+        self.memory_hits = 0
+        self.store_hits = 0
+        self.misses = 0
+
+    async def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Embeddings aus dem Cache holen (None bei Miss)"""
+        keys = [cache_key(model, text) for text in texts]
+        results: List[Optional[List[float]]] = [None] * len(keys)
+        missing: List[int] = []
+
+        for index, key in enumerate(keys):
+            data = self.memory.get(key)
+            if data is not None:
+                results[index] = decode_vector(data)
+                self.memory_hits += 1
+            else:
+                missing.append(index)
+
+        if missing and self.store:
+            try:
+                stored = await self.store.get_many([keys[i] for i in missing])
+            except Exception as e:
+                logger.warning(f"Embedding cache lookup failed: {e}")
+                stored = [None] * len(missing)
+
+            still_missing = []
+            for index, data in zip(missing, stored):
+                if data:
+                    results[index] = decode_vector(data)
+                    self.memory.put(keys[index], data)
+                    self.store_hits += 1
+                else:
+                    still_missing.append(index)
+            missing = still_missing
+
+        self.misses += len(missing)
+        return results
+
+    async def put_many(self, model: str, texts: Sequence[str], vectors: Sequence[List[float]]):
+        """Neue Embeddings in beiden Stufen ablegen (leere Vektoren werden ignoriert)"""
+        items: Dict[str, bytes] = {}
+        for text, vector in zip(texts, vectors):
+            if vector:
+                key = cache_key(model, text)
+                data = encode_vector(vector)
+                self.memory.put(key, data)
+                items[key] = data
+
+        if items and self.store:
+            try:
+                await self.store.put_many(items)
+            except Exception as e:
+                logger.warning(f"Embedding cache write failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Trefferquoten und Speicherbelegung"""
+        lookups = self.memory_hits + self.store_hits + self.misses
+        return {
+            "lookups": lookups,
+            "memory_hits": self.memory_hits,
+            "store_hits": self.store_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.store_hits) / lookups, 4) if lookups else None,
+            "memory_entries": len(self.memory),
+            "memory_bytes": self.memory.size,
+            "store": type(self.store).__name__ if self.store else None,
+            "store_stats": self.store.stats() if hasattr(self.store, "stats") else None,
+        }
+
+    async def close(self):
+        if self.store:
+            await self.store.close()
+
+
+def create_embedding_cache(settings) -> Optional[EmbeddingCache]:
+    """Embedding-Cache gemäß Konfiguration erzeugen"""
+    backend = settings.embedding_cache_backend.lower()
+    if backend == "none":
+        return None
+
+    store = None
+    if backend == "redis":
+        store = RedisEmbeddingStore(
+            settings.embedding_cache_redis_url or settings.redis_url, settings.embedding_cache_ttl
+        )
+    elif backend == "disk":
+        store = DiskEmbeddingStore(
+            settings.embedding_cache_dir,
+            ttl=settings.embedding_cache_ttl,
+            max_bytes=settings.embedding_cache_disk_mb * 1024 * 1024,
+        )
+    elif backend != "memory":
+        raise ValueError(f"Unknown embedding cache backend: {settings.embedding_cache_backend}")
+
+    return EmbeddingCache(settings.embedding_cache_memory_mb * 1024 * 1024, store)
@@ -0,0 +1,370 @@
+"""
+Text-Extraktion
+Erkennt das Format (Magic Bytes, MIME-Typ) und extrahiert Text aus Plain Text, HTML, PDF und DOCX;
+rechenintensive Formate laufen in einem Prozess-Pool mit Zeit- und Speicherlimit pro Job
+"""
+import asyncio
+import logging
+import mimetypes
+import mmap
+import os
+import re
+import signal
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from html.parser import HTMLParser
+from multiprocessing import get_context
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from xml.etree import ElementTree
+
+try:
+    import resource
+except ImportError:  # nicht auf allen Plattformen verfügbar
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+MIME_TEXT = "text/plain"
+MIME_HTML = "text/html"
+MIME_PDF = "application/pdf"
+MIME_DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+# Bytes vom Dateianfang für die Formaterkennung
+SNIFF_BYTES = 4096
+
+# Höchstens so viel von [Content_Types].xml lesen (Schutz vor ZIP-Bomben)
+CONTENT_TYPES_MAX_BYTES = 1024 * 1024
+
+
+class ExtractionError(Exception):
+    """Text konnte nicht extrahiert werden (Retry zwecklos)"""
+
+
+class ExtractionTimeoutError(ExtractionError):
+    """Extraktion hat das Zeitlimit überschritten"""
+
+
+class Extractor:
+    """Registrierter Extractor: Funktion (Pfad -> Text) plus Erkennungsmerkmale"""
+
+    def __init__(
+        self,
+        mime_type: str,
+        extract: Callable[[str], str],
+        sniff: Optional[Callable[[bytes, Optional[str]], bool]] = None,
+        offload: bool = True,
+    ):
+        self.mime_type = mime_type
+        self.extract = extract
+        self.sniff = sniff
+        self.offload = offload
+
+
+_EXTRACTORS: Dict[str, Extractor] = {}
+
+
+def register_extractor(
+    mime_type: str,
+    extract: Callable[[str], str],
+    sniff: Optional[Callable[[bytes, Optional[str]], bool]] = None,
+    offload: bool = True,
+):
+    """Extractor für einen MIME-Typ registrieren.
+
+    extract muss auf Modulebene definiert sein (wird per Referenz an den Pool-Prozess übergeben),
+    sniff erkennt das Format an den ersten SNIFF_BYTES Bytes und darf für Container-Formate
+    die Datei selbst öffnen (Pfad, falls bekannt).
+    """
+    _EXTRACTORS[mime_type] = Extractor(mime_type, extract, sniff, offload)
+
+
+def detect_mime_type(
+    head: bytes, filename: Optional[str] = None, path: Optional[str] = None
+) -> str:
+    """Format bestimmen: Magic Bytes vor Dateiendung, sonst Plain Text"""
+    for extractor in _EXTRACTORS.values():
+        if extractor.sniff and extractor.sniff(head, path):
+            return extractor.mime_type
+
+    guessed, _ = mimetypes.guess_type(filename or "")
+    if guessed in _EXTRACTORS:
+        return guessed
+    return MIME_TEXT
+
+
+# Plain Text
+
+
+def extract_text(path: str) -> str:
+    """UTF-8 lesen (über mmap, ungültige Bytes werden ignoriert)"""
+    if not os.path.getsize(path):
+        return ""
+
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            with memoryview(mapped) as view:
+                return str(view, "utf-8", "ignore")
+
+
+# HTML
+
+_HTML_SKIP = {"script", "style", "noscript", "template", "head", "svg"}
+_HTML_BLOCK = {
+    "p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6",
+    "section", "article", "header", "footer", "blockquote", "pre", "table", "ul", "ol",
+}
+_BLANK_LINES = re.compile(r"\n\s*\n\s*")
+_SPACES = re.compile(r"[ \t\r\f\v]+")
+
+
+class _HtmlText(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _HTML_SKIP:
+            self._skip += 1
+        elif tag in _HTML_BLOCK:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in _HTML_SKIP:
+            self._skip = max(0, self._skip - 1)
+        elif tag in _HTML_BLOCK:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.parts.append(data)
+
+
+def _sniff_html(head: bytes, path: Optional[str] = None) -> bool:
+    start = head.lstrip(b"\xef\xbb\xbf \t\r\n")[:15].lower()
+    return start.startswith((b"<!doctype html", b"<html"))
+
+
+def extract_html(path: str) -> str:
+    """Sichtbaren Text ohne Skripte/Styles; Blockelemente werden zu Zeilenumbrüchen"""
+    parser = _HtmlText()
+    parser.feed(extract_text(path))
+    parser.close()
+    text = _SPACES.sub(" ", "".join(parser.parts))
+    return _BLANK_LINES.sub("\n\n", text).strip()
+
+
+# PDF
+
+
+def _sniff_pdf(head: bytes, path: Optional[str] = None) -> bool:
+    return head.startswith(b"%PDF-")
+
+
+def extract_pdf(path: str) -> str:
+    """Text aller Seiten (pypdf), Seiten durch Leerzeilen getrennt"""
+    from pypdf import PdfReader
+    from pypdf.errors import PdfReadError
+
+    try:
+        reader = PdfReader(path)
+        if reader.is_encrypted and not reader.decrypt(""):
+            raise ExtractionError("PDF is encrypted")
+        return "\n\n".join(page.extract_text() or "" for page in reader.pages).strip()
+    except PdfReadError as e:
+        raise ExtractionError(f"Invalid PDF: {e}")
+
+
+# DOCX
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_DOCX_MAIN_PART = b"application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"
+
+
+def _sniff_docx(head: bytes, path: Optional[str] = None) -> bool:
+    """ZIP, dessen [Content_Types].xml einen WordprocessingML-Hauptteil deklariert.
+
+    Die Reihenfolge der ZIP-Einträge ist beliebig; word/ steht nicht immer in den ersten
+    SNIFF_BYTES Bytes. Ohne Pfad bleibt nur diese Heuristik.
+    """
+    if not head.startswith(b"PK\x03\x04"):
+        return False
+    if path is None:
+        return b"word/" in head
+    try:
+        with zipfile.ZipFile(path) as archive, archive.open("[Content_Types].xml") as types:
+            return _DOCX_MAIN_PART in types.read(CONTENT_TYPES_MAX_BYTES)
+    except (zipfile.BadZipFile, KeyError, OSError, RuntimeError):
+        return False
+
+
+def extract_docx(path: str) -> str:
+    """Absätze aus word/document.xml (gestreamt geparst), ohne Abhängigkeiten"""
+    paragraphs: List[str] = []
+    parts: List[str] = []
+
+    try:
+        with zipfile.ZipFile(path) as archive, archive.open("word/document.xml") as document:
+            for event, element in ElementTree.iterparse(document, events=("end",)):
+                if element.tag == f"{_W}t":
+                    parts.append(element.text or "")
+                elif element.tag == f"{_W}tab":
+                    parts.append("\t")
+                elif element.tag in (f"{_W}br", f"{_W}cr"):
+                    parts.append("\n")
+                elif element.tag == f"{_W}p":
+                    paragraphs.append("".join(parts))
+                    parts.clear()
+                    element.clear()
+    except (zipfile.BadZipFile, KeyError, ElementTree.ParseError) as e:
+        raise ExtractionError(f"Invalid DOCX: {e}")
+
+    return "\n".join(paragraphs).strip()
+
+
+register_extractor(MIME_PDF, extract_pdf, sniff=_sniff_pdf)
+register_extractor(MIME_DOCX, extract_docx, sniff=_sniff_docx)
+register_extractor(MIME_HTML, extract_html, sniff=_sniff_html)
+# Plain Text ist I/O-gebunden; ein Pool-Roundtrip würde den Text nur zusätzlich kopieren
+register_extractor(MIME_TEXT, extract_text, offload=False)
+
+
+# Pool-Prozess
+
+
+def _limit_process(memory_limit: int):
+    """Initializer der Pool-Prozesse: Adressraum begrenzen"""
+    if memory_limit and resource is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+
+
+def _on_timeout(signum, frame):
+    raise ExtractionTimeoutError("Extraction timed out")
+
+
+def _run_extractor(extract: Callable[[str], str], path: str, timeout: float) -> str:
+    """Im Pool-Prozess: Extractor mit Zeitlimit (SIGALRM) ausführen"""
+    if timeout:
+        signal.signal(signal.SIGALRM, _on_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return extract(path)
+    except MemoryError:
+        raise ExtractionError("Extraction exceeded memory limit")
+    finally:
+        if timeout:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+class ExtractionPool:
+    """Extrahiert Text aus Blobs; rechenintensive Formate im Prozess-Pool"""
+
+    def __init__(
+        self,
+        processes: int = 0,
+        timeout: float = 120.0,
+        memory_limit: int = 0,
+        max_tasks_per_child: int = 0,
+    ):
+        self.processes = processes or os.cpu_count() or 1
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.max_tasks_per_child = max_tasks_per_child
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Nur so viele Jobs übergeben, wie Prozesse frei sind: das Zeitlimit misst dann die
+        # Laufzeit und nicht die Wartezeit im Pool
+        self._slots = asyncio.Semaphore(self.processes)
+        self.extracted: Dict[str, int] = {}
+        self.failed = 0
+        self.restarts = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Pool beim ersten Job starten (spawn: keine geerbten Sockets/Threads)"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=get_context("spawn"),
+                initializer=_limit_process,
+                initargs=(self.memory_limit,),
+                max_tasks_per_child=self.max_tasks_per_child or None,
+            )
+        return self._executor
+
+    def _reset(self, executor: ProcessPoolExecutor):
+        """Pool nach hängendem oder abgestürztem Prozess verwerfen (nur einmal pro Pool)"""
+        if self._executor is not executor:
+            return
+        self._executor = None
+        self.restarts += 1
+        # shutdown() verwirft nur wartende Jobs; ein in C-Code hängender Prozess liefe weiter.
+        # ProcessPoolExecutor hat kein öffentliches API, seine Prozesse zu beenden, daher das
+        # CPython-Detail _processes (vor shutdown lesen, das es leert). Fehlt es, bleibt es beim
+        # shutdown und der Prozess endet mit seinem Job.
+        processes = getattr(executor, "_processes", None)
+        executor.shutdown(wait=False, cancel_futures=True)
+        if isinstance(processes, dict):
+            for process in list(processes.values()):
+                process.kill()
+
+    async def _run_in_pool(self, extract: Callable[[str], str], path: str, filename: str) -> str:
+        async with self._slots:
+            executor = self._get_executor()
+            future = asyncio.get_running_loop().run_in_executor(
+                executor, _run_extractor, extract, path, self.timeout
+            )
+            # Das Zeitlimit greift im Pool-Prozess; hier nur Absicherung gegen Hänger in C-Code
+            try:
+                return await asyncio.wait_for(future, self.timeout + 10 if self.timeout else None)
+            except asyncio.TimeoutError:
+                self._reset(executor)
+                raise ExtractionTimeoutError(f"Extraction of {filename} timed out")
+            except BrokenProcessPool:
+                # Prozess beendet (z.B. OOM-Killer) oder Pool verworfen; betroffene Jobs
+                # laufen über den normalen Retry erneut
+                self._reset(executor)
+                raise RuntimeError(f"Extraction process for {filename} terminated")
+
+    async def extract(self, blob: Dict[str, Any], filename: Optional[str] = None) -> Tuple[str, str]:
+        """(MIME-Typ, Text) eines gespoolten Blobs"""
+        if not blob.get("size"):
+            return MIME_TEXT, ""
+
+        path = blob["path"]
+        mime_type = await asyncio.to_thread(_detect_file, path, filename)
+        extractor = _EXTRACTORS[mime_type]
+
+        try:
+            if extractor.offload:
+                text = await self._run_in_pool(extractor.extract, path, filename)
+            else:
+                text = await asyncio.to_thread(extractor.extract, path)
+        except ExtractionError:
+            self.failed += 1
+            raise
+        except ImportError as e:
+            self.failed += 1
+            raise ExtractionError(f"No extractor available for {mime_type}: {e}")
+
+        self.extracted[mime_type] = self.extracted.get(mime_type, 0) + 1
+        return mime_type, text
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "processes": self.processes,
+            "running": self._executor is not None,
+            "restarts": self.restarts,
+            "extracted": dict(self.extracted),
+            "failed": self.failed,
+        }
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+def _detect_file(path: str, filename: Optional[str]) -> str:
+    with open(path, "rb") as f:
+        head = f.read(SNIFF_BYTES)
+    return detect_mime_type(head, filename, path)
@@ -0,0 +1,204 @@
+"""
+PII-Redaction
+Kompilierte Single-Pass-Redaction (E-Mail, Telefon, IBAN, Steuer-ID, Adressen) mit Fundstellen
+"""
+import logging
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_STREET_SUFFIX = r"(?:straße|strasse|str\.|weg|allee|platz|gasse|ring|damm|ufer|chaussee)"
+_STREET_WORD = r"(?:Straße|Strasse|Str\.|Weg|Allee|Platz|Gasse|Ring|Damm|Ufer|Chaussee)"
+
+# Reihenfolge = Priorität: an einer Position gewinnt der erste passende Detektor.
+# Treffer beginnen am Text- bzw. Wortanfang (nach einem Zeichen aus LEAD). Jeder Treffer
+# enthält eine Ziffer oder ein "@" (Anker); Wiederholungen sind begrenzt, sodass zwischen
+# Trefferrand und nächstem Anker höchstens ANCHOR_DISTANCE Zeichen liegen.
+PII_DETECTORS: Dict[str, str] = {
+    "email": r"[A-Za-z0-9._%+-]{1,64}@[A-Za-z0-9.-]{1,63}\.[A-Za-z]{2,12}\b",
+    # IBAN, auch in 4er-Gruppen geschrieben (DE89 3704 0044 0532 0130 00)
+    "iban": r"[A-Z]{2}\d{2}(?: ?[A-Z0-9]{4}){3,7}(?: ?[A-Z0-9]{1,3})?\b",
+    # Steuer-ID (11 Ziffern, optional gruppiert) bzw. Steuernummer (12/345/67890)
+    "tax_id": r"(?:[1-9]\d(?: ?\d{3}){3}|\d{2,3}/\d{3,4}/\d{4,5})\b",
+    "phone": r"(?:\+49|0049|0)[ ]?(?:\(0\)[ ]?)?[1-9]\d{1,4}(?:[ /-]?\d{2,}){1,4}\b",
+    # Straße + Hausnummer, optional mit PLZ und Ort; der Lookahead verwirft Wörter ohne
+    # folgende Hausnummer, bevor die Straßen-Suffixe durchprobiert werden
+    "address": (
+        r"[A-ZÄÖÜ](?=[\w.-]{0,60} (?:[A-ZÄÖÜ][\w.]{1,9} )?\d)"
+        r"(?:[a-zäöüß]{0,30}(?:-[A-ZÄÖÜ][a-zäöüß]{0,30}){0,2}(?:" + _STREET_SUFFIX
+        + "|-" + _STREET_WORD + r")|[a-zäöüß]{1,30} " + _STREET_WORD + r")"
+        r" \d{1,4}(?: ?[a-zA-Z]\b)?(?:,? \d{5} [A-ZÄÖÜ][a-zäöüß]{1,40})?"
+    ),
+}
+
+# Zeichen vor einem Treffer; als Zeichenklasse am Pattern-Anfang überspringt die Regex-Engine
+# alle Positionen innerhalb von Wörtern, ohne die Alternativen einzeln zu prüfen
+LEAD = r"[^\w+%-]"
+
+# Vorfilter: nur Bereiche um Ziffern bzw. "@" werden mit dem kombinierten Pattern gescannt
+ANCHOR = re.compile(r"[\d@](?:[\d@ ./+-]*[\d@])?")
+ANCHOR_DISTANCE = 80
+
+
+class PiiFinding:
+    """Fundstelle im Originaltext"""
+
+    __slots__ = ("type", "start", "end")
+
+    def __init__(self, pii_type: str, start: int, end: int):
+        self.type = pii_type
+        self.start = start
+        self.end = end
+
+    def __repr__(self) -> str:
+        return f"PiiFinding({self.type!r}, {self.start}, {self.end})"
+
+    def to_dict(self) -> Dict[str, object]:
+        return {"type": self.type, "start": self.start, "end": self.end}
+
+
+class PiiRedactor:
+    """Kombiniert alle aktiven Detektoren zu einem Pattern und redigiert in einem Durchlauf.
+
+    Für die eingebauten Detektoren wird der Text zuerst nach Ankern (Ziffern, "@") durchsucht;
+    das kombinierte Pattern läuft nur in den Bereichen um diese Anker. Eigene Patterns
+    (``patterns``) deaktivieren den Vorfilter, da für sie kein Anker bekannt ist.
+    """
+
+    def __init__(
+        self,
+        detectors: Optional[Iterable[str]] = None,
+        patterns: Optional[Dict[str, str]] = None,
+    ):
+        available = {**PII_DETECTORS, **(patterns or {})}
+        names = list(available) if detectors is None else list(detectors)
+
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            raise ValueError(f"Unknown PII detectors: {', '.join(unknown)}")
+
+        self.detectors = names
+        self.replacements = {name: f"[{name.upper()}_REDACTED]" for name in names}
+        self.prefilter = not patterns
+        self.pattern = self.head = None
+        if names:
+            body = "|".join(f"(?P<{name}>{available[name]})" for name in names)
+            self.pattern = re.compile(f"{LEAD}(?:{body})")
+            self.head = re.compile(body)
+
+    def _regions(self, text: str) -> Iterator[Tuple[int, int]]:
+        """Zusammengefasste Bereiche um alle Anker"""
+        if not self.prefilter:
+            yield 0, len(text)
+            return
+
+        region_start = region_end = -1
+        for anchor in ANCHOR.finditer(text):
+            start = max(0, anchor.start() - ANCHOR_DISTANCE)
+            end = min(len(text), anchor.end() + ANCHOR_DISTANCE)
+            if start <= region_end:
+                region_end = end
+                continue
+            if region_end >= 0:
+                yield region_start, region_end
+            region_start, region_end = start, end
+
+        if region_end >= 0:
+            yield region_start, region_end
+
+    def find(self, text: str) -> Iterator[PiiFinding]:
+        """Fundstellen lazy liefern (nicht überlappend, von links nach rechts)"""
+        if self.pattern is None:
+            return
+
+        # Treffer direkt am Textanfang (ohne vorangehendes Zeichen)
+        position = 0
+        match = self.head.match(text)
+        if match:
+            yield PiiFinding(match.lastgroup, 0, match.end())
+            position = match.end()
+
+        for start, end in self._regions(text):
+            for match in self.pattern.finditer(text, max(start, position), end):
+                name = match.lastgroup
+                yield PiiFinding(name, match.start(name), match.end())
+
+    def redact(self, text: str) -> Tuple[str, List[PiiFinding]]:
+        """Text in einem Durchlauf redigieren; Fundstellen beziehen sich auf den Originaltext"""
+        findings = list(self.find(text))
+        if not findings:
+            return text, findings
+
+        parts: List[str] = []
+        position = 0
+        for finding in findings:
+            parts.append(text[position:finding.start])
+            parts.append(self.replacements[finding.type])
+            position = finding.end
+        parts.append(text[position:])
+
+        return "".join(parts), findings
+
+    def redact_spans(
+        self, text: str, spans: List[Tuple[int, int]]
+    ) -> Tuple[List[Optional[str]], List[PiiFinding]]:
+        """Aufsteigende, ggf. überlappende Bereiche (Chunks) redigieren; der umfassende Bereich
+        wird einmal gescannt, Overlaps also nicht mehrfach.
+
+        Liefert pro Bereich den redigierten Text (None ohne Fundstelle) und die Fundstellen
+        (bezogen auf text). Fundstellen über einen Bereichsrand werden im Bereich ersetzt.
+        """
+        if not spans or self.pattern is None:
+            return [None] * len(spans), []
+
+        first, last = spans[0][0], max(end for _, end in spans)
+        # Rand, damit Fundstellen über den Bereichsgrenzen vollständig erkannt werden
+        offset = max(0, first - ANCHOR_DISTANCE)
+        window = text[offset:min(len(text), last + ANCHOR_DISTANCE)]
+        findings = [
+            PiiFinding(finding.type, finding.start + offset, finding.end + offset)
+            for finding in self.find(window)
+            if finding.end + offset > first and finding.start + offset < last
+        ]
+        if not findings:
+            return [None] * len(spans), findings
+
+        results: List[Optional[str]] = []
+        position = 0
+        for start, end in spans:
+            # Fundstellen sind sortiert und überlappen nicht: Enden steigen ebenfalls
+            while position < len(findings) and findings[position].end <= start:
+                position += 1
+
+            parts: List[str] = []
+            cursor = start
+            index = position
+            while index < len(findings) and findings[index].start < end:
+                finding = findings[index]
+                parts.append(text[cursor:max(cursor, finding.start)])
+                parts.append(self.replacements[finding.type])
+                cursor = min(finding.end, end)
+                index += 1
+
+            if parts:
+                parts.append(text[cursor:end])
+                results.append("".join(parts))
+            else:
+                results.append(None)
+
+        return results, findings
+
+
+def summarize_findings(findings: Iterable[PiiFinding]) -> Dict[str, int]:
+    """Anzahl der Fundstellen pro Typ"""
+    counts: Dict[str, int] = {}
+    for finding in findings:
+        counts[finding.type] = counts.get(finding.type, 0) + 1
+    return counts
+
+
+def create_pii_redactor(settings) -> PiiRedactor:
+    """Redactor mit den konfigurierten Detektoren erzeugen"""
+    detectors = [name.strip() for name in settings.pii_detectors.split(",") if name.strip()]
+    return PiiRedactor(detectors)
@@ -0,0 +1,87 @@
+"""
+Stage Pipeline
+Verbindet Verarbeitungsschritte über begrenzte Queues, damit sie überlappend laufen
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Ende-Markierung in den Queues
+_DONE = object()
+
+Stage = Callable[[Any], Awaitable[Optional[Any]]]
+
+
+class StagePipeline:
+    """Jede Stage läuft als eigener Task; zwischen den Stages liegen Queues mit fester Größe.
+
+    Während Stage n Element i verarbeitet, kann Stage n-1 bereits Element i+1 vorbereiten.
+    Die Queue-Größe begrenzt den Vorlauf (Backpressure). Gibt eine Stage None zurück, wird
+    das Element verworfen. Bricht eine Stage ab, werden alle anderen abgebrochen.
+    Die Quelle wird Element für Element im Thread iteriert (blockiert den Event Loop nicht);
+    die Zeit zum Erzeugen der Elemente wird unter source_name erfasst.
+    """
+
+    def __init__(self, queue_size: int = 2, source_name: str = "source"):
+        self.queue_size = max(1, queue_size)
+        self.source_name = source_name
+        self.stages: List[Tuple[str, Stage]] = []
+        self.busy: Dict[str, float] = {source_name: 0.0}
+
+    def add_stage(self, name: str, func: Stage) -> "StagePipeline":
+        self.stages.append((name, func))
+        self.busy[name] = 0.0
+        return self
+
+    async def run(self, source: Iterable[Any]):
+        """Alle Elemente der Quelle durch die Stages schieben"""
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        tasks = [asyncio.create_task(self._feed(source, queues[0]))]
+        for index, (name, func) in enumerate(self.stages):
+            output = queues[index + 1] if index + 1 < len(queues) else None
+            tasks.append(asyncio.create_task(self._run_stage(name, func, queues[index], output)))
+
+        try:
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if task.exception():
+                    raise task.exception()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _feed(self, source: Iterable[Any], queue: asyncio.Queue):
+        iterator = iter(source)
+        while True:
+            started = time.monotonic()
+            item = await asyncio.to_thread(next, iterator, _DONE)
+            self.busy[self.source_name] += time.monotonic() - started
+            await queue.put(item)
+            if item is _DONE:
+                break
+
+    async def _run_stage(
+        self, name: str, func: Stage, queue: asyncio.Queue, output: Optional[asyncio.Queue]
+    ):
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+
+            started = time.monotonic()
+            result = await func(item)
+            self.busy[name] += time.monotonic() - started
+
+            if output is not None and result is not None:
+                await output.put(result)
+
+        if output is not None:
+            await output.put(_DONE)
+
+    def stats(self) -> Dict[str, float]:
+        """Aktive Zeit pro Stage in Sekunden"""
+        return {name: round(seconds, 3) for name, seconds in self.busy.items()}
@@ -3,11 +3,29 @@ Document Processor
 Verarbeitet Dokumente aus der Queue
 """
 import asyncio
-import hashlib
-import aiohttp
-from pathlib import Path
-from typing import Optional, Dict, Any
 import logging
+import posixpath
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from src.clients.http_client import AdaptiveLimiter, HttpClients
+from src.config import get_settings
+from src.observability.metrics import JOB_DURATION, JOBS, observe_stage, timed_stage
+from src.observability.tracing import mark_error, span
+from src.processing.chunking import Chunk, ChunkIds, batched, create_chunker
+from src.processing.dedup import ContentIndex, document_id_for
+from src.processing.embedder import BatchEmbedder
+from src.processing.embedding_cache import create_embedding_cache
+from src.processing.extraction import ExtractionError, ExtractionPool
+from src.processing.pii import create_pii_redactor
+from src.processing.pipeline import StagePipeline
+from src.processing.vector_uploader import VectorUploader
+from src.queue.admission import AdmissionRejectedError
+from src.queue.queue_manager import PRIORITY_BULK
+from src.storage.archives import ArchiveLimitError, extract_to_spool, is_archive, take
+from src.storage.blob_spool import BlobSpool, BlobTooLargeError
 
 logger = logging.getLogger(__name__)
 
@@ -17,68 +35,331 @@ class DocumentProcessor:
 
     def __init__(self, queue_manager):
         self.queue_manager = queue_manager
-        self.processing = False
-
-    async def start_processing(self):
-        """Verarbeitungs-Loop starten"""
-        if self.processing:
-            logger.warning("Processing already running")
-            return
-
-        self.processing = True
-        logger.info("Started document processing loop")
-
-        while self.processing:
-            try:
-                job = await self.queue_manager.dequeue()
 
-                if job:
-                    await self.process_job(job)
-                else:
-                    # Keine Jobs, kurz warten
-                    await asyncio.sleep(1)
-
-            except Exception as e:
-                logger.error(f"Error in processing loop: {e}")
-                await asyncio.sleep(5)
-
-    async def stop_processing(self):
-        """Verarbeitungs-Loop stoppen"""
-        self.processing = False
-        logger.info("Stopped document processing loop")
+        settings = get_settings()
+        # Geteilte Keep-Alive-Clients für alle Jobs dieses Prozesses
+        self.http = HttpClients(settings)
+        self.embedding_cache = create_embedding_cache(settings)
+        # Gemeinsame, adaptive Obergrenze der Embedding-Requests aller Worker dieses Prozesses
+        self.embedding_limiter = (
+            AdaptiveLimiter(
+                "llm-gateway",
+                maximum=settings.embedding_concurrency_max
+                or settings.ingestion_workers * settings.embedding_concurrency,
+                minimum=settings.embedding_concurrency_min,
+                latency_target=settings.embedding_latency_target,
+            )
+            if settings.embedding_adaptive_concurrency
+            else None
+        )
+        self.embedder = BatchEmbedder(
+            self.http.gateway,
+            model=settings.embedding_model,
+            max_batch_items=settings.embedding_batch_size,
+            max_batch_tokens=settings.embedding_batch_tokens,
+            concurrency=settings.embedding_concurrency,
+            max_retries=settings.embedding_max_retries,
+            retry_backoff=settings.embedding_retry_backoff,
+            cache=self.embedding_cache,
+            limiter=self.embedding_limiter,
+        )
+        self.vector_uploader = VectorUploader(
+            self.http.rag,
+            max_batch_bytes=settings.vector_upsert_batch_bytes,
+            max_batch_items=settings.vector_upsert_batch_size,
+            concurrency=settings.vector_upsert_concurrency,
+            max_retries=settings.vector_upsert_max_retries,
+            retry_backoff=settings.vector_upsert_retry_backoff,
+            encoding=settings.vector_upsert_encoding,
+            compression=settings.vector_upsert_compression,
+        )
+        self.chunker = create_chunker(
+            settings.chunk_strategy, settings.chunk_size, settings.chunk_overlap
+        )
+        self.chunk_batch_size = max(1, settings.chunk_batch_size)
+        self.pipeline_queue_size = settings.pipeline_queue_size
+        self.pii_redactor = create_pii_redactor(settings)
+        self.content_index = ContentIndex(queue_manager)
+        self.spool = BlobSpool(
+            settings.spool_dir,
+            chunk_size=settings.spool_chunk_size,
+            max_bytes=settings.upload_max_bytes,
+        )
+        self.bulk_max_files = settings.bulk_max_files
+        self.bulk_max_bytes = settings.bulk_max_bytes
+        self.bulk_enqueue_batch_size = max(1, settings.bulk_enqueue_batch_size)
+        self.extraction = ExtractionPool(
+            processes=settings.extraction_processes,
+            timeout=settings.extraction_timeout,
+            memory_limit=settings.extraction_memory_limit,
+            max_tasks_per_child=settings.extraction_max_tasks_per_child,
+        )
+
+    async def close(self):
+        """Ressourcen freigeben"""
+        await self.http.close()
+        if self.embedding_cache:
+            await self.embedding_cache.close()
+        await asyncio.to_thread(self.extraction.close)
 
     async def enqueue_document(
-        self, filename: str, content: bytes, knowledge_space_id: Optional[str] = None
+        self,
+        filename: str,
+        content: bytes,
+        knowledge_space_id: Optional[str] = None,
+        source: Optional[str] = None,
+        priority: str = PRIORITY_BULK,
+        document_id: Optional[str] = None,
+    ) -> str:
+        """Bereits geladenes Dokument zur Verarbeitung einreihen"""
+        blob = await self.spool.write_bytes(content)
+        return await self.enqueue_blob(
+            filename, blob, knowledge_space_id, source, priority, document_id
+        )
+
+    async def enqueue_blob(
+        self,
+        filename: str,
+        blob: Dict[str, Any],
+        knowledge_space_id: Optional[str] = None,
+        source: Optional[str] = None,
+        priority: str = PRIORITY_BULK,
+        document_id: Optional[str] = None,
     ) -> str:
-        """Dokument zur Verarbeitung einreihen"""
-        # Dokument-ID generieren (basierend auf Content-Hash)
-        content_hash = hashlib.sha256(content).hexdigest()
-        document_id = f"doc_{content_hash[:16]}"
+        """Gespoolten Blob einreihen; die Queue enthält nur die Referenz (Pfad, Größe, Hash)"""
+        content_hash = blob["sha256"]
+        document_id = self._document_id(content_hash, knowledge_space_id, source, document_id)
+
+        # Nur dasselbe Dokument überspringen; eine andere Quelle mit gleichem Inhalt wird ein
+        # eigenes Dokument (Embeddings kommen dann aus dem Cache)
+        existing_id = await self.content_index.find_duplicate(content_hash, knowledge_space_id)
+        if existing_id == document_id:
+            logger.info(f"Skipping unchanged document {filename} ({document_id})")
+            self.spool.delete(blob)
+            return existing_id
 
         job_data = {
             "document_id": document_id,
             "filename": filename,
-            "content": content.decode("utf-8", errors="ignore"),
+            "blob": blob,
+            "content_hash": content_hash,
             "knowledge_space_id": knowledge_space_id,
         }
 
-        job_id = await self.queue_manager.enqueue(job_data)
+        await self.queue_manager.enqueue(job_data, priority)
         return document_id
 
-    async def process_job(self, job: Dict[str, Any]):
-        """Job verarbeiten"""
+    async def enqueue_blobs(
+        self,
+        entries: List[Tuple[str, Dict[str, Any], Optional[str]]],
+        knowledge_space_id: Optional[str] = None,
+        priority: str = PRIORITY_BULK,
+        batch_id: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Mehrere gespoolte Blobs (Dateiname, Blob, Quelle) mit wenigen Round-Trips einreihen"""
+        duplicates = await self.content_index.find_duplicates(
+            [blob["sha256"] for _, blob, _ in entries], knowledge_space_id
+        )
+
+        results: List[Dict[str, Any]] = []
+        jobs: List[Dict[str, Any]] = []
+        skipped: List[Dict[str, Any]] = []
+        for (filename, blob, source), existing_id in zip(entries, duplicates):
+            document_id = self._document_id(blob["sha256"], knowledge_space_id, source)
+            if existing_id == document_id:
+                skipped.append(blob)
+                results.append(
+                    {"filename": filename, "document_id": document_id, "status": "skipped"}
+                )
+                continue
+
+            jobs.append({
+                "document_id": document_id,
+                "filename": filename,
+                "blob": blob,
+                "content_hash": blob["sha256"],
+                "knowledge_space_id": knowledge_space_id,
+            })
+            results.append({"filename": filename, "document_id": document_id, "status": "queued"})
+
+        if jobs:
+            await self.queue_manager.enqueue_many(jobs, priority, batch_id)
+
+        for blob in skipped:
+            self.spool.delete(blob)
+        return results
+
+    async def ingest_bulk(
+        self,
+        files: List[Any],
+        knowledge_space_id: Optional[str] = None,
+        priority: str = PRIORITY_BULK,
+        admission=None,
+    ) -> Dict[str, Any]:
+        """Mehrere Uploads bzw. ZIP-/TAR-Archive als Batch einreihen.
+
+        Archive werden eintragsweise in den Spool entpackt; eingereiht wird in Gruppen von
+        bulk_enqueue_batch_size Dokumenten (je eine Redis-Pipeline), damit Worker schon
+        während des Entpackens beginnen können. Mit admission wird jede Gruppe einzeln
+        zugelassen; AdmissionRejectedError bricht den Upload ab, bereits eingereihte Jobs
+        laufen weiter.
+        """
+        if admission:
+            # Nur den Bestand prüfen, bevor der Batch angelegt wird; gezählt wird pro Gruppe
+            await admission.check(knowledge_space_id, 0)
+
+        batch_id = f"batch_{uuid.uuid4().hex[:16]}"
+        await self.queue_manager.create_batch(
+            batch_id, knowledge_space_id=knowledge_space_id, priority=priority
+        )
+
+        documents: List[Dict[str, Any]] = []
+        pending: List[Tuple[str, Dict[str, Any], Optional[str]]] = []
+        rejected = 0
+
+        async def flush():
+            if not pending:
+                return
+            if admission:
+                try:
+                    await admission.check(knowledge_space_id, len(pending))
+                except AdmissionRejectedError:
+                    for _, blob, _ in pending:
+                        self.spool.delete(blob)
+                    pending.clear()
+                    raise
+            documents.extend(
+                await self.enqueue_blobs(pending, knowledge_space_id, priority, batch_id)
+            )
+            pending.clear()
+
+        for upload in files:
+            filename = upload.filename or "unknown"
+
+            if not is_archive(filename):
+                try:
+                    blob = await self.spool.write_upload(upload)
+                except BlobTooLargeError as e:
+                    rejected += 1
+                    documents.append({"filename": filename, "status": "rejected", "error": str(e)})
+                    continue
+                pending.append((filename, blob, None))
+            else:
+                entries = extract_to_spool(
+                    self.spool,
+                    upload.file,
+                    filename,
+                    max_files=self.bulk_max_files,
+                    max_bytes=self.bulk_max_bytes,
+                )
+                try:
+                    while True:
+                        # Entpacken blockiert, daher schrittweise im Thread
+                        chunk = await asyncio.to_thread(take, entries, self.bulk_enqueue_batch_size)
+                        if not chunk:
+                            break
+                        for entry in chunk:
+                            name = entry["name"]
+                            if "error" in entry:
+                                rejected += 1
+                                documents.append(
+                                    {"filename": name, "status": "rejected", "error": entry["error"]}
+                                )
+                            else:
+                                # Pfad im Archiv als stabile Quelle (gleiche Dokument-ID bei erneutem Import)
+                                pending.append(
+                                    (posixpath.basename(name), entry["blob"], f"{filename}/{name}")
+                                )
+                        if len(pending) >= self.bulk_enqueue_batch_size:
+                            await flush()
+                except ArchiveLimitError as e:
+                    # Noch nicht eingereihte Blobs freigeben (eigene Links, Jobs mit demselben
+                    # Inhalt behalten ihren); bereits eingereihte laufen weiter
+                    for blob in [blob for _, blob, _ in pending] + e.blobs:
+                        self.spool.delete(blob)
+                    raise
+
+            if len(pending) >= self.bulk_enqueue_batch_size:
+                await flush()
+
+        await flush()
+
+        skipped = sum(1 for document in documents if document["status"] == "skipped")
+        await self.queue_manager.update_batch(batch_id, {"skipped": skipped, "rejected": rejected})
+        queued = sum(1 for document in documents if document["status"] == "queued")
+        logger.info(
+            f"Bulk upload {batch_id}: {queued} queued, {skipped} skipped, {rejected} rejected"
+        )
+
+        return {
+            "batch_id": batch_id,
+            "queued": queued,
+            "skipped": skipped,
+            "rejected": rejected,
+            "documents": documents,
+        }
+
+    @staticmethod
+    def _document_id(
+        content_hash: str,
+        knowledge_space_id: Optional[str],
+        source: Optional[str] = None,
+        document_id: Optional[str] = None,
+    ) -> str:
+        """Dokument-ID: vom Aufrufer vorgegeben, stabil pro Quelle (Watcher-Pfad, Pfad im Archiv)
+        oder ohne Quelle pro Inhalt.
+
+        Nur eine stabile Quelle erlaubt inkrementelle Updates; der Dateiname allein genügt nicht,
+        sonst löscht ein gleichnamiger, fremder Upload die Chunks des ersten Dokuments.
+        """
+        if document_id:
+            return document_id
+        return document_id_for(source or f"sha256:{content_hash}", knowledge_space_id)
+
+    async def process_job(self, job: Dict[str, Any]) -> bool:
+        """Job verarbeiten und bestätigen (ack) bzw. zum Retry zurückgeben (nack)"""
+        job_data = job["data"]
+        started = time.perf_counter()
+
+        attributes = {
+            "job.id": job["id"],
+            "job.priority": job.get("priority"),
+            "job.attempts": job.get("attempts", 0),
+            "document.id": job_data.get("document_id"),
+            "knowledge_space.id": job_data.get("knowledge_space_id"),
+        }
+        with span("ingestion.job", **attributes) as current:
+            outcome = await self._process_job(job)
+            if outcome != "completed":
+                mark_error(current, outcome)
+
+        JOB_DURATION.labels(outcome).observe(time.perf_counter() - started)
+        JOBS.labels(outcome).inc()
+        return outcome == "completed"
+
+    async def _process_job(self, job: Dict[str, Any]) -> str:
+        """Ergebnis: completed, failed (Retry bzw. Dead Letter) oder rejected (nicht lesbar)"""
         job_id = job["id"]
         job_data = job["data"]
 
         try:
             logger.info(f"Processing job: {job_id}")
 
-            # Status: Processing
-            await self.queue_manager.update_status(job_id, "processing", progress=0.1)
+            # Fortschritt (gedrosselt und gebündelt geschrieben)
+            self.queue_manager.update_progress(job_id, 0.1)
 
             document_id = job_data.get("document_id")
             filename = job_data.get("filename")
-            content = job_data.get("content", "")
+            blob = job_data.get("blob")
+            if blob:
+                # Format erkennen und Text extrahieren (PDF/DOCX/HTML im Prozess-Pool)
+                with timed_stage("extract", size=blob.get("size")) as current:
+                    mime_type, content = await self.extraction.extract(blob, filename)
+                    if current is not None:
+                        current.set_attribute("document.mime_type", mime_type)
+                logger.info(f"Extracted {len(content)} characters from {filename} ({mime_type})")
+            else:
+                content = job_data.get("content", "")
             knowledge_space_id = job_data.get("knowledge_space_id")
 
             # 1. Dokument in DB speichern (wenn nicht vorhanden)
@@ -87,27 +368,111 @@ class DocumentProcessor:
 
             # 2. Dokument verarbeiten über Document-Processor-Service
             # (Für jetzt: Direkte Verarbeitung, später: HTTP-Call zu Node-Service)
-            await self.queue_manager.update_status(job_id, "processing", progress=0.3)
-
-            # Chunking (vereinfacht)
-            chunks = self._chunk_content(content, document_id)
-
-            await self.queue_manager.update_status(job_id, "processing", progress=0.5)
-
-            # Embeddings generieren (über LLM-Gateway)
-            embeddings = await self._generate_embeddings(chunks)
-
-            await self.queue_manager.update_status(job_id, "processing", progress=0.7)
-
-            # PII-Redaction (vereinfacht)
-            redacted_chunks = self._redact_pii(chunks)
-
-            await self.queue_manager.update_status(job_id, "processing", progress=0.8)
-
-            # In Vector Store speichern (über RAG-Service)
-            await self._store_vectors(document_id, redacted_chunks, embeddings, knowledge_space_id)
+            self.queue_manager.update_progress(job_id, 0.3)
+
+            # Nur neue bzw. geänderte Chunks verarbeiten, entfernte löschen
+            stored_ids = await self.content_index.get_chunk_ids(document_id)
+            current_ids: Set[str] = set()
+            added: List[str] = []
+            new_count = 0
+            ids = ChunkIds(document_id)
+            pii_counts: Dict[str, int] = {}
+            redacted_until = 0
+
+            def redact_batch(batch: List[Chunk]) -> Optional[List[Chunk]]:
+                """PII eines Batches redigieren (Bereich einmal gescannt), Chunk-IDs aus dem
+                redigierten Inhalt bilden und nur neue Chunks weiterreichen
+                """
+                nonlocal new_count, redacted_until
+                texts, findings = self.pii_redactor.redact_spans(
+                    content, [(chunk.start, chunk.end) for chunk in batch]
+                )
+                for finding in findings:
+                    # Overlap zum vorigen Batch nicht doppelt zählen
+                    if finding.start >= redacted_until:
+                        pii_counts[finding.type] = pii_counts.get(finding.type, 0) + 1
+                redacted_until = max(redacted_until, batch[-1].end)
+
+                for chunk, text in zip(batch, texts):
+                    if text is not None:
+                        chunk.text = text
+                    chunk.id = ids(chunk.content)
+                current_ids.update(chunk.id for chunk in batch)
+                new_chunks = [chunk for chunk in batch if chunk.id not in stored_ids]
+                new_count += len(new_chunks)
+                return new_chunks or None
+
+            async def redact(batch: List[Chunk]):
+                # PII vor dem Embedding redigieren (im Thread, blockiert den Event Loop nicht)
+                with span("ingestion.redact", chunks=len(batch)):
+                    return await asyncio.to_thread(redact_batch, batch)
+
+            async def embed(new_chunks: List[Chunk]):
+                # Embeddings generieren (über LLM-Gateway)
+                with span("ingestion.embed", chunks=len(new_chunks)):
+                    return new_chunks, await self._generate_embeddings(new_chunks)
+
+            async def store(item):
+                # In Vector Store speichern (über RAG-Service)
+                new_chunks, embeddings = item
+                with span("ingestion.store", chunks=len(new_chunks)):
+                    added.extend(
+                        await self._store_vectors(
+                            document_id, new_chunks, embeddings, knowledge_space_id
+                        )
+                    )
+                progress = 0.3 + 0.5 * (new_chunks[-1].end / len(content))
+                self.queue_manager.update_progress(job_id, round(progress, 2))
+
+            # Chunking, Redaction, Embedding und Speicherung laufen überlappend: während
+            # Batch n eingebettet wird, wird Batch n-1 gespeichert und Batch n+1 erzeugt und
+            # redigiert. Chunks werden im Thread erzeugt (Batch für Batch)
+            pipeline = (
+                StagePipeline(queue_size=self.pipeline_queue_size, source_name="chunk")
+                .add_stage("redact", redact)
+                .add_stage("embed", embed)
+                .add_stage("store", store)
+            )
+            with span("ingestion.pipeline"):
+                await pipeline.run(
+                    batched(self.chunker.chunk(content, document_id), self.chunk_batch_size)
+                )
+            if pii_counts:
+                logger.info(f"Redacted PII in {document_id}: {pii_counts}")
+
+            # Stages überlappen sich; erfasst wird die aktive Zeit jeder Stage
+            text_bytes = len(content.encode("utf-8", "surrogatepass"))
+            observe_stage("chunk", pipeline.busy["chunk"], size=text_bytes, chunks=len(current_ids))
+            observe_stage("redact", pipeline.busy["redact"], size=text_bytes)
+            observe_stage("embed", pipeline.busy["embed"], chunks=new_count)
+            observe_stage("store", pipeline.busy["store"], chunks=len(added))
+
+            removed_ids = stored_ids - current_ids
+            logger.info(
+                f"Document {document_id}: {len(current_ids)} chunks, {new_count} new, "
+                f"{len(removed_ids)} removed (stage time: {pipeline.stats()})"
+            )
+            deleted: List[str] = []
+            if removed_ids:
+                with timed_stage("delete", chunks=len(removed_ids)):
+                    deleted = await self._delete_vectors(removed_ids)
+
+            # Index erst nach erfolgreichem Speichern fortschreiben; das Dokument gilt nur als
+            # vollständig verarbeitet, wenn alle neuen Chunks gespeichert wurden
+            complete = len(added) == new_count
+            await self.content_index.commit(
+                document_id,
+                job_data.get("content_hash") if complete else None,
+                knowledge_space_id,
+                added=added,
+                removed=deleted,
+            )
+            if not complete:
+                raise RuntimeError(
+                    f"{new_count - len(added)} chunks not embedded or stored, retrying"
+                )
 
-            await self.queue_manager.update_status(job_id, "processing", progress=0.9)
+            self.queue_manager.update_progress(job_id, 0.9)
 
             # Chunks in DB speichern
             # TODO: Integration mit DB über HTTP API
@@ -116,159 +481,116 @@ class DocumentProcessor:
             # Status: Completed
             await self.queue_manager.update_status(job_id, "completed", progress=1.0)
 
+            await self.queue_manager.ack(job)
+            if blob:
+                self.spool.delete(blob)
+
             logger.info(f"Job completed: {job_id}")
+            return "completed"
+
+        except ExtractionError as e:
+            # Defekte bzw. nicht lesbare Dokumente scheitern bei jedem Versuch gleich
+            logger.error(f"Job failed permanently: {job_id} - {e}")
+            await self.queue_manager.nack(job, str(e), retry=False)
+            return "rejected"
 
         except Exception as e:
             logger.error(f"Job failed: {job_id} - {e}")
-            await self.queue_manager.update_status(
-                job_id, "failed", error=str(e)
-            )
-
-    def _chunk_content(self, content: str, document_id: str, chunk_size: int = 1000, overlap: int = 200) -> list:
-        """Einfaches Chunking"""
-        chunks = []
-        start = 0
-        chunk_index = 0
-
-        while start < len(content):
-            end = min(start + chunk_size, len(content))
-            chunk_content = content[start:end]
-
-            chunks.append({
-                "id": f"{document_id}_chunk_{chunk_index}",
-                "document_id": document_id,
-                "content": chunk_content,
-                "chunk_index": chunk_index,
-                "start_char": start,
-                "end_char": end,
-                "metadata": {
-                    "strategy": "fixed",
-                    "chunk_size": chunk_size,
-                    "overlap": overlap,
-                },
-            })
-
-            start = end - overlap
-            chunk_index += 1
-
-        return chunks
-
-    async def _generate_embeddings(self, chunks: list) -> list:
-        """Embeddings über LLM-Gateway generieren"""
-        import os
-
-        embeddings = []
-        llm_gateway_url = os.getenv("LLM_GATEWAY_URL", "http://localhost:3002")
-
-        async with aiohttp.ClientSession() as session:
-            for chunk in chunks:
-                try:
-                    # Embedding über LLM-Gateway anfordern
-                    async with session.post(
-                        f"{llm_gateway_url}/v1/embeddings",
-                        json={
-                            "model": "text-embedding-3-small",
-                            "input": chunk["content"],
-                        },
-                        headers={"Content-Type": "application/json"},
-                    ) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            embedding = data.get("data", [{}])[0].get("embedding", [])
-                            embeddings.append(embedding)
-                        else:
-                            logger.warning(f"Failed to generate embedding for chunk {chunk['id']}")
-                            embeddings.append([])  # Fallback: leeres Embedding
-                except Exception as e:
-                    logger.error(f"Error generating embedding: {e}")
-                    embeddings.append([])
-
-        return embeddings
-
-    def _redact_pii(self, chunks: list) -> list:
-        """Einfache PII-Redaction (vereinfacht)"""
-        import re
-
-        pii_patterns = {
-            "email": r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b",
-            "phone": r"\b(\+49|0)[1-9]\d{1,14}\b",
-            "iban": r"\b[A-Z]{2}\d{2}[A-Z0-9]{4}\d{7}([A-Z0-9]?){0,16}\b",
-        }
-
-        redacted_chunks = []
-        for chunk in chunks:
-            content = chunk["content"]
-            for pii_type, pattern in pii_patterns.items():
-                content = re.sub(pattern, f"[{pii_type.upper()}_REDACTED]", content)
-
-            redacted_chunk = chunk.copy()
-            redacted_chunk["content"] = content
-            redacted_chunk["metadata"]["pii_redacted"] = True
-            redacted_chunks.append(redacted_chunk)
-
-        return redacted_chunks
-
-    async def _store_vectors(self, document_id: str, chunks: list, embeddings: list, knowledge_space_id: Optional[str]):
-        """Vektoren in Vector Store speichern (über RAG-Service)"""
-        import os
-
-        rag_service_url = os.getenv("RAG_SERVICE_URL", "http://localhost:3005")
-
+            await self.queue_manager.nack(job, str(e))
+            return "failed"
+
+    async def _generate_embeddings(self, chunks: List[Chunk]) -> list:
+        """Embeddings über LLM-Gateway generieren (gebündelt)"""
+        return await self.embedder.embed([chunk.content for chunk in chunks])
+
+    async def _store_vectors(
+        self,
+        document_id: str,
+        chunks: Iterable[Chunk],
+        embeddings: list,
+        knowledge_space_id: Optional[str],
+    ) -> List[str]:
+        """Vektoren in Vector Store speichern (über RAG-Service), gibt gespeicherte IDs zurück"""
         # Vektoren für RAG-Service vorbereiten
         vectors = []
         for chunk, embedding in zip(chunks, embeddings):
             if embedding:  # Nur wenn Embedding vorhanden
                 vectors.append({
-                    "id": chunk["id"],
-                    "content": chunk["content"],
+                    "id": chunk.id,
+                    "content": chunk.content,
                     "embedding": embedding,
                     "metadata": {
-                        **chunk["metadata"],
+                        **chunk.metadata,
+                        "chunk_index": chunk.index,
+                        "start_char": chunk.start,
+                        "end_char": chunk.end,
+                        "pii_redacted": bool(self.pii_redactor.detectors),
                         "document_id": document_id,
                         "knowledge_space_id": knowledge_space_id,
                     },
                 })
 
-        if vectors:
-            try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(
-                        f"{rag_service_url}/vectors/upsert",
-                        json={"vectors": vectors},
-                        headers={"Content-Type": "application/json"},
-                    ) as response:
-                        if response.status != 200:
-                            logger.warning(f"Failed to store vectors: {response.status}")
-            except Exception as e:
-                logger.error(f"Error storing vectors: {e}")
-
-    async def handle_file(self, file_path: str):
-        """Datei-Event verarbeiten"""
+        # Batches, die auch nach Retries scheitern, fehlen in der Rückgabe; der Job wird
+        # dann erneut versucht und sendet nur die fehlenden Chunks
+        return await self.vector_uploader.upsert(vectors)
+
+    async def _delete_vectors(self, chunk_ids: Set[str]) -> List[str]:
+        """Entfernte Chunks aus dem Vector Store löschen, gibt gelöschte IDs zurück"""
+        if not chunk_ids:
+            return []
+
+        ids = sorted(chunk_ids)
+
+        try:
+            async with self.http.rag.post(
+                "/vectors/delete",
+                json={"ids": ids},
+                headers={"Content-Type": "application/json"},
+            ) as response:
+                if response.status != 200:
+                    logger.warning(f"Failed to delete vectors: {response.status}")
+                    return []
+        except Exception as e:
+            # Nicht gelöschte IDs bleiben im Index und werden beim nächsten Lauf erneut gelöscht
+            logger.error(f"Error deleting vectors: {e}")
+            return []
+
+        return ids
+
+    async def handle_file(self, file_path: str, known_hash: Optional[str] = None) -> Optional[str]:
+        """Datei einreihen; gibt den Inhalts-Hash zurück (None bei Fehler).
+
+        Stimmt der Hash mit known_hash überein (Inhalt unverändert), wird nichts eingereiht.
+        """
         try:
             path = Path(file_path)
 
-            if not path.exists():
+            if not path.is_file():
                 logger.warning(f"File does not exist: {file_path}")
-                return
+                return None
 
-            # Datei lesen
-            with open(path, "rb") as f:
-                content = f.read()
+            # Datei blockweise in den Spool kopieren (dabei gehasht)
+            blob = await self.spool.write_file(str(path))
+            if blob["sha256"] == known_hash:
+                self.spool.delete(blob)
+                logger.debug(f"File unchanged, skipping: {file_path}")
+                return known_hash
 
-            # Zur Verarbeitung einreihen
-            await self.enqueue_document(path.name, content)
+            # Zur Verarbeitung einreihen (Pfad als stabile Quelle)
+            await self.enqueue_blob(path.name, blob, source=str(path.resolve()))
 
             logger.info(f"File queued for processing: {file_path}")
+            return blob["sha256"]
 
         except Exception as e:
             logger.error(f"Error handling file: {file_path} - {e}")
+            return None
 
     async def get_status(self, document_id: str) -> Optional[Dict[str, Any]]:
-        """Status eines Dokuments abrufen"""
-        # TODO: Status aus Queue oder DB abrufen
-        # Für jetzt: Placeholder
-        return {
-            "document_id": document_id,
-            "status": "processing",
-            "progress": 0.5,
-        }
+        """Status des zuletzt eingereihten Jobs eines Dokuments abrufen"""
+        statuses = await self.queue_manager.get_document_statuses([document_id])
+        return statuses[document_id]
+
+    async def get_statuses(self, document_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Status mehrerer Dokumente in einem Aufruf abrufen"""
+        return await self.queue_manager.get_document_statuses(document_ids)
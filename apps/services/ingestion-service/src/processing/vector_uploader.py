@@ -0,0 +1,178 @@
+"""
+Vector Uploader
+Teilt Upserts an den RAG-Service in größenbegrenzte, komprimierte Batches mit Retries
+"""
+import asyncio
+import base64
+import gzip
+import json
+import logging
+import sys
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import aiohttp
+
+from src.clients.http_client import CircuitOpenError, ServiceClient
+from src.processing.embedder import RETRYABLE_STATUS
+
+logger = logging.getLogger(__name__)
+
+# Kodierung der Embeddings im Request-Body
+ENCODINGS = ("json", "float32")
+COMPRESSIONS = ("gzip", "none")
+
+
+class UpsertRequestError(Exception):
+    """Upsert-Request fehlgeschlagen"""
+
+    def __init__(self, message: str, retryable: bool = True, status: Optional[int] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.status = status
+
+
+def encode_float32(vector: Sequence[float]) -> str:
+    """Vektor als Base64 kodierte float32-Werte (Little Endian)"""
+    values = array("f", vector)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return base64.b64encode(values.tobytes()).decode("ascii")
+
+
+class VectorUploader:
+    """Upserts in Batches (Anzahl und Bytes begrenzt), parallel, mit idempotenten Retries pro Batch"""
+
+    def __init__(
+        self,
+        client: ServiceClient,
+        max_batch_bytes: int = 4 * 1024 * 1024,
+        max_batch_items: int = 256,
+        concurrency: int = 4,
+        max_retries: int = 3,
+        retry_backoff: float = 0.5,
+        encoding: str = "json",
+        compression: str = "gzip",
+        gzip_level: int = 1,
+    ):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unknown vector encoding: {encoding}")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown vector compression: {compression}")
+
+        self.client = client
+        self.max_batch_bytes = max(1, max_batch_bytes)
+        self.max_batch_items = max(1, max_batch_items)
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max(0, max_retries)
+        self.retry_backoff = retry_backoff
+        self.encoding = encoding
+        self.compression = compression
+        self.gzip_level = gzip_level
+
+    async def upsert(self, vectors: List[Dict[str, Any]]) -> List[str]:
+        """Vektoren speichern, gibt die IDs der erfolgreich gespeicherten Vektoren zurück"""
+        if not vectors:
+            return []
+
+        # JSON-Serialisierung ist CPU-lastig, daher im Thread
+        batches = await asyncio.to_thread(self._plan_batches, vectors)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        results = await asyncio.gather(
+            *(self._upsert_batch(semaphore, ids, parts) for ids, parts in batches)
+        )
+        stored = [chunk_id for batch_ids in results for chunk_id in batch_ids]
+
+        if len(stored) < len(vectors):
+            logger.warning(f"Stored {len(stored)} of {len(vectors)} vectors")
+        return stored
+
+    def _encode(self, vector: Dict[str, Any]) -> bytes:
+        if self.encoding == "float32":
+            vector = {**vector, "embedding": encode_float32(vector["embedding"])}
+        return json.dumps(vector, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+    def _plan_batches(self, vectors: List[Dict[str, Any]]) -> List[Tuple[List[str], List[bytes]]]:
+        """Vektoren einzeln serialisieren und in Batches bis max_batch_bytes aufteilen"""
+        batches: List[Tuple[List[str], List[bytes]]] = []
+        ids: List[str] = []
+        parts: List[bytes] = []
+        size = 0
+
+        for vector in vectors:
+            part = self._encode(vector)
+            if parts and (
+                len(parts) >= self.max_batch_items or size + len(part) > self.max_batch_bytes
+            ):
+                batches.append((ids, parts))
+                ids, parts, size = [], [], 0
+
+            ids.append(vector["id"])
+            parts.append(part)
+            size += len(part) + 1
+
+        if parts:
+            batches.append((ids, parts))
+
+        return batches
+
+    def _body(self, parts: List[bytes]) -> Tuple[bytes, Dict[str, str]]:
+        """Request-Body aus vorserialisierten Vektoren zusammensetzen (ggf. komprimiert)"""
+        if self.encoding == "float32":
+            header = b'{"embedding_encoding":"float32-base64","vectors":['
+        else:
+            header = b'{"vectors":['
+        body = header + b",".join(parts) + b"]}"
+        headers = {"Content-Type": "application/json"}
+
+        if self.compression == "gzip":
+            body = gzip.compress(body, compresslevel=self.gzip_level)
+            headers["Content-Encoding"] = "gzip"
+
+        return body, headers
+
+    async def _upsert_batch(
+        self, semaphore: asyncio.Semaphore, ids: List[str], parts: List[bytes]
+    ) -> List[str]:
+        """Einen Batch senden; Upserts sind über die Chunk-IDs idempotent und dürfen wiederholt werden"""
+        body, headers = await asyncio.to_thread(self._body, parts)
+        last_error: Optional[UpsertRequestError] = None
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                await asyncio.sleep(self.retry_backoff * (2 ** (attempt - 1)))
+            try:
+                async with semaphore:
+                    await self._request(body, headers)
+                return ids
+            except UpsertRequestError as e:
+                last_error = e
+                if not e.retryable:
+                    break
+
+        # Zu großer Request: Batch halbieren und die Hälften einzeln senden
+        if last_error and last_error.status == 413 and len(parts) > 1:
+            middle = len(parts) // 2
+            logger.warning(f"Upsert batch of {len(parts)} too large, splitting")
+            halves = await asyncio.gather(
+                self._upsert_batch(semaphore, ids[:middle], parts[:middle]),
+                self._upsert_batch(semaphore, ids[middle:], parts[middle:]),
+            )
+            return halves[0] + halves[1]
+
+        logger.warning(f"Failed to store {len(ids)} vector(s): {last_error}")
+        return []
+
+    async def _request(self, body: bytes, headers: Dict[str, str]):
+        """Einzelnen /vectors/upsert-Request ausführen"""
+        try:
+            async with self.client.post("/vectors/upsert", data=body, headers=headers) as response:
+                if response.status not in (200, 201, 204):
+                    raise UpsertRequestError(
+                        f"HTTP {response.status}",
+                        retryable=response.status in RETRYABLE_STATUS,
+                        status=response.status,
+                    )
+        except (aiohttp.ClientError, asyncio.TimeoutError, CircuitOpenError) as e:
+            raise UpsertRequestError(str(e) or type(e).__name__) from e
@@ -0,0 +1,278 @@
+"""
+Worker Pool
+Mehrere asynchrone Worker (optional in mehreren Prozessen) für die Dokument-Verarbeitung
+"""
+import asyncio
+import logging
+import multiprocessing
+import signal
+import socket
+import time
+from typing import Any, Dict, List, Optional
+
+from src.observability.metrics import (
+    WORKER_BUSY_SECONDS,
+    WORKERS,
+    WORKERS_BUSY,
+    EventLoopMonitor,
+    mark_process_dead,
+)
+from src.observability.tracing import setup_tracing, shutdown_tracing
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerPool:
+    """Pool asynchroner Worker mit Drain beim Shutdown.
+
+    Das Limit paralleler Jobs pro Knowledge Space (KNOWLEDGE_SPACE_CONCURRENCY) setzt die
+    Queue beim Dequeue durch: Worker entnehmen nur Jobs aus Spaces mit freiem Platz.
+    """
+
+    def __init__(
+        self,
+        queue_manager,
+        processor,
+        workers: int = 4,
+        drain_timeout: float = 30.0,
+        reaper_interval: float = 15.0,
+        name: str = "main",
+    ):
+        self.queue_manager = queue_manager
+        self.processor = processor
+        self.workers = max(0, workers)
+        self.drain_timeout = drain_timeout
+        self.reaper_interval = reaper_interval
+        # Stabile Worker-IDs, damit ein Neustart seine liegengebliebenen Jobs wiederfindet
+        self.worker_prefix = f"{socket.gethostname()}:{name}"
+
+        self._tasks: List[asyncio.Task] = []
+        self._reaper: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._active = 0
+        self._processed = 0
+        self._failed = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks) and not self._stopping
+
+    async def start(self):
+        """Worker starten"""
+        if self._tasks:
+            logger.warning("Worker pool already running")
+            return
+
+        self._stopping = False
+        self._tasks = [
+            asyncio.create_task(self._run_worker(i), name=f"ingestion-worker-{i}")
+            for i in range(self.workers)
+        ]
+        if self.workers:
+            self._reaper = asyncio.create_task(self._run_reaper(), name="ingestion-reaper")
+        WORKERS.inc(self.workers)
+        logger.info(f"Started worker pool with {self.workers} workers")
+
+    async def stop(self, drain: bool = True):
+        """Worker stoppen; mit drain=True laufende Jobs noch abschließen"""
+        if not self._tasks:
+            return
+
+        self._stopping = True
+        tasks, self._tasks = self._tasks, []
+
+        if self._reaper:
+            self._reaper.cancel()
+            await asyncio.gather(self._reaper, return_exceptions=True)
+            self._reaper = None
+
+        if drain:
+            logger.info(f"Draining worker pool ({self._active} jobs in flight)")
+            done, pending = await asyncio.wait(tasks, timeout=self.drain_timeout)
+            if pending:
+                logger.warning(f"Drain timeout reached, cancelling {len(pending)} workers")
+        else:
+            pending = set(tasks)
+
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        WORKERS.dec(len(tasks))
+
+        logger.info("Worker pool stopped")
+
+    def stats(self) -> Dict[str, Any]:
+        """Worker-Statistiken"""
+        return {
+            "workers": len(self._tasks),
+            "active": self._active,
+            "processed": self._processed,
+            "failed": self._failed,
+            "stopping": self._stopping,
+        }
+
+    async def _run_worker(self, index: int):
+        """Worker-Loop: Jobs holen und verarbeiten, bis Stop angefordert wird"""
+        worker_id = f"{self.worker_prefix}:{index}"
+
+        while not self._stopping:
+            try:
+                await self.queue_manager.recover_worker(worker_id)
+                break
+            except Exception as e:
+                logger.error(f"Error recovering worker {worker_id}: {e}")
+                await asyncio.sleep(1)
+
+        while not self._stopping:
+            try:
+                job = await self.queue_manager.dequeue(worker_id)
+                if not job:
+                    continue
+
+                # Bereits entnommene Jobs werden auch während des Drains abgeschlossen
+                heartbeat = asyncio.create_task(self._keep_lease(job))
+                self._active += 1
+                WORKERS_BUSY.inc()
+                started = time.monotonic()
+                try:
+                    if await self.processor.process_job(job):
+                        self._processed += 1
+                    else:
+                        self._failed += 1
+                finally:
+                    heartbeat.cancel()
+                    self._active -= 1
+                    WORKERS_BUSY.dec()
+                    WORKER_BUSY_SECONDS.inc(time.monotonic() - started)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in worker {worker_id}: {e}")
+                await asyncio.sleep(1)
+
+    async def _keep_lease(self, job: Dict[str, Any]):
+        """Lease eines laufenden Jobs regelmäßig verlängern"""
+        interval = max(1.0, self.queue_manager.visibility_timeout / 3)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.queue_manager.extend_lease(job)
+            except Exception as e:
+                logger.warning(f"Failed to extend lease for job {job['id']}: {e}")
+
+    async def _run_reaper(self):
+        """Abgelaufene Leases und fällige Retries periodisch einsammeln"""
+        while True:
+            await asyncio.sleep(self.reaper_interval)
+            try:
+                await self.queue_manager.reap()
+            except Exception as e:
+                logger.error(f"Error in queue reaper: {e}")
+
+
+def run_worker_process(workers: int, drain_timeout: float, name: str):
+    """Einstiegspunkt eines eigenständigen Worker-Prozesses"""
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_serve_worker_process(workers, drain_timeout, name))
+
+
+async def _serve_worker_process(workers: int, drain_timeout: float, name: str):
+    from src.config import get_settings
+    from src.processing.processor import DocumentProcessor
+    from src.queue.queue_manager import create_queue_manager
+
+    settings = get_settings()
+    setup_tracing(settings)
+    loop_monitor = EventLoopMonitor(settings.metrics_loop_lag_interval)
+    loop_monitor.start()
+
+    queue_manager = create_queue_manager(settings)
+    processor = DocumentProcessor(queue_manager)
+    pool = WorkerPool(
+        queue_manager,
+        processor,
+        workers=workers,
+        drain_timeout=drain_timeout,
+        reaper_interval=settings.queue_reaper_interval,
+        name=name,
+    )
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    await pool.start()
+    await stop_event.wait()
+    await pool.stop(drain=True)
+    await processor.close()
+    await queue_manager.close()
+    await loop_monitor.stop()
+    shutdown_tracing()
+
+
+class WorkerProcessManager:
+    """Startet und stoppt zusätzliche Worker-Prozesse"""
+
+    def __init__(
+        self,
+        processes: int,
+        workers: int = 4,
+        drain_timeout: float = 30.0,
+    ):
+        self.processes = max(0, processes)
+        self.workers = workers
+        self.drain_timeout = drain_timeout
+        self._processes: List[multiprocessing.Process] = []
+
+    def start(self):
+        """Worker-Prozesse starten"""
+        context = multiprocessing.get_context("spawn")
+        for i in range(self.processes):
+            process = context.Process(
+                target=run_worker_process,
+                args=(self.workers, self.drain_timeout, f"process-{i}"),
+                name=f"ingestion-worker-process-{i}",
+                # Nicht daemonisch, damit der Prozess einen eigenen Extraktions-Pool starten
+                # kann; beendet wird er explizit über stop()
+                daemon=False,
+            )
+            process.start()
+            self._processes.append(process)
+
+        if self._processes:
+            logger.info(f"Started {len(self._processes)} worker processes")
+
+    async def stop(self):
+        """Worker-Prozesse per SIGTERM zum Drain auffordern und warten"""
+        processes, self._processes = self._processes, []
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+        for process in processes:
+            await asyncio.to_thread(process.join, self.drain_timeout + 5)
+            if process.is_alive():
+                logger.warning(f"Worker process {process.name} did not drain in time, killing")
+                process.kill()
+                await asyncio.to_thread(process.join)
+            mark_process_dead(process.pid)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "processes": len(self._processes),
+            "alive": sum(1 for process in self._processes if process.is_alive()),
+        }
+
+
+if __name__ == "__main__":
+    from src.config import get_settings
+
+    settings = get_settings()
+    if settings.worker_metrics_port:
+        # Ohne API: Metriken dieses Prozesses über einen eigenen Endpunkt
+        from prometheus_client import start_http_server
+
+        start_http_server(settings.worker_metrics_port)
+    run_worker_process(settings.ingestion_workers, settings.worker_drain_timeout, "standalone")
@@ -0,0 +1,187 @@
+"""
+Admission Control
+Nimmt Uploads nur an, solange Queue, Redis-Speicher und LLM-Gateway Luft haben;
+sonst Ablehnung mit geschätzter Wartezeit (HTTP 429 mit Retry-After)
+"""
+import asyncio
+import logging
+import math
+import time
+from typing import Any, Dict, Optional
+
+from src.observability.metrics import ADMISSION_REJECTED
+
+logger = logging.getLogger(__name__)
+
+# Retry-After ohne Durchsatz-Schätzung bzw. höchstens (Sekunden)
+DEFAULT_RETRY_AFTER = 5
+MAX_RETRY_AFTER = 300
+
+# Glättung der Durchsatz-Schätzung (EWMA)
+SMOOTHING = 0.3
+
+
+class AdmissionRejectedError(Exception):
+    """Upload abgelehnt (Grund und empfohlene Wartezeit in Sekunden)"""
+
+    def __init__(self, reason: str, retry_after: int, message: str):
+        super().__init__(message)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Prüft vor dem Einreihen Queue-Tiefe, geschätzte Wartezeit, Quota pro Knowledge Space,
+    Redis-Speicher und Gateway-Latenz.
+
+    Queue und Redis werden höchstens alle ADMISSION_REFRESH_INTERVAL Sekunden gemessen; der
+    Durchsatz (abgeschlossene Jobs/Sekunde, alle Worker) ergibt sich aus den Stunden-Buckets
+    und bestimmt die geschätzte Wartezeit und Retry-After.
+    """
+
+    def __init__(self, queue_manager, settings, limiter=None):
+        self.queue_manager = queue_manager
+        # Limiter der Embedding-Requests (Gateway-Latenz), nur bei Workern im selben Prozess
+        self.limiter = limiter
+        self.max_queued = settings.admission_max_queued
+        self.max_wait = settings.admission_max_wait
+        self.space_max_queued = settings.admission_space_max_queued
+        self.memory_ratio = settings.admission_redis_memory_ratio
+        self.gateway_latency_max = settings.admission_gateway_latency_max
+        self.refresh_interval = settings.admission_refresh_interval
+        self.enabled = bool(
+            self.max_queued
+            or self.max_wait
+            or self.space_max_queued
+            or self.memory_ratio
+            or self.gateway_latency_max
+        )
+
+        self.load: Optional[Dict[str, Any]] = None
+        self.drain_rate: Optional[float] = None
+        self._sampled_at = 0.0
+        self._lock = asyncio.Lock()
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {}
+
+    async def _sample(self) -> Dict[str, Any]:
+        """Last messen (gecacht) und Durchsatz aus der Änderung der Bucket-Zähler schätzen"""
+        if self.load is not None and time.monotonic() - self._sampled_at < self.refresh_interval:
+            return self.load
+
+        async with self._lock:
+            now = time.monotonic()
+            if self.load is not None and now - self._sampled_at < self.refresh_interval:
+                return self.load
+
+            load = await self.queue_manager.get_load(memory=bool(self.memory_ratio))
+            # Nur mit Rückstau messen: bei leerer Queue zeigt der Durchsatz die Ankunftsrate,
+            # nicht die Kapazität der Worker
+            if self.load is not None and (self.load["queued"] or load["queued"]):
+                elapsed = now - self._sampled_at
+                previous = self.load["finished"]
+                # Nur Buckets, die in beiden Messungen vorkommen (Stundenwechsel)
+                finished = sum(
+                    count - previous[name]
+                    for name, count in load["finished"].items()
+                    if name in previous
+                )
+                if elapsed > 0 and finished >= 0:
+                    rate = finished / elapsed
+                    self.drain_rate = (
+                        rate if self.drain_rate is None
+                        else self.drain_rate + SMOOTHING * (rate - self.drain_rate)
+                    )
+
+            self.load = load
+            self._sampled_at = now
+            return load
+
+    def _retry_after(self, excess: float) -> int:
+        """Zeit, bis excess Jobs abgearbeitet sind (beim aktuellen Durchsatz)"""
+        if not self.drain_rate:
+            return DEFAULT_RETRY_AFTER
+        return max(1, min(MAX_RETRY_AFTER, math.ceil(excess / self.drain_rate)))
+
+    def _reject(self, reason: str, retry_after: int, message: str):
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        ADMISSION_REJECTED.labels(reason).inc()
+        raise AdmissionRejectedError(reason, retry_after, message)
+
+    async def check(self, knowledge_space_id: Optional[str], count: int = 1):
+        """count neue Jobs zulassen oder AdmissionRejectedError auslösen (count=0 prüft nur
+        den Bestand).
+
+        Abgelehnt wird, wenn der Bestand die Grenze schon erreicht hat; große Bulk-Uploads
+        bleiben so zulässig, sobald die Queue abgearbeitet ist. Zugelassene Jobs zählen bis
+        zur nächsten Messung zum Bestand, damit ein Archiv, das gruppenweise zugelassen wird,
+        die Grenze nicht innerhalb eines Messintervalls überschreitet.
+        """
+        if not self.enabled:
+            return
+
+        try:
+            load = await self._sample()
+        except Exception as e:
+            # Ohne Messung lieber annehmen; das Einreihen scheitert ggf. ohnehin
+            logger.warning(f"Failed to measure queue load for admission control: {e}")
+            return
+
+        queued = load["queued"]
+
+        if self.max_queued and queued >= self.max_queued:
+            self._reject(
+                "queue_full",
+                self._retry_after(queued + count - self.max_queued),
+                f"Queue is full ({queued} jobs waiting)",
+            )
+
+        if self.max_wait and self.drain_rate and queued / self.drain_rate >= self.max_wait:
+            self._reject(
+                "queue_wait",
+                self._retry_after(queued + count - self.max_wait * self.drain_rate),
+                f"Estimated queue wait of {queued / self.drain_rate:.0f}s exceeds {self.max_wait:.0f}s",
+            )
+
+        if (
+            self.memory_ratio
+            and load["memory_max"]
+            and load["memory_used"] >= self.memory_ratio * load["memory_max"]
+        ):
+            self._reject(
+                "redis_memory",
+                DEFAULT_RETRY_AFTER,
+                f"Redis memory at {load['memory_used'] / load['memory_max']:.0%} of maxmemory",
+            )
+
+        latency = self.limiter.latency if self.limiter else None
+        if self.gateway_latency_max and latency and latency > self.gateway_latency_max:
+            self._reject(
+                "gateway_latency",
+                max(DEFAULT_RETRY_AFTER, math.ceil(latency)),
+                f"LLM gateway is slow ({latency:.1f}s per embedding request)",
+            )
+
+        if self.space_max_queued:
+            depth = await self.queue_manager.get_space_depth(knowledge_space_id)
+            if depth is not None and depth >= self.space_max_queued:
+                self._reject(
+                    "space_quota",
+                    self._retry_after(depth + count - self.space_max_queued),
+                    f"Knowledge space has {depth} jobs waiting (quota {self.space_max_queued})",
+                )
+
+        self.admitted += count
+        load["queued"] += count
+
+    def stats(self) -> Dict[str, Any]:
+        load = self.load or {}
+        return {
+            "queued": load.get("queued"),
+            "drain_rate": round(self.drain_rate, 3) if self.drain_rate is not None else None,
+            "redis_memory_used": load.get("memory_used"),
+            "redis_memory_max": load.get("memory_max"),
+            "gateway_latency": self.limiter.stats() if self.limiter else None,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+        }
@@ -0,0 +1,200 @@
+"""
+Job Codec
+Versioniertes Format für Queue-Einträge: kleiner Klartext-Header (für Lua-Skripte) plus
+binärer Payload (msgpack, optional zstd-komprimiert); JSON-Einträge (v1) bleiben lesbar
+"""
+import json
+import logging
+import zlib
+from typing import Any, Dict, Union
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# v1: JSON-Objekt ({"id", "data", "priority", "attempts", ...})
+# v2: b"\x02" + "key=value" (getrennt durch \x1f) + b"\x1e" + Payload (job["data"]).
+# Unbekannte Header-Felder werden von Lesern ignoriert, neue Felder sind damit kompatibel.
+FORMAT_V2 = 0x02
+HEADER_SEP = b"\x1f"
+HEADER_END = b"\x1e"
+
+# Header-Felder mit Zahlenwert; alle Felder außer data stehen im Header
+INT_FIELDS = ("attempts",)
+
+Raw = Union[str, bytes]
+
+
+class JobCodecError(Exception):
+    """Queue-Eintrag kann nicht gelesen werden (Format/Codec unbekannt bzw. nicht installiert)"""
+
+
+def _to_bytes(raw: Raw) -> bytes:
+    # Redis-Clients dekodieren mit surrogateescape; so kommen die Original-Bytes zurück
+    if isinstance(raw, str):
+        return raw.encode("utf-8", "surrogateescape")
+    return raw
+
+
+def _header_value(value: Any) -> bytes:
+    text = str(value).replace("\x1f", " ").replace("\x1e", " ")
+    return text.encode("utf-8", "surrogateescape")
+
+
+def _build(header: Dict[str, Any], payload: bytes) -> bytes:
+    return b"".join((
+        bytes((FORMAT_V2,)),
+        HEADER_SEP.join(
+            key.encode() + b"=" + _header_value(value)
+            for key, value in header.items()
+            if value is not None
+        ),
+        HEADER_END,
+        payload,
+    ))
+
+
+def _parse(raw: bytes):
+    end = raw.find(HEADER_END)
+    if end < 0:
+        raise JobCodecError("Truncated job header")
+
+    header: Dict[str, Any] = {}
+    for field in raw[1:end].split(HEADER_SEP):
+        key, _, value = field.partition(b"=")
+        header[key.decode()] = value.decode("utf-8", "surrogateescape")
+    for key in INT_FIELDS:
+        if key in header:
+            header[key] = int(header[key] or 0)
+    return header, raw[end + 1:]
+
+
+class JobCodec:
+    """Kodiert Jobs für die Queue; liest alle bekannten Formate unabhängig von der Einstellung"""
+
+    def __init__(
+        self,
+        encoding: str = "msgpack",
+        compression: str = "zstd",
+        compression_threshold: int = 1024,
+        compression_level: int = 3,
+    ):
+        if encoding == "msgpack" and msgpack is None:
+            logger.warning("msgpack not installed, encoding queue payloads as JSON")
+            encoding = "json"
+        if compression == "zstd" and zstandard is None:
+            logger.warning("zstandard not installed, compressing queue payloads with zlib")
+            compression = "zlib"
+        if encoding not in ("json", "msgpack", "json-v1"):
+            raise ValueError(f"Unknown job encoding: {encoding}")
+        if compression not in ("zstd", "zlib", "none"):
+            raise ValueError(f"Unknown job compression: {compression}")
+
+        self.encoding = encoding
+        self.compression = compression
+        self.compression_threshold = compression_threshold
+        self.compression_level = compression_level
+        self._zstd_compressor = None
+        self._zstd_decompressor = None
+
+    # Payload
+
+    def _dump(self, data: Any) -> bytes:
+        if self.encoding == "msgpack":
+            return msgpack.packb(data, use_bin_type=True)
+        return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+    def _compress(self, payload: bytes) -> bytes:
+        if self.compression == "zstd":
+            if self._zstd_compressor is None:
+                self._zstd_compressor = zstandard.ZstdCompressor(level=self.compression_level)
+            return self._zstd_compressor.compress(payload)
+        return zlib.compress(payload, self.compression_level)
+
+    def _load(self, payload: bytes, codec: str) -> Any:
+        encoding, _, compression = codec.partition("+")
+        if compression == "zstd":
+            if zstandard is None:
+                raise JobCodecError("Job payload is zstd-compressed but zstandard is not installed")
+            if self._zstd_decompressor is None:
+                self._zstd_decompressor = zstandard.ZstdDecompressor()
+            payload = self._zstd_decompressor.decompress(payload)
+        elif compression == "zlib":
+            payload = zlib.decompress(payload)
+        elif compression:
+            raise JobCodecError(f"Unknown job payload compression: {compression}")
+
+        if encoding == "msgpack":
+            if msgpack is None:
+                raise JobCodecError("Job payload is msgpack but msgpack is not installed")
+            return msgpack.unpackb(payload, raw=False)
+        if encoding == "json":
+            return json.loads(payload)
+        raise JobCodecError(f"Unknown job payload encoding: {encoding}")
+
+    # Einträge
+
+    def encode(self, job: Dict[str, Any]) -> bytes:
+        """Job (Metadaten + data) als Queue-Eintrag kodieren"""
+        if self.encoding == "json-v1":
+            return json.dumps(job).encode("utf-8")
+
+        payload = self._dump(job.get("data"))
+        codec = self.encoding
+        if self.compression != "none" and len(payload) >= self.compression_threshold:
+            payload = self._compress(payload)
+            codec = f"{codec}+{self.compression}"
+
+        data = job.get("data") or {}
+        header = dict(job)
+        header.pop("data", None)
+        header.setdefault("knowledge_space_id", data.get("knowledge_space_id"))
+        header["codec"] = codec
+        return _build(header, payload)
+
+    def decode(self, raw: Raw) -> Dict[str, Any]:
+        """Queue-Eintrag (v1 oder v2) in ein Job-Dict ({"id", "data", ...}) dekodieren"""
+        raw = _to_bytes(raw)
+        if not raw:
+            raise JobCodecError("Empty job entry")
+        if raw[:1] == b"{":
+            return json.loads(raw)
+        if raw[0] != FORMAT_V2:
+            raise JobCodecError(f"Unsupported job format version: {raw[0]}")
+
+        header, payload = _parse(raw)
+        codec = header.pop("codec", "json")
+        header.pop("knowledge_space_id", None)
+        header["data"] = self._load(payload, codec)
+        return header
+
+    def header(self, raw: Raw) -> Dict[str, Any]:
+        """Nur die Metadaten eines Eintrags lesen (ohne den Payload zu dekodieren)"""
+        raw = _to_bytes(raw)
+        if raw[:1] == b"{":
+            job = json.loads(raw)
+            job.pop("data", None)
+            return job
+
+        header, _ = _parse(raw)
+        return header
+
+    def replace_fields(self, raw: Raw, fields: Dict[str, Any]) -> bytes:
+        """Metadaten ändern (z.B. attempts, last_error), ohne den Payload neu zu kodieren"""
+        raw = _to_bytes(raw)
+        if raw[:1] == b"{":
+            job = json.loads(raw)
+            job.update(fields)
+            return json.dumps(job).encode("utf-8")
+
+        header, payload = _parse(raw)
+        header.update(fields)
+        return _build(header, payload)
@@ -0,0 +1,165 @@
+"""
+Local Store
+Teilmenge der Redis-Befehle im Prozess: Client des In-Memory-Queue-Backends für Komponenten,
+die den Queue-Client mitbenutzen (Content-Index, Blob-Referenzen, Status-Events)
+"""
+import asyncio
+from typing import Any, Dict, List, Optional, Set
+
+
+class LocalPubSub:
+    """Abonnement wie redis.asyncio PubSub (subscribe, get_message, reset)"""
+
+    def __init__(self, store: "LocalStore"):
+        self.store = store
+        self.channels: Set[str] = set()
+        self.messages: asyncio.Queue = asyncio.Queue()
+
+    async def subscribe(self, *channels: str):
+        for channel in channels:
+            self.channels.add(channel)
+            self.store._subscribers.setdefault(channel, set()).add(self)
+
+    async def get_message(self, timeout: Optional[float] = None, **kwargs) -> Optional[Dict[str, Any]]:
+        try:
+            return await asyncio.wait_for(self.messages.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def reset(self):
+        for channel in self.channels:
+            subscribers = self.store._subscribers.get(channel)
+            if subscribers is not None:
+                subscribers.discard(self)
+                if not subscribers:
+                    del self.store._subscribers[channel]
+        self.channels.clear()
+
+
+class LocalPipeline:
+    """Gesammelte Befehle; execute() führt sie ohne Unterbrechung durch andere Tasks aus"""
+
+    def __init__(self, store: "LocalStore"):
+        self.store = store
+        self.commands: List[tuple] = []
+
+    async def __aenter__(self) -> "LocalPipeline":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.commands.clear()
+
+    def __getattr__(self, name: str):
+        command = getattr(self.store, name)
+
+        def queue(*args, **kwargs) -> "LocalPipeline":
+            self.commands.append((command, args, kwargs))
+            return self
+
+        return queue
+
+    async def execute(self) -> List[Any]:
+        commands, self.commands = self.commands, []
+        # Die Befehle warten nie, es kann also kein anderer Task dazwischen laufen
+        return [await command(*args, **kwargs) for command, args, kwargs in commands]
+
+
+class LocalStore:
+    """Strings, Hashes, Sets und Pub/Sub im Prozess (Werte wie bei decode_responses=True)"""
+
+    def __init__(self):
+        self._data: Dict[str, Any] = {}
+        self._subscribers: Dict[str, Set[LocalPubSub]] = {}
+
+    # Strings
+
+    async def get(self, key: str) -> Optional[str]:
+        return self._data.get(key)
+
+    async def mget(self, keys: List[str]) -> List[Optional[str]]:
+        return [self._data.get(key) for key in keys]
+
+    async def set(self, key: str, value: Any) -> bool:
+        self._data[key] = str(value)
+        return True
+
+    async def incr(self, key: str, amount: int = 1) -> int:
+        value = int(self._data.get(key, 0)) + amount
+        self._data[key] = str(value)
+        return value
+
+    async def decr(self, key: str, amount: int = 1) -> int:
+        return await self.incr(key, -amount)
+
+    async def delete(self, *keys: str) -> int:
+        return sum(1 for key in keys if self._data.pop(key, None) is not None)
+
+    async def exists(self, *keys: str) -> int:
+        return sum(1 for key in keys if key in self._data)
+
+    # Hashes
+
+    async def hget(self, name: str, key: str) -> Optional[str]:
+        return self._data.get(name, {}).get(key)
+
+    async def hset(
+        self,
+        name: str,
+        key: Optional[str] = None,
+        value: Any = None,
+        mapping: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        record = self._data.setdefault(name, {})
+        items = dict(mapping or {})
+        if key is not None:
+            items[key] = value
+        added = sum(1 for field in items if field not in record)
+        record.update({field: str(item) for field, item in items.items()})
+        return added
+
+    async def hdel(self, name: str, *keys: str) -> int:
+        record = self._data.get(name, {})
+        removed = sum(1 for key in keys if record.pop(key, None) is not None)
+        if not record:
+            self._data.pop(name, None)
+        return removed
+
+    # Sets
+
+    async def sadd(self, name: str, *values: str) -> int:
+        members = self._data.setdefault(name, set())
+        added = len(set(values) - members)
+        members.update(values)
+        return added
+
+    async def srem(self, name: str, *values: str) -> int:
+        members = self._data.get(name, set())
+        removed = len(members & set(values))
+        members.difference_update(values)
+        if not members:
+            self._data.pop(name, None)
+        return removed
+
+    async def smembers(self, name: str) -> Set[str]:
+        return set(self._data.get(name, ()))
+
+    # Pub/Sub
+
+    def subscribed(self, channel: str) -> bool:
+        return channel in self._subscribers
+
+    def deliver(self, channel: str, message: str) -> int:
+        """Nachricht ohne await an alle Abonnenten verteilen"""
+        subscribers = self._subscribers.get(channel, ())
+        for subscriber in subscribers:
+            subscriber.messages.put_nowait({"type": "message", "channel": channel, "data": message})
+        return len(subscribers)
+
+    async def publish(self, channel: str, message: str) -> int:
+        return self.deliver(channel, message)
+
+    def pubsub(self, **kwargs) -> LocalPubSub:
+        return LocalPubSub(self)
+
+    def pipeline(self, transaction: bool = True) -> LocalPipeline:
+        return LocalPipeline(self)
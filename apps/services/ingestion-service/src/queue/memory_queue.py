@@ -0,0 +1,676 @@
+"""
+Memory Queue
+Queue-Backend im Prozess (asyncio) für Einzelknoten und Edge-Deployments: keine Netzwerk-Hops,
+nicht persistent
+"""
+import asyncio
+import heapq
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict, deque
+from itertools import islice
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from src.config import get_settings
+from src.queue import stats
+from src.queue.local_store import LocalStore
+from src.queue.progress import ProgressCoalescer
+from src.queue.queue_manager import (
+    PRIORITY_BULK,
+    PRIORITY_CLASSES,
+    STATUS_DATA_FIELDS,
+    STATUS_TTL,
+    format_batch,
+    format_status,
+    observe_queue_wait,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryQueueManager:
+    """Queue Manager im Prozess mit derselben Semantik wie das Redis-Backend (Prioritätsklassen,
+    Fair Share, Rate-Limits, Leases, Retries, Dead Letters, Status und Statistik).
+
+    Alle Operationen laufen ohne await im Event Loop und sind damit atomar. Jobs gehen bei einem
+    Neustart verloren; Worker-Prozesse können die Queue nicht mitbenutzen.
+    """
+
+    def __init__(self):
+        settings = get_settings()
+        self.dequeue_timeout = settings.queue_dequeue_timeout
+        self.visibility_timeout = settings.queue_visibility_timeout
+        self.max_retries = settings.queue_max_retries
+        self.retry_backoff = settings.queue_retry_backoff
+        self.retry_backoff_max = settings.queue_retry_backoff_max
+        self.bulk_every = settings.queue_bulk_every
+        self.scan_limit = settings.queue_scan_limit
+        self.default_weight = settings.knowledge_space_default_weight
+        self.default_rate_limit = settings.knowledge_space_rate_limit
+        self.rate_burst = settings.knowledge_space_rate_burst
+        self.space_concurrency = max(0, settings.knowledge_space_concurrency)
+        self.queue_name = "document_processing"
+        self.events_channel = f"{self.queue_name}:events"
+        self.store = LocalStore()
+        self.progress = ProgressCoalescer(self, settings.status_flush_interval)
+
+        # Scheduler: eine Liste pro (Klasse, Knowledge Space), aktive Spaces mit virtueller Zeit
+        self._queues: Dict[Tuple[str, str], Deque[Dict[str, Any]]] = {}
+        self._active: Dict[str, Dict[str, float]] = {priority: {} for priority in PRIORITY_CLASSES}
+        self._vtime: Dict[str, float] = {priority: 0.0 for priority in PRIORITY_CLASSES}
+        self._depth: Dict[str, int] = {priority: 0 for priority in PRIORITY_CLASSES}
+        self._ticks = 0
+        self._weights: Dict[str, float] = {}
+        self._rates: Dict[str, float] = {}
+        self._tokens: Dict[str, Tuple[float, float]] = {}
+        # Knowledge Space -> IDs der Jobs in Arbeit (KNOWLEDGE_SPACE_CONCURRENCY)
+        self._running: Dict[str, Set[str]] = {}
+        self._waiters: Deque[asyncio.Future] = deque()
+
+        # Job-ID -> (Worker-ID, Job, Lease bis)
+        self._inflight: Dict[str, Tuple[str, Dict[str, Any], float]] = {}
+        # Verzögerte Retries als Heap (fällig ab, laufende Nummer, Job)
+        self._delayed: List[Tuple[float, int, Dict[str, Any]]] = []
+        self._sequence = 0
+        self._dead: Deque[Dict[str, Any]] = deque()
+
+        # Status-Records; Ablaufzeiten in der Reihenfolge des letzten Statuswechsels
+        self._statuses: Dict[str, Dict[str, Any]] = {}
+        self._expiry: "OrderedDict[str, float]" = OrderedDict()
+        self._documents: Dict[str, str] = {}
+        self._batches: Dict[str, Dict[str, Any]] = {}
+        self._batch_expiry: Dict[str, float] = {}
+        self._current: Dict[str, int] = {}
+        self._hourly: Dict[str, Dict[str, float]] = {}
+
+    async def connect(self):
+        """Nichts zu verbinden (Schnittstelle wie beim Redis-Backend)"""
+
+    async def get_client(self) -> LocalStore:
+        """Store im Prozess für andere Komponenten bereitstellen"""
+        return self.store
+
+    async def enqueue(self, job_data: Dict[str, Any], priority: str = PRIORITY_BULK) -> str:
+        """Job in die Queue seiner Prioritätsklasse und seines Knowledge Space einreihen"""
+        job_ids = await self.enqueue_many([job_data], priority)
+        return job_ids[0]
+
+    async def enqueue_many(
+        self,
+        jobs_data: List[Dict[str, Any]],
+        priority: str = PRIORITY_BULK,
+        batch_id: Optional[str] = None,
+    ) -> List[str]:
+        """Mehrere Jobs einreihen (optional als Teil eines Batches)"""
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Unknown priority class: {priority}")
+        if not jobs_data:
+            return []
+
+        now = time.time()
+        created_at = stats.utc_isoformat(now)
+        job_ids: List[str] = []
+
+        for job_data in jobs_data:
+            job_id = str(uuid.uuid4())
+            job_ids.append(job_id)
+
+            fields: Dict[str, Any] = {
+                "id": job_id,
+                "priority": priority,
+                "attempts": 0,
+                "created_at": now,
+                "batch_id": batch_id,
+            }
+            for field in STATUS_DATA_FIELDS:
+                if job_data.get(field) is not None:
+                    fields[field] = job_data[field]
+
+            self._transition(job_id, "queued", fields, create=True, now=now)
+            if job_data.get("document_id"):
+                self._documents[job_data["document_id"]] = job_id
+            self._push({
+                "id": job_id,
+                "data": job_data,
+                "priority": priority,
+                "attempts": 0,
+                "created_at": created_at,
+            })
+
+        if batch_id:
+            batch = self._batches.setdefault(batch_id, {})
+            batch["total"] = batch.get("total", 0) + len(jobs_data)
+
+        if len(job_ids) == 1:
+            logger.info(f"Job enqueued: {job_ids[0]}")
+        else:
+            logger.info(f"{len(job_ids)} jobs enqueued" + (f" (batch {batch_id})" if batch_id else ""))
+        return job_ids
+
+    async def create_batch(self, batch_id: str, **fields: Any):
+        """Batch-Record anlegen (Zähler werden beim Einreihen und bei Statuswechseln gepflegt)"""
+        record: Dict[str, Any] = {"created_at": time.time(), "total": 0}
+        record.update({k: v for k, v in fields.items() if v is not None})
+        self._batches[batch_id] = record
+        self._batch_expiry[batch_id] = time.time() + STATUS_TTL
+
+    async def update_batch(self, batch_id: str, increments: Dict[str, int]):
+        """Zusätzliche Batch-Zähler erhöhen (z.B. übersprungene oder abgelehnte Dateien)"""
+        batch = self._batches.setdefault(batch_id, {})
+        for field, amount in increments.items():
+            if amount:
+                batch[field] = batch.get(field, 0) + amount
+
+    async def get_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """Aggregierten Fortschritt eines Batches abrufen"""
+        record = self._batches.get(batch_id)
+        return format_batch(batch_id, record) if record else None
+
+    def _push(self, job: Dict[str, Any], front: bool = False):
+        """Job in die Liste seiner Klasse und seines Space legen; ein (wieder) aktiver Space
+        startet mit der aktuellen virtuellen Zeit der Klasse
+        """
+        priority = job.get("priority")
+        if priority not in PRIORITY_CLASSES:
+            priority = PRIORITY_BULK
+        space = (job.get("data") or {}).get("knowledge_space_id") or ""
+
+        queue = self._queues.get((priority, space))
+        if queue is None:
+            queue = self._queues[(priority, space)] = deque()
+        if front:
+            queue.appendleft(job)
+        else:
+            queue.append(job)
+        self._depth[priority] += 1
+
+        if space not in self._active[priority]:
+            self._active[priority][space] = self._vtime[priority]
+        self._wake()
+
+    def _wake(self):
+        """Einen wartenden Worker wecken"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    async def _wait(self, timeout: float):
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+
+    async def dequeue(self, worker_id: str = "default") -> Optional[Dict[str, Any]]:
+        """Nächsten Job nach Priorität und Fair Share wählen und dem Worker zuweisen.
+
+        Ist nichts verfügbar, wartet der Worker auf einen neuen Job bzw. bis ein Rate-Limit
+        wieder Tokens hat, höchstens QUEUE_DEQUEUE_TIMEOUT Sekunden.
+        """
+        job, wait = self._take_next(worker_id, time.time())
+        if job is None:
+            timeout = self.dequeue_timeout
+            if wait:
+                timeout = min(timeout, max(wait, 0.01))
+            await self._wait(timeout)
+            job, _ = self._take_next(worker_id, time.time())
+
+        if job is None:
+            return None
+
+        now = time.time()
+        if not job.get("attempts"):
+            observe_queue_wait(job, now)
+        self._transition(
+            job["id"],
+            "processing",
+            {"started_at": now, "attempts": job.get("attempts", 0), "progress": 0},
+            now=now,
+        )
+        return {**job, "status": "processing"}
+
+    def _take_next(self, worker_id: str, now: float) -> Tuple[Optional[Dict[str, Any]], Optional[float]]:
+        """Scheduler wie im DEQUEUE-Skript: (Job, None) oder (None, Sekunden bis zum nächsten Token)"""
+        classes = list(PRIORITY_CLASSES)
+        if self.bulk_every > 0 and len(classes) > 1:
+            self._ticks += 1
+            if self._ticks % self.bulk_every == 0:
+                classes.reverse()
+
+        min_wait: Optional[float] = None
+        for priority in classes:
+            active = self._active[priority]
+            candidates = heapq.nsmallest(self.scan_limit, active.items(), key=lambda item: item[1])
+            for space, vtime in candidates:
+                queue = self._queues.get((priority, space))
+                if not queue:
+                    del active[space]
+                    self._queues.pop((priority, space), None)
+                    continue
+
+                running = self._running.get(space)
+                if self.space_concurrency and running and len(running) >= self.space_concurrency:
+                    # Ausgelastet: überspringen, ohne Token oder virtuelle Zeit zu verbrauchen
+                    continue
+
+                wait = self._take_token(space, now)
+                if wait:
+                    if min_wait is None or wait < min_wait:
+                        min_wait = wait
+                    continue
+
+                job = queue.popleft()
+                self._depth[priority] -= 1
+                self._vtime[priority] = vtime
+                if queue:
+                    weight = self._weights.get(space, self.default_weight)
+                    active[space] = vtime + 1 / max(weight, 0.001)
+                else:
+                    del active[space]
+                    del self._queues[(priority, space)]
+
+                self._inflight[job["id"]] = (worker_id, job, now + self.visibility_timeout)
+                if self.space_concurrency:
+                    self._running.setdefault(space, set()).add(job["id"])
+                return job, None
+
+        return None, min_wait
+
+    def _take_token(self, space: str, now: float) -> float:
+        """Token-Bucket pro Knowledge Space; 0 = Token entnommen, sonst Wartezeit"""
+        rate = self._rates.get(space, self.default_rate_limit)
+        if rate <= 0:
+            return 0
+        capacity = max(1, self.rate_burst)
+        tokens, ts = self._tokens.get(space, (capacity, now))
+        tokens = min(capacity, tokens + max(0.0, now - ts) * rate)
+        if tokens < 1:
+            return (1 - tokens) / rate
+        self._tokens[space] = (tokens - 1, now)
+        return 0
+
+    def _release(self, job_id: str) -> Optional[Tuple[str, Dict[str, Any], float]]:
+        """Job aus den laufenden entfernen und seinen Platz im Space-Limit freigeben"""
+        inflight = self._inflight.pop(job_id, None)
+        if inflight is None:
+            return None
+
+        space = (inflight[1].get("data") or {}).get("knowledge_space_id") or ""
+        running = self._running.get(space)
+        if running and job_id in running:
+            running.discard(job_id)
+            if not running:
+                del self._running[space]
+            self._wake()
+        return inflight
+
+    async def extend_lease(self, job: Dict[str, Any]):
+        """Visibility-Timeout eines laufenden Jobs verlängern (Heartbeat)"""
+        inflight = self._inflight.get(job["id"])
+        if inflight:
+            worker_id, entry, _ = inflight
+            self._inflight[job["id"]] = (worker_id, entry, time.time() + self.visibility_timeout)
+
+    async def ack(self, job: Dict[str, Any]):
+        """Erfolgreich verarbeiteten Job bestätigen"""
+        if self._release(job["id"]) is None:
+            logger.warning(f"Ack for unknown job: {job['id']}")
+
+    async def nack(self, job: Dict[str, Any], error: str, retry: bool = True):
+        """Fehlgeschlagenen Job mit Backoff erneut einplanen oder in die Dead-Letter-Liste verschieben.
+
+        Mit retry=False (dauerhafte Fehler) direkt in die Dead-Letter-Liste.
+        """
+        job_id = job["id"]
+        inflight = self._release(job_id)
+        if not inflight:
+            logger.warning(f"Nack for unknown job: {job_id}")
+            return
+
+        attempts = job.get("attempts", 0) + 1
+        entry = {**inflight[1], "attempts": attempts, "last_error": error}
+        dead = not retry or attempts > self.max_retries
+
+        if dead:
+            self._dead.appendleft(entry)
+        else:
+            delay = min(self.retry_backoff * (2 ** (attempts - 1)), self.retry_backoff_max)
+            heapq.heappush(self._delayed, (time.time() + delay, self._sequence, entry))
+            self._sequence += 1
+
+        fields = {"error": error, "attempts": attempts}
+        if dead:
+            logger.error(f"Job moved to dead-letter list after {attempts} attempts: {job_id}")
+            self._transition(job_id, "failed", fields)
+        else:
+            logger.warning(f"Job scheduled for retry {attempts}/{self.max_retries}: {job_id}")
+            self._transition(job_id, "retrying", fields)
+
+    async def reap(self, limit: int = 100) -> Dict[str, int]:
+        """Abgelaufene Leases zurückholen, fällige Retries einreihen, alte Status-Records verwerfen"""
+        now = time.time()
+        requeued: List[str] = []
+        dead: List[str] = []
+
+        expired = [job_id for job_id, (_, _, lease) in self._inflight.items() if lease <= now]
+        for job_id in expired[:limit]:
+            _, job, _ = self._release(job_id)
+            attempts = job.get("attempts", 0) + 1
+            job = {**job, "attempts": attempts, "last_error": "visibility timeout expired"}
+            if attempts > self.max_retries:
+                self._dead.appendleft(job)
+                dead.append(job_id)
+            else:
+                self._push(job, front=True)
+                requeued.append(job_id)
+
+        promoted = 0
+        while self._delayed and self._delayed[0][0] <= now and promoted < limit:
+            _, _, job = heapq.heappop(self._delayed)
+            self._push(job, front=True)
+            promoted += 1
+
+        self._expire(now)
+
+        for job_id in requeued:
+            logger.warning(f"Visibility timeout expired, job requeued: {job_id}")
+            await self.update_status(job_id, "queued", error="visibility timeout expired")
+        for job_id in dead:
+            logger.error(f"Visibility timeout expired too often, job dead-lettered: {job_id}")
+            await self.update_status(job_id, "failed", error="visibility timeout expired")
+
+        return {"requeued": len(requeued), "dead": len(dead), "promoted": promoted}
+
+    def _expire(self, now: float):
+        """Status-Records, Batches und Stunden-Buckets nach Ablauf verwerfen (wie die TTLs in Redis)"""
+        while self._expiry:
+            job_id, expires = next(iter(self._expiry.items()))
+            if expires > now:
+                break
+            self._expiry.popitem(last=False)
+            record = self._statuses.pop(job_id, None) or {}
+            document_id = record.get("document_id")
+            if document_id and self._documents.get(document_id) == job_id:
+                del self._documents[document_id]
+
+        for batch_id, expires in list(self._batch_expiry.items()):
+            if expires <= now:
+                del self._batch_expiry[batch_id]
+                self._batches.pop(batch_id, None)
+
+        window = set(stats.window_buckets(stats.utc_time(now)))
+        for name in list(self._hourly):
+            if name not in window:
+                del self._hourly[name]
+
+    async def recover_worker(self, worker_id: str) -> int:
+        """Noch zugewiesene Jobs eines neu gestarteten Workers zurück in die Queue legen"""
+        recovered = [
+            job_id for job_id, (owner, _, _) in self._inflight.items() if owner == worker_id
+        ]
+        for job_id in recovered:
+            _, job, _ = self._release(job_id)
+            self._push(job, front=True)
+            await self.update_status(job_id, "queued")
+
+        if recovered:
+            logger.warning(f"Recovered {len(recovered)} unfinished jobs of worker {worker_id}")
+        return len(recovered)
+
+    async def list_dead_letters(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Jobs der Dead-Letter-Liste abrufen"""
+        return [dict(job) for job in islice(self._dead, limit)]
+
+    async def requeue_dead_letters(self, job_id: Optional[str] = None) -> List[str]:
+        """Jobs aus der Dead-Letter-Liste erneut einreihen (alle oder einen bestimmten)"""
+        requeued: List[str] = []
+        remaining: Deque[Dict[str, Any]] = deque()
+        for job in self._dead:
+            if job_id is None or job["id"] == job_id:
+                self._push({**job, "attempts": 0}, front=True)
+                requeued.append(job["id"])
+            else:
+                remaining.append(job)
+        self._dead = remaining
+
+        for requeued_id in requeued:
+            await self.update_status(requeued_id, "queued")
+
+        logger.info(f"Requeued {len(requeued)} dead-letter jobs")
+        return requeued
+
+    async def update_status(
+        self, job_id: str, status: str, progress: Optional[float] = None, error: Optional[str] = None
+    ):
+        """Job-Status aktualisieren"""
+        fields: Dict[str, Any] = {}
+        if progress is not None:
+            fields["progress"] = progress
+        if error:
+            fields["error"] = error
+
+        self._transition(job_id, status, fields)
+        logger.info(f"Job status updated: {job_id} -> {status}")
+
+    def update_progress(self, job_id: str, progress: float):
+        """Fortschritt eines laufenden Jobs vormerken (gedrosselt und gebündelt geschrieben)"""
+        self.progress.update(job_id, progress)
+
+    async def write_progress(self, pending: Dict[str, float]) -> int:
+        """Fortschritt mehrerer Jobs schreiben (nur solange sie laufen)"""
+        now = round(time.time(), 3)
+        written = 0
+        for job_id, progress in pending.items():
+            record = self._statuses.get(job_id)
+            if record and record.get("status") == "processing":
+                record["progress"] = progress
+                record["updated_at"] = now
+                self._publish(record, now)
+                written += 1
+        return written
+
+    def _transition(
+        self,
+        job_id: str,
+        status: str,
+        fields: Optional[Dict[str, Any]] = None,
+        create: bool = False,
+        now: Optional[float] = None,
+    ) -> int:
+        """Status-Record schreiben und Zähler mitführen wie im TRANSITION-Skript.
+
+        Rückgabe: 1 = Statuswechsel, 0 = unverändert, -1 = unbekannter Job (create = False)
+        """
+        self.progress.discard(job_id)
+
+        now = now or time.time()
+        record = self._statuses.get(job_id)
+        if record is None:
+            if not create:
+                return -1
+            record = self._statuses[job_id] = {}
+
+        old_status = record.get("status")
+        for field, value in (fields or {}).items():
+            if value is not None:
+                record[field] = round(value, 3) if isinstance(value, float) else value
+        record["status"] = status
+        record["updated_at"] = round(now, 3)
+        terminal = status in stats.TERMINAL_STATUSES
+        if terminal:
+            record["completed_at"] = record["updated_at"]
+
+        self._expiry[job_id] = now + STATUS_TTL
+        self._expiry.move_to_end(job_id)
+        self._publish(record, now)
+
+        if old_status == status:
+            return 0
+
+        if old_status in stats.GAUGE_STATUSES:
+            self._current[old_status] = self._current.get(old_status, 0) - 1
+        if status in stats.GAUGE_STATUSES:
+            self._current[status] = self._current.get(status, 0) + 1
+
+        batch_id = record.get("batch_id")
+        if batch_id:
+            batch = self._batches.setdefault(batch_id, {})
+            if old_status:
+                batch[old_status] = batch.get(old_status, 0) - 1
+            batch[status] = batch.get(status, 0) + 1
+            self._batch_expiry[batch_id] = now + STATUS_TTL
+
+        bucket = self._hourly.setdefault(stats.hour_bucket(stats.utc_time(now)), {})
+        created_at = record.get("created_at")
+        if status == "queued" and "started_at" not in record:
+            self._increment(bucket, "enqueued")
+        if status == "processing":
+            self._observe(bucket, "wait", created_at, now)
+        if terminal:
+            self._increment(bucket, status)
+            self._observe(bucket, "latency", created_at, now)
+        return 1
+
+    @staticmethod
+    def _increment(bucket: Dict[str, float], field: str, amount: float = 1):
+        bucket[field] = bucket.get(field, 0) + amount
+
+    def _observe(self, bucket: Dict[str, float], prefix: str, since: Optional[float], now: float):
+        if since is None:
+            return
+        seconds = max(0.0, now - since)
+        label = next(
+            (f"le_{bound}" for bound in stats.LATENCY_BUCKETS if seconds <= bound), "inf"
+        )
+        self._increment(bucket, f"{prefix}:{label}")
+        self._increment(bucket, f"{prefix}:sum", seconds)
+        self._increment(bucket, f"{prefix}:count")
+
+    def _publish(self, record: Dict[str, Any], now: float):
+        """Status-Event wie im TRANSITION-Skript (nur Jobs mit Dokument-ID, nur mit Abonnenten)"""
+        if not record.get("document_id") or not self.store.subscribed(self.events_channel):
+            return
+
+        event = {
+            "job_id": record.get("id"),
+            "document_id": record["document_id"],
+            "status": record["status"],
+            "progress": record.get("progress"),
+            "error": record.get("error"),
+            "updated_at": now,
+        }
+        self.store.deliver(
+            self.events_channel,
+            json.dumps({key: value for key, value in event.items() if value is not None}),
+        )
+
+    async def get_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job-Status abrufen"""
+        record = self._statuses.get(job_id)
+        return format_status(record) if record else None
+
+    async def get_document_statuses(
+        self, document_ids: List[str]
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Status der jeweils letzten Jobs mehrerer Dokumente abrufen"""
+        statuses: Dict[str, Optional[Dict[str, Any]]] = {}
+        for document_id in document_ids:
+            record = self._statuses.get(self._documents.get(document_id, ""))
+            statuses[document_id] = format_status(record) if record else None
+        return statuses
+
+    async def get_stats(self) -> Dict[str, Any]:
+        """Queue-Statistiken abrufen (gleiches Format wie beim Redis-Backend)"""
+        bucket_names = stats.window_buckets(stats.utc_time())
+        classes = {
+            priority: {
+                "depth": self._depth[priority],
+                "knowledge_spaces": len(self._active[priority]),
+            }
+            for priority in PRIORITY_CLASSES
+        }
+
+        return {
+            "queue_length": sum(c["depth"] for c in classes.values()),
+            "classes": classes,
+            "in_flight": len(self._inflight),
+            "delayed": len(self._delayed),
+            "dead_letters": len(self._dead),
+            **stats.summarize(
+                self._current, bucket_names, [self._hourly.get(name, {}) for name in bucket_names]
+            ),
+        }
+
+    async def get_load(self, memory: bool = True) -> Dict[str, Any]:
+        """Kennzahlen für die Admission Control (ohne Redis-Speicher)"""
+        bucket_names = stats.window_buckets(stats.utc_time(), hours=2)
+        return {
+            "queued": sum(self._depth.values()),
+            "finished": {
+                name: sum(
+                    int(self._hourly.get(name, {}).get(status, 0))
+                    for status in stats.TERMINAL_STATUSES
+                )
+                for name in bucket_names
+            },
+            "memory_used": 0,
+            "memory_max": 0,
+        }
+
+    async def get_space_depth(self, knowledge_space_id: Optional[str]) -> Optional[int]:
+        """Wartende Jobs eines Knowledge Space über alle Prioritätsklassen"""
+        space = knowledge_space_id or ""
+        return sum(len(self._queues.get((priority, space), ())) for priority in PRIORITY_CLASSES)
+
+    async def get_knowledge_space_stats(self) -> List[Dict[str, Any]]:
+        """Wartende Jobs, virtuelle Zeit und Limits pro Knowledge Space und Prioritätsklasse"""
+        return [
+            {
+                "knowledge_space_id": space or None,
+                "priority": priority,
+                "depth": len(self._queues.get((priority, space), ())),
+                "running": len(self._running.get(space, ())),
+                "virtual_time": round(vtime, 3),
+                "weight": float(self._weights.get(space, self.default_weight)),
+                "rate_limit": float(self._rates.get(space, self.default_rate_limit)),
+            }
+            for priority in PRIORITY_CLASSES
+            for space, vtime in sorted(self._active[priority].items(), key=lambda item: item[1])
+        ]
+
+    async def set_knowledge_space_limits(
+        self,
+        knowledge_space_id: Optional[str],
+        weight: Optional[float] = None,
+        rate_limit: Optional[float] = None,
+    ):
+        """Gewicht (Fair Share) und Rate-Limit (Jobs/Sekunde, 0 = unbegrenzt) eines Space setzen"""
+        space = knowledge_space_id or ""
+        if weight is not None:
+            self._weights[space] = weight
+        if rate_limit is not None:
+            self._rates[space] = rate_limit
+
+    async def close(self):
+        """Ausstehenden Fortschritt schreiben; noch wartende Jobs gehen verloren"""
+        try:
+            await self.progress.close()
+        except Exception as e:
+            logger.warning(f"Failed to flush job progress: {e}")
+
+        pending = sum(self._depth.values()) + len(self._delayed)
+        if pending:
+            logger.warning(f"Memory queue closed with {pending} unprocessed jobs")
+        for waiter in self._waiters:
+            waiter.cancel()
+        self._waiters.clear()
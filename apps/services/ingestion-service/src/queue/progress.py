@@ -0,0 +1,53 @@
+"""
+Progress Coalescer
+Sammelt Fortschritts-Updates laufender Jobs und schreibt sie gebündelt und gedrosselt
+"""
+import asyncio
+import logging
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressCoalescer:
+    """Schreibt pro Job nur den jeweils letzten Fortschritt, höchstens einmal pro Intervall"""
+
+    def __init__(self, queue_manager, interval: float = 0.5):
+        self.queue_manager = queue_manager
+        self.interval = interval
+        self._pending: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.updates = 0
+        self.writes = 0
+
+    def update(self, job_id: str, progress: float):
+        """Fortschritt vormerken; ältere, noch nicht geschriebene Werte werden überschrieben"""
+        self._pending[job_id] = progress
+        self.updates += 1
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_later())
+
+    def discard(self, job_id: str):
+        """Vorgemerkten Fortschritt verwerfen (z.B. bei Statuswechsel)"""
+        self._pending.pop(job_id, None)
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.interval)
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.warning(f"Failed to flush job progress: {e}")
+
+    async def flush(self):
+        """Alle vorgemerkten Werte in einem Aufruf an das Queue-Backend schreiben"""
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        await self.queue_manager.write_progress(pending)
+        self.writes += 1
+
+    async def close(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+        await self.flush()
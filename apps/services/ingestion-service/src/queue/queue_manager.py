@@ -2,152 +2,825 @@
 Queue Manager
 Verwaltet BullMQ-ähnliche Queue für Dokument-Verarbeitung
 """
-import redis
-import json
-import uuid
-from typing import Optional, Dict, Any
-from datetime import datetime
+import asyncio
 import logging
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import redis.asyncio as redis
+
+from src.config import get_settings
+from src.observability.metrics import QUEUE_WAIT
+from src.queue import scripts, stats
+from src.queue.codec import JobCodec
+from src.queue.progress import ProgressCoalescer
 
 logger = logging.getLogger(__name__)
 
+# Zeitstempel im Status-Hash (Epoch-Sekunden, nach außen ISO-8601)
+STATUS_TIME_FIELDS = ("created_at", "started_at", "updated_at", "completed_at")
+
+# Felder aus den Job-Daten, die in den Status übernommen werden (kein Payload)
+STATUS_DATA_FIELDS = ("document_id", "filename", "knowledge_space_id")
+
+# Status-Hashes verfallen einen Tag nach dem letzten Statuswechsel
+STATUS_TTL = 86400
+
+# Prioritätsklassen, höchste zuerst: Uploads über die API vor Watcher- und Bulk-Importen
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BULK = "bulk"
+PRIORITY_CLASSES = (PRIORITY_INTERACTIVE, PRIORITY_BULK)
+
+
+class UnsupportedOperationError(Exception):
+    """Funktion wird vom gewählten Queue-Backend bewusst nicht unterstützt"""
+
+
+def observe_queue_wait(job: Dict[str, Any], now: float):
+    """Wartezeit vom Enqueue bis zum ersten Dequeue (created_at ist ISO-8601 in UTC)"""
+    try:
+        created = datetime.fromisoformat(job["created_at"])
+    except (KeyError, TypeError, ValueError):
+        return
+    if created.tzinfo is None:
+        # Jobs älterer Versionen: naive Zeitstempel in UTC
+        created = created.replace(tzinfo=timezone.utc)
+    QUEUE_WAIT.labels(job.get("priority", PRIORITY_BULK)).observe(max(0.0, now - created.timestamp()))
+
+
+def format_status(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Status-Hash bzw. Status-Event für die API aufbereiten (Typen, ISO-Zeitstempel)"""
+    record = dict(record)
+    for field in STATUS_TIME_FIELDS:
+        if record.get(field) is not None:
+            record[field] = stats.utc_isoformat(float(record[field]))
+    if record.get("progress") is not None:
+        record["progress"] = float(record["progress"])
+    if record.get("attempts") is not None:
+        record["attempts"] = int(record["attempts"])
+    if "id" in record:
+        record["job_id"] = record.pop("id")
+    return record
+
+
+def format_batch(batch_id: str, record: Dict[str, Any]) -> Dict[str, Any]:
+    """Batch-Record (Zähler pro Status) für die API aufbereiten"""
+    counts = {status: int(record.get(status, 0)) for status in stats.GAUGE_STATUSES}
+    counts.update({status: int(record.get(status, 0)) for status in stats.TERMINAL_STATUSES})
+    total = int(record.get("total", 0))
+    finished = counts["completed"] + counts["failed"]
+
+    return {
+        "batch_id": batch_id,
+        "knowledge_space_id": record.get("knowledge_space_id"),
+        "priority": record.get("priority"),
+        "created_at": stats.utc_isoformat(float(record["created_at"])),
+        "total": total,
+        "skipped": int(record.get("skipped", 0)),
+        "rejected": int(record.get("rejected", 0)),
+        "statuses": counts,
+        "progress": round(finished / total, 4) if total else 1.0,
+        "done": finished >= total,
+    }
 
-class QueueManager:
-    """Queue Manager für Dokument-Verarbeitung"""
 
-    def __init__(self, redis_url: Optional[str] = None):
-        self.redis_url = redis_url or "redis://localhost:6379"
+class QueueManager:
+    """Queue Manager für Dokument-Verarbeitung (Redis-Listen mit Scheduler pro Knowledge Space)"""
+
+    # Lua-Skripte; das Streams-Backend ersetzt die einreihenden durch Stream-Varianten
+    SCRIPTS = {
+        "enqueue": scripts.ENQUEUE,
+        "dequeue": scripts.DEQUEUE,
+        "migrate": scripts.MIGRATE_LEGACY,
+        "reap": scripts.REAP_EXPIRED,
+        "promote": scripts.PROMOTE_DELAYED,
+        "recover": scripts.RECOVER_WORKER,
+        "requeue_dead": scripts.REQUEUE_DEAD,
+        "transition": scripts.TRANSITION,
+        "set_progress": scripts.SET_PROGRESS,
+    }
+
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        pool_size: Optional[int] = None,
+        blocking_pool_size: Optional[int] = None,
+    ):
+        settings = get_settings()
+        self.redis_url = redis_url or settings.redis_url
+        self.pool_size = pool_size or settings.redis_pool_size
+        # Jeder wartende Worker belegt beim Dequeue eine eigene Verbindung
+        self.blocking_pool_size = blocking_pool_size or max(
+            settings.redis_blocking_pool_size, settings.ingestion_workers, 1
+        )
+        self.dequeue_timeout = settings.queue_dequeue_timeout
+        self.visibility_timeout = settings.queue_visibility_timeout
+        self.max_retries = settings.queue_max_retries
+        self.retry_backoff = settings.queue_retry_backoff
+        self.retry_backoff_max = settings.queue_retry_backoff_max
+        self.bulk_every = settings.queue_bulk_every
+        self.scan_limit = settings.queue_scan_limit
+        self.default_weight = settings.knowledge_space_default_weight
+        self.default_rate_limit = settings.knowledge_space_rate_limit
+        self.rate_burst = settings.knowledge_space_rate_burst
+        self.space_concurrency = max(0, settings.knowledge_space_concurrency)
+        self.codec = JobCodec(
+            encoding=settings.queue_job_encoding,
+            compression=settings.queue_job_compression,
+            compression_threshold=settings.queue_job_compression_threshold,
+        )
         self.redis_client: Optional[redis.Redis] = None
+        self.blocking_client: Optional[redis.Redis] = None
         self.queue_name = "document_processing"
+        self.prefix = f"{self.queue_name}:"
+        self.events_channel = f"{self.queue_name}:events"
+        self._connect_lock = asyncio.Lock()
+        self._scripts: Dict[str, Any] = {}
+        # Job-ID -> (Worker-ID, Roh-Eintrag, Position) der von diesem Prozess entnommenen Jobs
+        self._inflight: Dict[str, tuple] = {}
+        self.progress = ProgressCoalescer(self, settings.status_flush_interval)
 
     async def connect(self):
-        """Redis-Verbindung herstellen"""
-        try:
-            self.redis_client = redis.from_url(self.redis_url, decode_responses=True)
-            # Test-Verbindung
-            self.redis_client.ping()
-            logger.info("Connected to Redis")
-        except Exception as e:
-            logger.error(f"Failed to connect to Redis: {e}")
-            raise
-
-    async def enqueue(self, job_data: Dict[str, Any]) -> str:
-        """Job in Queue einreihen"""
-        if not self.redis_client:
-            await self.connect()
-
-        job_id = str(uuid.uuid4())
-        job = {
-            "id": job_id,
-            "data": job_data,
-            "status": "queued",
-            "created_at": datetime.utcnow().isoformat(),
-        }
+        """Redis-Verbindungen herstellen (geteilter Pool + eigener Pool für blockierendes Dequeue)"""
+        async with self._connect_lock:
+            if self.redis_client and self.blocking_client:
+                return
+
+            try:
+                redis_client = redis.Redis.from_pool(
+                    redis.BlockingConnectionPool.from_url(
+                        self.redis_url,
+                        max_connections=self.pool_size,
+                        decode_responses=True,
+                        # Binäre Queue-Einträge verlustfrei als str durchreichen
+                        encoding_errors="surrogateescape",
+                    )
+                )
+                blocking_client = redis.Redis.from_pool(
+                    redis.BlockingConnectionPool.from_url(
+                        self.redis_url,
+                        max_connections=self.blocking_pool_size,
+                        decode_responses=True,
+                        encoding_errors="surrogateescape",
+                    )
+                )
+                # Test-Verbindung
+                await redis_client.ping()
+            except Exception as e:
+                logger.error(f"Failed to connect to Redis: {e}")
+                raise
+
+            self.redis_client = redis_client
+            self.blocking_client = blocking_client
+            self._scripts = {
+                name: redis_client.register_script(source) for name, source in self.SCRIPTS.items()
+            }
+            logger.info(
+                f"Connected to Redis (pool={self.pool_size}, blocking_pool={self.blocking_pool_size})"
+            )
+            await self._migrate_legacy_queue()
+
+    async def _migrate_legacy_queue(self):
+        """Jobs der früheren FIFO-Liste in die Scheduler-Listen übernehmen"""
+        migrated = 0
+        while True:
+            moved = await self._scripts["migrate"](
+                keys=[f"{self.queue_name}:queue"], args=[self.prefix, PRIORITY_BULK, 1000]
+            )
+            migrated += moved
+            if moved < 1000:
+                break
+        if migrated:
+            logger.info(f"Migrated {migrated} jobs from legacy queue")
+
+    async def get_client(self) -> redis.Redis:
+        """Geteilten Redis-Client für andere Komponenten bereitstellen"""
+        if not self.redis_client:
+            await self.connect()
+        return self.redis_client
+
+    async def enqueue(self, job_data: Dict[str, Any], priority: str = PRIORITY_BULK) -> str:
+        """Job in die Queue seiner Prioritätsklasse und seines Knowledge Space einreihen"""
+        job_ids = await self.enqueue_many([job_data], priority)
+        return job_ids[0]
+
+    async def enqueue_many(
+        self,
+        jobs_data: List[Dict[str, Any]],
+        priority: str = PRIORITY_BULK,
+        batch_id: Optional[str] = None,
+    ) -> List[str]:
+        """Mehrere Jobs in einer Redis-Pipeline einreihen (optional als Teil eines Batches)"""
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Unknown priority class: {priority}")
+        if not self.redis_client:
+            await self.connect()
+        if not jobs_data:
+            return []
+
+        now = time.time()
+        created_at = stats.utc_isoformat(now)
+        job_ids: List[str] = []
+        raws: List[bytes] = []
+
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            for job_data in jobs_data:
+                job_id = str(uuid.uuid4())
+                job_ids.append(job_id)
+                raws.append(self.codec.encode({
+                    "id": job_id,
+                    "data": job_data,
+                    "priority": priority,
+                    "attempts": 0,
+                    "created_at": created_at,
+                }))
+
+                # Status ohne Payload: nur IDs, Zeitstempel und Zähler
+                fields: Dict[str, Any] = {
+                    "id": job_id,
+                    "priority": priority,
+                    "attempts": 0,
+                    "created_at": now,
+                    "batch_id": batch_id,
+                }
+                for field in STATUS_DATA_FIELDS:
+                    if job_data.get(field) is not None:
+                        fields[field] = job_data[field]
+
+                await self._transition(job_id, "queued", fields, client=pipe, create=True, now=now)
+                if job_data.get("document_id"):
+                    pipe.set(self._document_key(job_data["document_id"]), job_id, ex=STATUS_TTL)
+
+            # Queue-Einträge und Dokument-Index im selben Round-Trip
+            await self._scripts["enqueue"](
+                args=[self.prefix, PRIORITY_BULK, *raws], client=pipe
+            )
+            if batch_id:
+                pipe.hincrby(self._batch_key(batch_id), "total", len(jobs_data))
+                pipe.expire(self._batch_key(batch_id), STATUS_TTL)
+            await pipe.execute()
+
+        if len(job_ids) == 1:
+            logger.info(f"Job enqueued: {job_ids[0]}")
+        else:
+            logger.info(f"{len(job_ids)} jobs enqueued" + (f" (batch {batch_id})" if batch_id else ""))
+        return job_ids
+
+    async def create_batch(self, batch_id: str, **fields: Any):
+        """Batch-Record anlegen (Zähler werden beim Einreihen und bei Statuswechseln gepflegt)"""
+        if not self.redis_client:
+            await self.connect()
 
-        # In Queue einreihen
-        self.redis_client.lpush(f"{self.queue_name}:queue", json.dumps(job))
+        mapping = {"created_at": time.time(), "total": 0}
+        mapping.update({k: v for k, v in fields.items() if v is not None})
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.hset(self._batch_key(batch_id), mapping=mapping)
+            pipe.expire(self._batch_key(batch_id), STATUS_TTL)
+            await pipe.execute()
 
-        # Status speichern
-        self.redis_client.set(
-            f"{self.queue_name}:status:{job_id}",
-            json.dumps(job),
-            ex=86400,  # 24 Stunden TTL
-        )
+    async def update_batch(self, batch_id: str, increments: Dict[str, int]):
+        """Zusätzliche Batch-Zähler erhöhen (z.B. übersprungene oder abgelehnte Dateien)"""
+        if not self.redis_client:
+            await self.connect()
 
-        logger.info(f"Job enqueued: {job_id}")
-        return job_id
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for field, amount in increments.items():
+                if amount:
+                    pipe.hincrby(self._batch_key(batch_id), field, amount)
+            await pipe.execute()
 
-    async def dequeue(self) -> Optional[Dict[str, Any]]:
-        """Job aus Queue holen"""
+    async def get_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """Aggregierten Fortschritt eines Batches abrufen (konstanter Aufwand)"""
         if not self.redis_client:
             await self.connect()
 
-        job_json = self.redis_client.brpop(f"{self.queue_name}:queue", timeout=1)
+        record = await self.redis_client.hgetall(self._batch_key(batch_id))
+        return format_batch(batch_id, record) if record else None
 
-        if job_json:
-            job = json.loads(job_json[1])
-            job["status"] = "processing"
-            job["started_at"] = datetime.utcnow().isoformat()
+    async def dequeue(self, worker_id: str = "default") -> Optional[Dict[str, Any]]:
+        """Nächsten Job nach Priorität und Fair Share wählen und atomar dem Worker zuweisen.
+
+        Ist nichts verfügbar, wartet der Worker blockierend auf die Doorbell-Liste (neuer Job)
+        bzw. bis ein Rate-Limit wieder Tokens hat, höchstens QUEUE_DEQUEUE_TIMEOUT Sekunden.
+        """
+        if not self.blocking_client:
+            await self.connect()
 
-            # Status aktualisieren
-            self.redis_client.set(
-                f"{self.queue_name}:status:{job['id']}",
-                json.dumps(job),
-                ex=86400,
+        raw, position = await self._receive(worker_id)
+        if raw:
+            job = self.codec.decode(raw)
+            self._inflight[job["id"]] = (worker_id, raw, position)
+            now = time.time()
+            if not job.get("attempts"):
+                observe_queue_wait(job, now)
+
+            await self._transition(
+                job["id"],
+                "processing",
+                {"started_at": now, "attempts": job.get("attempts", 0), "progress": 0},
+                now=now,
             )
 
+            job["status"] = "processing"
             return job
 
         return None
 
+    async def _receive(self, worker_id: str) -> tuple:
+        """Nächsten Roh-Eintrag entnehmen (ggf. blockierend warten): (raw, Position) bzw. ('', None)"""
+        raw, wait = await self._take_next(worker_id)
+        if not raw:
+            timeout = self.dequeue_timeout
+            if wait:
+                timeout = min(timeout, max(float(wait), 0.01))
+            if await self.blocking_client.blpop([f"{self.queue_name}:doorbell"], timeout=timeout):
+                raw, _ = await self._take_next(worker_id)
+            elif wait:
+                raw, _ = await self._take_next(worker_id)
+        return raw, None
+
+    async def _take_next(self, worker_id: str) -> tuple:
+        """Scheduler-Skript ausführen: (Roh-Eintrag, '') oder ('', Wartezeit bis zum nächsten Token)"""
+        now = time.time()
+        raw, wait = await self._scripts["dequeue"](
+            keys=[
+                self._processing_key(worker_id),
+                f"{self.queue_name}:leases",
+                f"{self.queue_name}:inflight",
+            ],
+            args=[
+                self.prefix,
+                now,
+                now + self.visibility_timeout,
+                self.scan_limit,
+                self.default_weight,
+                self.default_rate_limit,
+                self.rate_burst,
+                self.bulk_every,
+                worker_id,
+                self.space_concurrency,
+                *PRIORITY_CLASSES,
+            ],
+        )
+        return raw, wait
+
+    async def extend_lease(self, job: Dict[str, Any]):
+        """Visibility-Timeout eines laufenden Jobs verlängern (Heartbeat)"""
+        if not self.redis_client:
+            await self.connect()
+
+        await self.redis_client.zadd(
+            f"{self.queue_name}:leases",
+            {job["id"]: time.time() + self.visibility_timeout},
+            xx=True,
+        )
+
+    async def ack(self, job: Dict[str, Any]):
+        """Erfolgreich verarbeiteten Job bestätigen"""
+        if not self.redis_client:
+            await self.connect()
+
+        inflight = self._inflight.pop(job["id"], None)
+        if not inflight:
+            logger.warning(f"Ack for unknown job: {job['id']}")
+            return
+
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            self._release(pipe, job["id"], *inflight)
+            self._free_slot(pipe, job)
+            await pipe.execute()
+
+    def _release(self, pipe, job_id: str, worker_id: str, raw: str, position: Any):
+        """Entnommenen Eintrag aus Processing-Liste, Leases und Inflight-Index entfernen"""
+        pipe.lrem(self._processing_key(worker_id), 1, raw)
+        pipe.zrem(f"{self.queue_name}:leases", job_id)
+        pipe.hdel(f"{self.queue_name}:inflight", job_id)
+
+    def _free_slot(self, pipe, job: Dict[str, Any]):
+        """Job aus dem Limit seines Knowledge Space austragen (wie free_slot in den Skripten)"""
+        space = (job.get("data") or {}).get("knowledge_space_id") or ""
+        pipe.srem(f"{self.queue_name}:running:{space}", job["id"])
+        if self.space_concurrency:
+            # Worker, die nur ausgelastete Spaces gefunden haben, warten auf die Türglocke
+            pipe.rpush(f"{self.queue_name}:doorbell", 1)
+            pipe.ltrim(f"{self.queue_name}:doorbell", 0, 999)
+
+    async def nack(self, job: Dict[str, Any], error: str, retry: bool = True):
+        """Fehlgeschlagenen Job mit Backoff erneut einplanen oder in die Dead-Letter-Liste verschieben.
+
+        Mit retry=False (dauerhafte Fehler) direkt in die Dead-Letter-Liste.
+        """
+        if not self.redis_client:
+            await self.connect()
+
+        job_id = job["id"]
+        inflight = self._inflight.pop(job_id, None)
+        if not inflight:
+            logger.warning(f"Nack for unknown job: {job_id}")
+            return
+
+        raw = inflight[1]
+        attempts = job.get("attempts", 0) + 1
+        # Nur der Header ändert sich, der Payload wird nicht neu kodiert
+        entry = self.codec.replace_fields(raw, {"attempts": attempts, "last_error": error})
+        dead = not retry or attempts > self.max_retries
+
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            self._release(pipe, job_id, *inflight)
+            self._free_slot(pipe, job)
+
+            if dead:
+                pipe.lpush(f"{self.queue_name}:dead", entry)
+            else:
+                delay = min(self.retry_backoff * (2 ** (attempts - 1)), self.retry_backoff_max)
+                pipe.zadd(f"{self.queue_name}:delayed", {entry: time.time() + delay})
+
+            await pipe.execute()
+
+        fields = {"error": error, "attempts": attempts}
+        if dead:
+            logger.error(f"Job moved to dead-letter list after {attempts} attempts: {job_id}")
+            await self._transition(job_id, "failed", fields)
+        else:
+            logger.warning(f"Job scheduled for retry {attempts}/{self.max_retries}: {job_id}")
+            await self._transition(job_id, "retrying", fields)
+
+    async def reap(self, limit: int = 100) -> Dict[str, int]:
+        """Abgelaufene Leases zurückholen und fällige Retries einreihen"""
+        if not self.redis_client:
+            await self.connect()
+
+        now = time.time()
+        requeued, dead = await self._scripts["reap"](
+            keys=[
+                f"{self.queue_name}:leases",
+                f"{self.queue_name}:inflight",
+                f"{self.queue_name}:dead",
+            ],
+            args=[
+                now,
+                self.max_retries,
+                limit,
+                f"{self.queue_name}:processing:",
+                self.prefix,
+                PRIORITY_BULK,
+            ],
+        )
+        promoted = await self._scripts["promote"](
+            keys=[f"{self.queue_name}:delayed"],
+            args=[now, limit, self.prefix, PRIORITY_BULK],
+        )
+
+        for job_id in requeued:
+            logger.warning(f"Visibility timeout expired, job requeued: {job_id}")
+            await self.update_status(job_id, "queued", error="visibility timeout expired")
+        for job_id in dead:
+            logger.error(f"Visibility timeout expired too often, job dead-lettered: {job_id}")
+            await self.update_status(job_id, "failed", error="visibility timeout expired")
+
+        return {"requeued": len(requeued), "dead": len(dead), "promoted": promoted}
+
+    async def recover_worker(self, worker_id: str) -> int:
+        """Liegengebliebene Jobs eines neu gestarteten Workers zurück in die Queue legen"""
+        if not self.redis_client:
+            await self.connect()
+
+        recovered = await self._scripts["recover"](
+            keys=[
+                self._processing_key(worker_id),
+                f"{self.queue_name}:leases",
+                f"{self.queue_name}:inflight",
+            ],
+            args=[self.prefix, PRIORITY_BULK],
+        )
+        for job_id in recovered:
+            await self.update_status(job_id, "queued")
+
+        if recovered:
+            logger.warning(f"Recovered {len(recovered)} unfinished jobs of worker {worker_id}")
+        return len(recovered)
+
+    async def list_dead_letters(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Jobs der Dead-Letter-Liste abrufen"""
+        if not self.redis_client:
+            await self.connect()
+
+        raws = await self.redis_client.lrange(f"{self.queue_name}:dead", 0, limit - 1)
+        return [self.codec.decode(raw) for raw in raws]
+
+    async def requeue_dead_letters(self, job_id: Optional[str] = None) -> List[str]:
+        """Jobs aus der Dead-Letter-Liste erneut einreihen (alle oder einen bestimmten)"""
+        if not self.redis_client:
+            await self.connect()
+
+        requeued = await self._scripts["requeue_dead"](
+            keys=[f"{self.queue_name}:dead"],
+            args=[job_id or "", self.prefix, PRIORITY_BULK],
+        )
+        for requeued_id in requeued:
+            await self.update_status(requeued_id, "queued")
+
+        logger.info(f"Requeued {len(requeued)} dead-letter jobs")
+        return list(requeued)
+
+    def _processing_key(self, worker_id: str) -> str:
+        return f"{self.queue_name}:processing:{worker_id}"
+
+    def _status_key(self, job_id: str) -> str:
+        return f"{self.queue_name}:status:{job_id}"
+
+    def _batch_key(self, batch_id: str) -> str:
+        return f"{self.queue_name}:batch:{batch_id}"
+
+    def _document_key(self, document_id: str) -> str:
+        """Index Dokument-ID -> ID des zuletzt eingereihten Jobs"""
+        return f"{self.queue_name}:document_job:{document_id}"
+
     async def update_status(
         self, job_id: str, status: str, progress: Optional[float] = None, error: Optional[str] = None
     ):
-        """Job-Status aktualisieren"""
+        """Job-Status aktualisieren (feldweise, ohne den Record zu lesen)"""
         if not self.redis_client:
             await self.connect()
 
-        status_key = f"{self.queue_name}:status:{job_id}"
-        job_json = self.redis_client.get(status_key)
+        fields: Dict[str, Any] = {}
+        if progress is not None:
+            fields["progress"] = progress
+        if error:
+            fields["error"] = error
 
-        if job_json:
-            job = json.loads(job_json)
-            job["status"] = status
-            job["updated_at"] = datetime.utcnow().isoformat()
+        await self._transition(job_id, status, fields)
+        logger.info(f"Job status updated: {job_id} -> {status}")
 
-            if progress is not None:
-                job["progress"] = progress
+    def update_progress(self, job_id: str, progress: float):
+        """Fortschritt eines laufenden Jobs vormerken (gedrosselt und gebündelt geschrieben)"""
+        self.progress.update(job_id, progress)
 
-            if error:
-                job["error"] = error
+    async def write_progress(self, pending: Dict[str, float]) -> int:
+        """Fortschritt mehrerer laufender Jobs in einem Skript-Aufruf schreiben"""
+        if not self.redis_client:
+            await self.connect()
 
-            if status in ["completed", "failed"]:
-                job["completed_at"] = datetime.utcnow().isoformat()
+        return await self._scripts["set_progress"](
+            keys=[self._status_key(job_id) for job_id in pending],
+            args=[round(time.time(), 3), self.events_channel, *pending.values()],
+        )
 
-            self.redis_client.set(status_key, json.dumps(job), ex=86400)
-            logger.info(f"Job status updated: {job_id} -> {status}")
+    async def _transition(
+        self,
+        job_id: str,
+        status: str,
+        fields: Optional[Dict[str, Any]] = None,
+        client=None,
+        create: bool = False,
+        now: Optional[float] = None,
+    ) -> int:
+        """Status-Hash schreiben und Statistik-Zähler atomar mitführen"""
+        # Ein Statuswechsel ersetzt noch nicht geschriebenen Fortschritt
+        self.progress.discard(job_id)
+
+        now = now or time.time()
+        args: List[Any] = [
+            status,
+            round(now, 3),
+            STATUS_TTL,
+            stats.HOURLY_TTL,
+            1 if create else 0,
+            self.events_channel,
+            f"{self.queue_name}:batch:",
+            len(stats.LATENCY_BUCKETS),
+            *stats.LATENCY_BUCKETS,
+        ]
+        for field, value in (fields or {}).items():
+            if value is None:
+                continue
+            args += [field, round(value, 3) if isinstance(value, float) else value]
+
+        return await self._scripts["transition"](
+            keys=[
+                self._status_key(job_id),
+                f"{self.queue_name}:stats:current",
+                f"{self.queue_name}:stats:hourly:{stats.hour_bucket(stats.utc_time(now))}",
+            ],
+            args=args,
+            client=client,
+        )
 
     async def get_status(self, job_id: str) -> Optional[Dict[str, Any]]:
         """Job-Status abrufen"""
         if not self.redis_client:
             await self.connect()
 
-        status_key = f"{self.queue_name}:status:{job_id}"
-        job_json = self.redis_client.get(status_key)
+        record = await self.redis_client.hgetall(self._status_key(job_id))
+        return format_status(record) if record else None
 
-        if job_json:
-            return json.loads(job_json)
+    async def get_document_statuses(
+        self, document_ids: List[str]
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Status der jeweils letzten Jobs mehrerer Dokumente abrufen (zwei Round-Trips)"""
+        if not self.redis_client:
+            await self.connect()
 
-        return None
+        statuses: Dict[str, Optional[Dict[str, Any]]] = {
+            document_id: None for document_id in document_ids
+        }
+        if not document_ids:
+            return statuses
+
+        job_ids = await self.redis_client.mget(
+            [self._document_key(document_id) for document_id in document_ids]
+        )
+        found = [(document_id, job_id) for document_id, job_id in zip(document_ids, job_ids) if job_id]
+        if not found:
+            return statuses
+
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for _, job_id in found:
+                pipe.hgetall(self._status_key(job_id))
+            records = await pipe.execute()
+
+        for (document_id, _), record in zip(found, records):
+            if record:
+                statuses[document_id] = format_status(record)
+        return statuses
 
     async def get_stats(self) -> Dict[str, Any]:
-        """Queue-Statistiken abrufen"""
+        """Queue-Statistiken abrufen (konstanter Aufwand, unabhängig von der Job-Anzahl)"""
         if not self.redis_client:
             await self.connect()
 
-        queue_length = self.redis_client.llen(f"{self.queue_name}:queue")
+        bucket_names = stats.window_buckets(stats.utc_time())
 
-        # Status-Keys zählen
-        status_keys = self.redis_client.keys(f"{self.queue_name}:status:*")
-        statuses = {}
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.zcard(f"{self.queue_name}:delayed")
+            pipe.llen(f"{self.queue_name}:dead")
+            pipe.hgetall(f"{self.queue_name}:stats:current")
+            for name in bucket_names:
+                pipe.hgetall(f"{self.queue_name}:stats:hourly:{name}")
+            self._depth_commands(pipe)
+            results = await pipe.execute()
 
-        for key in status_keys:
-            job_json = self.redis_client.get(key)
-            if job_json:
-                job = json.loads(job_json)
-                status = job.get("status", "unknown")
-                statuses[status] = statuses.get(status, 0) + 1
+        delayed, dead_letters, current = results[:3]
+        classes, in_flight = self._parse_depths(results[3 + len(bucket_names):])
 
         return {
-            "queue_length": queue_length,
-            "statuses": statuses,
-            "total_jobs": len(status_keys),
+            "queue_length": sum(c["depth"] for c in classes.values()),
+            "classes": classes,
+            "in_flight": in_flight,
+            "delayed": delayed,
+            "dead_letters": dead_letters,
+            **stats.summarize(current, bucket_names, results[3:3 + len(bucket_names)]),
         }
 
+    def _depth_commands(self, pipe):
+        """Befehle für Queue-Tiefe und laufende Jobs an die Statistik-Pipeline anhängen"""
+        pipe.hgetall(f"{self.queue_name}:depth")
+        pipe.hlen(f"{self.queue_name}:inflight")
+        for priority in PRIORITY_CLASSES:
+            pipe.zcard(f"{self.queue_name}:active:{priority}")
+
+    def _parse_depths(self, results: List[Any]) -> tuple:
+        """Ergebnisse von _depth_commands: ({Klasse: {depth, knowledge_spaces}}, laufende Jobs)"""
+        depth, in_flight, *active_spaces = results
+        classes = {
+            priority: {"depth": int(depth.get(priority, 0)), "knowledge_spaces": spaces}
+            for priority, spaces in zip(PRIORITY_CLASSES, active_spaces)
+        }
+        return classes, in_flight
+
+    async def get_load(self, memory: bool = True) -> Dict[str, Any]:
+        """Kennzahlen für die Admission Control: wartende Jobs, abgeschlossene Jobs pro
+        Stunden-Bucket (aktuelle und vorige Stunde) und optional Redis-Speicher
+        """
+        if not self.redis_client:
+            await self.connect()
+
+        bucket_names = stats.window_buckets(stats.utc_time(), hours=2)
+
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for name in bucket_names:
+                pipe.hmget(f"{self.queue_name}:stats:hourly:{name}", *stats.TERMINAL_STATUSES)
+            if memory:
+                pipe.info("memory")
+            self._depth_commands(pipe)
+            results = await pipe.execute(raise_on_error=False)
+
+        for result in results[:len(bucket_names)] + results[len(bucket_names) + memory:]:
+            if isinstance(result, Exception):
+                raise result
+        finished = {
+            name: sum(int(float(count or 0)) for count in counts)
+            for name, counts in zip(bucket_names, results)
+        }
+        # INFO kann gesperrt sein (z.B. bei verwalteten Redis-Instanzen)
+        info = results[len(bucket_names)] if memory else {}
+        if isinstance(info, Exception):
+            info = {}
+        classes, _ = self._parse_depths(results[len(bucket_names) + memory:])
+
+        return {
+            "queued": sum(c["depth"] for c in classes.values()),
+            "finished": finished,
+            "memory_used": int(info.get("used_memory") or 0),
+            "memory_max": int(info.get("maxmemory") or 0),
+        }
+
+    async def get_space_depth(self, knowledge_space_id: Optional[str]) -> Optional[int]:
+        """Wartende Jobs eines Knowledge Space über alle Prioritätsklassen"""
+        if not self.redis_client:
+            await self.connect()
+
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for priority in PRIORITY_CLASSES:
+                pipe.llen(f"{self.queue_name}:queue:{priority}:{knowledge_space_id or ''}")
+            return sum(await pipe.execute())
+
+    async def get_knowledge_space_stats(self) -> List[Dict[str, Any]]:
+        """Wartende Jobs, virtuelle Zeit und Limits pro Knowledge Space und Prioritätsklasse"""
+        if not self.redis_client:
+            await self.connect()
+
+        entries = []
+        for priority in PRIORITY_CLASSES:
+            spaces = await self.redis_client.zrange(
+                f"{self.queue_name}:active:{priority}", 0, -1, withscores=True
+            )
+            entries += [(priority, space, vtime) for space, vtime in spaces]
+
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for priority, space, _ in entries:
+                pipe.llen(f"{self.queue_name}:queue:{priority}:{space}")
+                pipe.scard(f"{self.queue_name}:running:{space}")
+            pipe.hgetall(f"{self.queue_name}:weights")
+            pipe.hgetall(f"{self.queue_name}:rates")
+            results = await pipe.execute()
+
+        weights, rates = results[-2], results[-1]
+        return [
+            {
+                "knowledge_space_id": space or None,
+                "priority": priority,
+                "depth": results[2 * index],
+                "running": results[2 * index + 1],
+                "virtual_time": round(vtime, 3),
+                "weight": float(weights.get(space, self.default_weight)),
+                "rate_limit": float(rates.get(space, self.default_rate_limit)),
+            }
+            for index, (priority, space, vtime) in enumerate(entries)
+        ]
+
+    async def set_knowledge_space_limits(
+        self,
+        knowledge_space_id: Optional[str],
+        weight: Optional[float] = None,
+        rate_limit: Optional[float] = None,
+    ):
+        """Gewicht (Fair Share) und Rate-Limit (Jobs/Sekunde, 0 = unbegrenzt) eines Space setzen"""
+        if not self.redis_client:
+            await self.connect()
+
+        space = knowledge_space_id or ""
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            if weight is not None:
+                pipe.hset(f"{self.queue_name}:weights", space, weight)
+            if rate_limit is not None:
+                pipe.hset(f"{self.queue_name}:rates", space, rate_limit)
+            await pipe.execute()
+
     async def close(self):
-        """Verbindung schließen"""
+        """Verbindung schließen (vorher ausstehenden Fortschritt schreiben)"""
         if self.redis_client:
-            self.redis_client.close()
+            try:
+                await self.progress.close()
+            except Exception as e:
+                logger.warning(f"Failed to flush job progress: {e}")
+        if self.blocking_client:
+            await self.blocking_client.aclose()
+            self.blocking_client = None
+        if self.redis_client:
+            await self.redis_client.aclose()
+            self.redis_client = None
             logger.info("Redis connection closed")
 
 
+def create_queue_manager(settings):
+    """Queue-Backend gemäß Konfiguration erzeugen (QUEUE_BACKEND)"""
+    backend = settings.queue_backend.lower()
+    if backend == "redis":
+        return QueueManager()
+    if backend == "redis-streams":
+        from src.queue.stream_queue import StreamQueueManager
+
+        return StreamQueueManager()
+    if backend == "memory":
+        if settings.ingestion_worker_processes:
+            raise ValueError(
+                "Memory queue backend cannot be shared with worker processes "
+                "(INGESTION_WORKER_PROCESSES must be 0)"
+            )
+        from src.queue.memory_queue import MemoryQueueManager
+
+        return MemoryQueueManager()
+    raise ValueError(f"Unknown queue backend: {settings.queue_backend}")
@@ -0,0 +1,488 @@
+"""
+Queue Lua-Skripte
+Atomare Redis-Operationen für die zuverlässige Queue
+
+Nur für eine einzelne Redis-Instanz: Die Skripte bilden Schlüssel (Listen pro Klasse und Space,
+sched, rates, weights, depth, doorbell) aus dem Präfix in ARGV, statt sie in KEYS zu übergeben,
+da der Scheduler den Space erst im Skript wählt. Mit Redis Cluster ist das nicht verträglich.
+"""
+
+# Gemeinsamer Lua-Baustein: Queue-Einträge lesen und ändern (siehe src/queue/codec.py).
+# v1 ist ein JSON-Objekt, v2 ein Header "\2" + key=value (getrennt durch \31) + "\30" + Payload.
+# Die Skripte lesen und ändern nur den Header, der (binäre) Payload bleibt unangetastet.
+# Inflight-Einträge: "worker\nraw" (früher JSON {worker, raw}).
+JOB_FORMAT = """
+local function job_header(raw)
+    if string.byte(raw, 1) ~= 2 then
+        local job = cjson.decode(raw)
+        return {
+            id = job.id,
+            priority = job.priority,
+            knowledge_space_id = job.data and job.data.knowledge_space_id,
+            attempts = job.attempts,
+        }
+    end
+    local header = {}
+    local stop = string.find(raw, '\\30', 2, true)
+    for field in string.gmatch(string.sub(raw, 2, stop - 1), '[^\\31]+') do
+        local eq = string.find(field, '=', 1, true)
+        header[string.sub(field, 1, eq - 1)] = string.sub(field, eq + 1)
+    end
+    return header
+end
+
+local function with_fields(raw, fields)
+    if string.byte(raw, 1) ~= 2 then
+        local job = cjson.decode(raw)
+        for key, value in pairs(fields) do
+            job[key] = value
+        end
+        return cjson.encode(job)
+    end
+    local header = job_header(raw)
+    for key, value in pairs(fields) do
+        header[key] = value
+    end
+    local parts = {}
+    for key, value in pairs(header) do
+        table.insert(parts, key .. '=' .. (string.gsub(tostring(value), '[\\30\\31]', ' ')))
+    end
+    local stop = string.find(raw, '\\30', 2, true)
+    return '\\2' .. table.concat(parts, '\\31') .. '\\30' .. string.sub(raw, stop + 1)
+end
+
+local function inflight_entry(worker, raw)
+    return worker .. '\\n' .. raw
+end
+
+local function parse_inflight(entry)
+    if string.sub(entry, 1, 1) == '{' then
+        local info = cjson.decode(entry)
+        return info.worker, info.raw
+    end
+    local sep = string.find(entry, '\\n', 1, true)
+    return string.sub(entry, 1, sep - 1), string.sub(entry, sep + 1)
+end
+"""
+
+# Gemeinsamer Lua-Baustein: Job in die Liste seiner Prioritätsklasse und seines Knowledge
+# Space legen. Ein Space, der (wieder) Jobs hat, startet mit der aktuellen virtuellen Zeit
+# der Klasse (Start-Time Fair Queuing) und bekommt so kein Guthaben aus Leerlaufphasen.
+# front = true legt den Job an den Anfang (erneut eingereihte Jobs sind als nächstes dran).
+PUSH_JOB = JOB_FORMAT + """
+local function job_space(job)
+    local space = job.knowledge_space_id
+    if type(space) ~= 'string' then
+        return ''
+    end
+    return space
+end
+
+-- Laufenden Job aus dem Limit seines Knowledge Space austragen und wartende Worker wecken
+local function free_slot(prefix, job)
+    if redis.call('SREM', prefix .. 'running:' .. job_space(job), job.id) == 1 then
+        redis.call('RPUSH', prefix .. 'doorbell', 1)
+        redis.call('LTRIM', prefix .. 'doorbell', 0, 999)
+    end
+end
+
+local function push_job(prefix, raw, front, default_class)
+    local job = job_header(raw)
+    local class = job.priority
+    if type(class) ~= 'string' then
+        class = default_class
+    end
+    local space = job_space(job)
+
+    local list = prefix .. 'queue:' .. class .. ':' .. space
+    if front then
+        redis.call('LPUSH', list, raw)
+    else
+        redis.call('RPUSH', list, raw)
+    end
+    redis.call('HINCRBY', prefix .. 'depth', class, 1)
+
+    local active = prefix .. 'active:' .. class
+    if not redis.call('ZSCORE', active, space) then
+        local vtime = redis.call('HGET', prefix .. 'sched', 'vtime:' .. class) or 0
+        redis.call('ZADD', active, vtime, space)
+    end
+
+    -- Wartende Worker wecken (Anzahl der Tokens begrenzt)
+    redis.call('RPUSH', prefix .. 'doorbell', 1)
+    redis.call('LTRIM', prefix .. 'doorbell', 0, 999)
+    return job.id
+end
+"""
+
+# Variante für das Redis-Streams-Backend (gleiche Signatur): Job an den Stream seiner
+# Prioritätsklasse anhängen. Streams kennen keinen Anfang; erneut eingereihte Jobs stehen
+# hinten, und Knowledge Spaces werden nicht getrennt geplant.
+PUSH_STREAM_JOB = JOB_FORMAT + """
+local function push_job(prefix, raw, front, default_class)
+    local job = job_header(raw)
+    local class = job.priority
+    if type(class) ~= 'string' then
+        class = default_class
+    end
+    redis.call('XADD', prefix .. 'stream:' .. class, '*', 'job', raw)
+    return job.id
+end
+"""
+
+# Jobs einreihen
+# ARGV: prefix, default_class, raw...
+_ENQUEUE = """
+for i = 3, #ARGV do
+    push_job(ARGV[1], ARGV[i], false, ARGV[2])
+end
+return #ARGV - 2
+"""
+ENQUEUE = PUSH_JOB + _ENQUEUE
+
+# Nächsten Job nach Priorität, Fair Share und Rate-Limit wählen und atomar an den Worker
+# übergeben (Processing-Liste, Lease, Inflight-Eintrag).
+# Klassen werden in Prioritätsreihenfolge bedient; jeder n-te Aufruf (every_n) kehrt die
+# Reihenfolge um, damit niedrige Klassen nicht verhungern. Innerhalb einer Klasse wird der
+# Knowledge Space mit der kleinsten virtuellen Zeit bedient; seine Zeit wächst pro Job um
+# 1 / Gewicht. Spaces ohne freie Rate-Limit-Tokens werden übersprungen, ebenso Spaces, die
+# schon space_limit Jobs in Arbeit haben (Set running:{space}, freigegeben bei Ack, Nack,
+# Reaper und Recovery); so blockiert ein ausgelasteter Space keine Worker.
+# KEYS: processing list, leases, inflight
+# ARGV: prefix, now, lease_until, scan_limit, default_weight, default_rate, burst, every_n,
+#       worker_id, space_limit (0 = unbegrenzt), classes... (höchste Priorität zuerst)
+# Rückgabe: {raw, ''} oder {'', Sekunden bis zum nächsten Token ('' = Queue leer)}
+DEQUEUE = JOB_FORMAT + """
+local prefix = ARGV[1]
+local now = tonumber(ARGV[2])
+local scan_limit = tonumber(ARGV[4])
+local default_weight = tonumber(ARGV[5])
+local default_rate = tonumber(ARGV[6])
+local burst = tonumber(ARGV[7])
+local every_n = tonumber(ARGV[8])
+local space_limit = tonumber(ARGV[10])
+
+local classes = {}
+for i = 11, #ARGV do
+    table.insert(classes, ARGV[i])
+end
+if every_n > 0 and #classes > 1 then
+    local tick = redis.call('HINCRBY', prefix .. 'sched', 'ticks', 1)
+    if tick % every_n == 0 then
+        local reversed = {}
+        for i = #classes, 1, -1 do
+            table.insert(reversed, classes[i])
+        end
+        classes = reversed
+    end
+end
+
+-- Token-Bucket pro Knowledge Space; Rückgabe 0 = Token entnommen, sonst Wartezeit
+local function take_token(space)
+    local rate = tonumber(redis.call('HGET', prefix .. 'rates', space)) or default_rate
+    if rate <= 0 then
+        return 0
+    end
+    local key = prefix .. 'tokens:' .. space
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local capacity = math.max(1, burst)
+    local tokens = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    if tokens < 1 then
+        return (1 - tokens) / rate
+    end
+    redis.call('HSET', key, 'tokens', tokens - 1, 'ts', now)
+    redis.call('EXPIRE', key, math.ceil(capacity / rate) + 60)
+    return 0
+end
+
+local min_wait = nil
+for _, class in ipairs(classes) do
+    local active = prefix .. 'active:' .. class
+    local candidates = redis.call('ZRANGE', active, 0, scan_limit - 1, 'WITHSCORES')
+    for i = 1, #candidates, 2 do
+        local space = candidates[i]
+        local vtime = tonumber(candidates[i + 1])
+        local list = prefix .. 'queue:' .. class .. ':' .. space
+
+        if redis.call('LLEN', list) == 0 then
+            redis.call('ZREM', active, space)
+        elseif space_limit > 0
+            and redis.call('SCARD', prefix .. 'running:' .. space) >= space_limit then
+            -- Ausgelastet: überspringen, ohne Token oder virtuelle Zeit zu verbrauchen
+        else
+            local wait = take_token(space)
+            if wait == 0 then
+                local raw = redis.call('LPOP', list)
+                redis.call('HINCRBY', prefix .. 'depth', class, -1)
+                redis.call('HSET', prefix .. 'sched', 'vtime:' .. class, vtime)
+                if redis.call('LLEN', list) > 0 then
+                    local weight = tonumber(redis.call('HGET', prefix .. 'weights', space))
+                        or default_weight
+                    redis.call('ZADD', active, vtime + 1 / math.max(weight, 0.001), space)
+                else
+                    redis.call('ZREM', active, space)
+                end
+
+                local job = job_header(raw)
+                if space_limit > 0 then
+                    redis.call('SADD', prefix .. 'running:' .. space, job.id)
+                end
+                redis.call('LPUSH', KEYS[1], raw)
+                redis.call('ZADD', KEYS[2], ARGV[3], job.id)
+                redis.call('HSET', KEYS[3], job.id, inflight_entry(ARGV[9], raw))
+                return {raw, ''}
+            elseif not min_wait or wait < min_wait then
+                min_wait = wait
+            end
+        end
+    end
+end
+
+if min_wait then
+    return {'', tostring(min_wait)}
+end
+-- Nichts mehr zu tun: übrige Weck-Tokens verwerfen
+redis.call('DEL', prefix .. 'doorbell')
+return {'', ''}
+"""
+
+# Abgelaufene Leases einsammeln: Job aus der Processing-Liste entfernen und
+# erneut einreihen bzw. nach zu vielen Versuchen in die Dead-Letter-Liste schieben.
+# KEYS: leases, inflight, dead
+# ARGV: now, max_retries, limit, processing_prefix, prefix, default_class
+REAP_EXPIRED = PUSH_JOB + """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[3]))
+local requeued = {}
+local dead = {}
+for _, job_id in ipairs(expired) do
+    redis.call('ZREM', KEYS[1], job_id)
+    local entry = redis.call('HGET', KEYS[2], job_id)
+    if entry then
+        redis.call('HDEL', KEYS[2], job_id)
+        local worker, raw = parse_inflight(entry)
+        redis.call('LREM', ARGV[4] .. worker, 1, raw)
+        free_slot(ARGV[5], job_header(raw))
+        local attempts = (tonumber(job_header(raw).attempts) or 0) + 1
+        raw = with_fields(raw, {attempts = attempts, last_error = 'visibility timeout expired'})
+        if attempts > tonumber(ARGV[2]) then
+            redis.call('LPUSH', KEYS[3], raw)
+            table.insert(dead, job_id)
+        else
+            push_job(ARGV[5], raw, true, ARGV[6])
+            table.insert(requeued, job_id)
+        end
+    end
+end
+return {requeued, dead}
+"""
+
+# Fällige verzögerte Retries zurück in die Queue verschieben
+# KEYS: delayed
+# ARGV: now, limit, prefix, default_class
+_PROMOTE_DELAYED = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+for _, raw in ipairs(due) do
+    redis.call('ZREM', KEYS[1], raw)
+    push_job(ARGV[3], raw, true, ARGV[4])
+end
+return #due
+"""
+PROMOTE_DELAYED = PUSH_JOB + _PROMOTE_DELAYED
+
+# Übrig gebliebene Jobs eines (neu gestarteten) Workers zurück in die Queue legen
+# KEYS: processing list, leases, inflight
+# ARGV: prefix, default_class
+RECOVER_WORKER = PUSH_JOB + """
+local raws = redis.call('LRANGE', KEYS[1], 0, -1)
+local recovered = {}
+for _, raw in ipairs(raws) do
+    local job = job_header(raw)
+    redis.call('ZREM', KEYS[2], job.id)
+    redis.call('HDEL', KEYS[3], job.id)
+    free_slot(ARGV[1], job)
+    push_job(ARGV[1], raw, true, ARGV[2])
+    table.insert(recovered, job.id)
+end
+redis.call('DEL', KEYS[1])
+return recovered
+"""
+
+# Jobs aus der Dead-Letter-Liste erneut einreihen (alle oder einen bestimmten)
+# KEYS: dead
+# ARGV: job_id (leer = alle), prefix, default_class
+_REQUEUE_DEAD = """
+local raws = redis.call('LRANGE', KEYS[1], 0, -1)
+local requeued = {}
+for _, raw in ipairs(raws) do
+    local job = job_header(raw)
+    if ARGV[1] == '' or job.id == ARGV[1] then
+        redis.call('LREM', KEYS[1], 1, raw)
+        push_job(ARGV[2], with_fields(raw, {attempts = 0}), true, ARGV[3])
+        table.insert(requeued, job.id)
+    end
+end
+return requeued
+"""
+REQUEUE_DEAD = PUSH_JOB + _REQUEUE_DEAD
+
+# Einträge der früheren einzelnen FIFO-Liste in die Scheduler-Listen übernehmen
+# KEYS: legacy queue
+# ARGV: prefix, default_class, limit
+_MIGRATE_LEGACY = """
+local moved = 0
+while moved < tonumber(ARGV[3]) do
+    local raw = redis.call('RPOP', KEYS[1])
+    if not raw then
+        break
+    end
+    push_job(ARGV[1], raw, false, ARGV[2])
+    moved = moved + 1
+end
+return moved
+"""
+MIGRATE_LEGACY = PUSH_JOB + _MIGRATE_LEGACY
+
+# Status-Hash feldweise schreiben und Zähler bei einem echten Statuswechsel anpassen.
+# Wartezeit und Latenz werden aus den gespeicherten Zeitstempeln (Epoch-Sekunden) berechnet.
+# Jede Änderung wird als Status-Event auf dem Channel veröffentlicht. Gehört der Job zu einem
+# Batch (Feld batch_id), werden dessen Status-Zähler ebenfalls angepasst.
+# KEYS: status hash, current gauges, hourly bucket
+# ARGV: new_status, now, ttl, hourly_ttl, create, channel, batch_prefix, n_bounds, bounds...,
+#       [field, value]...
+# Rückgabe: 1 = Statuswechsel, 0 = unverändert, -1 = unbekannter Job (create = 0)
+TRANSITION = """
+local key = KEYS[1]
+-- Alte Status-Records (JSON-String) ersetzen
+if redis.call('TYPE', key).ok == 'string' then
+    redis.call('DEL', key)
+end
+
+local old_status = redis.call('HGET', key, 'status')
+if not old_status and ARGV[5] ~= '1' then
+    return -1
+end
+
+local new_status = ARGV[1]
+local now = tonumber(ARGV[2])
+local n_bounds = tonumber(ARGV[8])
+local fields_start = 9 + n_bounds
+
+if #ARGV >= fields_start then
+    redis.call('HSET', key, unpack(ARGV, fields_start, #ARGV))
+end
+redis.call('HSET', key, 'status', new_status, 'updated_at', ARGV[2])
+local terminal = new_status == 'completed' or new_status == 'failed'
+if terminal then
+    redis.call('HSET', key, 'completed_at', ARGV[2])
+end
+redis.call('EXPIRE', key, ARGV[3])
+
+local event = redis.call('HMGET', key, 'id', 'document_id', 'progress', 'error')
+if event[2] then
+    redis.call('PUBLISH', ARGV[6], cjson.encode({
+        job_id = event[1] or nil,
+        document_id = event[2],
+        status = new_status,
+        progress = tonumber(event[3]),
+        error = event[4] or nil,
+        updated_at = now,
+    }))
+end
+
+if old_status == new_status then
+    return 0
+end
+
+local gauges = {queued = true, processing = true, retrying = true}
+if old_status and gauges[old_status] then
+    redis.call('HINCRBY', KEYS[2], old_status, -1)
+end
+if gauges[new_status] then
+    redis.call('HINCRBY', KEYS[2], new_status, 1)
+end
+
+local batch_id = redis.call('HGET', key, 'batch_id')
+if batch_id then
+    local batch_key = ARGV[7] .. batch_id
+    if old_status then
+        redis.call('HINCRBY', batch_key, old_status, -1)
+    end
+    redis.call('HINCRBY', batch_key, new_status, 1)
+    redis.call('EXPIRE', batch_key, ARGV[3])
+end
+
+local function histogram_bucket(seconds)
+    for i = 1, n_bounds do
+        local bound = ARGV[8 + i]
+        if seconds <= tonumber(bound) then
+            return 'le_' .. bound
+        end
+    end
+    return 'inf'
+end
+
+local increments = {}
+local function observe(prefix, since)
+    if since then
+        local seconds = math.max(0, now - since)
+        table.insert(increments, {prefix .. ':' .. histogram_bucket(seconds), 1})
+        table.insert(increments, {prefix .. ':sum', seconds})
+        table.insert(increments, {prefix .. ':count', 1})
+    end
+end
+
+local times = redis.call('HMGET', key, 'created_at', 'started_at')
+local created_at = tonumber(times[1])
+if new_status == 'queued' and not times[2] then
+    table.insert(increments, {'enqueued', 1})
+end
+if new_status == 'processing' then
+    observe('wait', created_at)
+end
+if terminal then
+    table.insert(increments, {new_status, 1})
+    observe('latency', created_at)
+end
+
+if #increments > 0 then
+    for _, increment in ipairs(increments) do
+        redis.call('HINCRBYFLOAT', KEYS[3], increment[1], increment[2])
+    end
+    redis.call('EXPIRE', KEYS[3], ARGV[4])
+end
+return 1
+"""
+
+# Fortschritt mehrerer Jobs in einem Aufruf schreiben (nur solange sie laufen)
+# KEYS: status hashes
+# ARGV: now, channel, progress...
+SET_PROGRESS = """
+local written = 0
+for i, key in ipairs(KEYS) do
+    if redis.call('HGET', key, 'status') == 'processing' then
+        local progress = ARGV[i + 2]
+        redis.call('HSET', key, 'progress', progress, 'updated_at', ARGV[1])
+        written = written + 1
+
+        local ids = redis.call('HMGET', key, 'id', 'document_id')
+        if ids[2] then
+            redis.call('PUBLISH', ARGV[2], cjson.encode({
+                job_id = ids[1] or nil,
+                document_id = ids[2],
+                status = 'processing',
+                progress = tonumber(progress),
+                updated_at = tonumber(ARGV[1]),
+            }))
+        end
+    end
+end
+return written
+"""
+
+# Einreihende Skripte für das Redis-Streams-Backend
+STREAM_ENQUEUE = PUSH_STREAM_JOB + _ENQUEUE
+STREAM_PROMOTE_DELAYED = PUSH_STREAM_JOB + _PROMOTE_DELAYED
+STREAM_REQUEUE_DEAD = PUSH_STREAM_JOB + _REQUEUE_DEAD
+STREAM_MIGRATE_LEGACY = PUSH_STREAM_JOB + _MIGRATE_LEGACY
@@ -0,0 +1,90 @@
+"""
+Queue-Statistiken
+Inkrementelle Zähler, stündliche Buckets und Latenz-Histogramme
+(fortgeschrieben im TRANSITION-Skript, hier ausgewertet)
+"""
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+# Status, die als aktueller Bestand (Gauge) gezählt werden
+GAUGE_STATUSES = ("queued", "processing", "retrying")
+
+# Endzustände, die pro Stunde gezählt werden
+TERMINAL_STATUSES = ("completed", "failed")
+
+# Histogramm-Grenzen in Sekunden
+LATENCY_BUCKETS = (1, 5, 10, 30, 60, 300, 900, 3600)
+
+# Stunden, die get_stats zusammenfasst
+WINDOW_HOURS = 24
+
+# Stündliche Buckets etwas länger halten als das Auswertungsfenster
+HOURLY_TTL = (WINDOW_HOURS + 1) * 3600
+
+
+def utc_time(timestamp: Optional[float] = None) -> datetime:
+    """Unix-Zeit (Standard: jetzt) als zeitzonenbehaftetes datetime in UTC"""
+    return datetime.fromtimestamp(time.time() if timestamp is None else timestamp, timezone.utc)
+
+
+def utc_isoformat(timestamp: Optional[float] = None) -> str:
+    """Unix-Zeit als ISO-8601 mit Offset (+00:00), wie in allen API-Antworten"""
+    return utc_time(timestamp).isoformat()
+
+
+def hour_bucket(moment: datetime) -> str:
+    """Bucket-Schlüssel einer Stunde"""
+    return moment.strftime("%Y%m%d%H")
+
+
+def window_buckets(now: datetime, hours: int = WINDOW_HOURS) -> List[str]:
+    """Bucket-Schlüssel der letzten Stunden (älteste zuerst)"""
+    return [hour_bucket(now - timedelta(hours=offset)) for offset in reversed(range(hours))]
+
+
+def _histogram(buckets: List[Dict[str, str]], prefix: str) -> Dict[str, Any]:
+    counts = {f"le_{bound}": 0 for bound in LATENCY_BUCKETS}
+    counts["inf"] = 0
+    total = 0.0
+    count = 0
+
+    for bucket in buckets:
+        for label in counts:
+            counts[label] += int(float(bucket.get(f"{prefix}:{label}", 0)))
+        total += float(bucket.get(f"{prefix}:sum", 0))
+        count += int(float(bucket.get(f"{prefix}:count", 0)))
+
+    return {
+        "buckets": counts,
+        "count": count,
+        "avg_seconds": round(total / count, 3) if count else None,
+    }
+
+
+def summarize(
+    current: Dict[str, str], bucket_names: List[str], buckets: List[Dict[str, str]]
+) -> Dict[str, Any]:
+    """Zähler und Buckets zu Statistiken zusammenfassen"""
+    statuses = {status: max(0, int(current.get(status, 0))) for status in GAUGE_STATUSES}
+    throughput = []
+    enqueued = 0
+
+    for name, bucket in zip(bucket_names, buckets):
+        hour = {
+            "hour": datetime.strptime(name, "%Y%m%d%H").replace(tzinfo=timezone.utc).isoformat(),
+            "enqueued": int(float(bucket.get("enqueued", 0))),
+        }
+        for status in TERMINAL_STATUSES:
+            hour[status] = int(float(bucket.get(status, 0)))
+            statuses[status] = statuses.get(status, 0) + hour[status]
+        enqueued += hour["enqueued"]
+        throughput.append(hour)
+
+    return {
+        "statuses": statuses,
+        "total_jobs": enqueued,
+        "throughput": throughput,
+        "latency": _histogram(buckets, "latency"),
+        "queue_wait": _histogram(buckets, "wait"),
+    }
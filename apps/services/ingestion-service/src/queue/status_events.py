@@ -0,0 +1,126 @@
+"""
+Status Events
+Verteilt Status-Events aus Redis Pub/Sub an lokale Abonnenten (z.B. SSE-Streams)
+"""
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterable, Optional, Set
+
+from src.queue.queue_manager import format_status
+
+logger = logging.getLogger(__name__)
+
+
+class StatusSubscription:
+    """Gepufferte Events eines Abonnenten, gefiltert nach Dokument-IDs (leer = alle)"""
+
+    def __init__(self, document_ids: Optional[Iterable[str]], buffer_size: int):
+        self.document_ids: Set[str] = set(document_ids or ())
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, buffer_size))
+        self.dropped = 0
+
+    def push(self, event: Dict[str, Any]):
+        """Event einreihen; bei vollem Puffer das älteste verwerfen (langsamer Client)"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Nächstes Event oder None nach Ablauf des Timeouts"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class StatusEventBroker:
+    """Eine Pub/Sub-Verbindung pro Prozess, Fan-out an beliebig viele lokale Abonnenten"""
+
+    def __init__(self, queue_manager, buffer_size: int = 100):
+        self.queue_manager = queue_manager
+        self.buffer_size = buffer_size
+        self._by_document: Dict[str, Set[StatusSubscription]] = {}
+        self._all: Set[StatusSubscription] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._pubsub = None
+        self._start_lock = asyncio.Lock()
+        self.events = 0
+
+    async def _start(self):
+        """Listener beim ersten Abonnenten starten"""
+        async with self._start_lock:
+            if self._task and not self._task.done():
+                return
+
+            client = await self.queue_manager.get_client()
+            self._pubsub = client.pubsub(ignore_subscribe_messages=True)
+            await self._pubsub.subscribe(self.queue_manager.events_channel)
+            self._task = asyncio.create_task(self._listen())
+
+    async def _listen(self):
+        while True:
+            try:
+                message = await self._pubsub.get_message(timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Status event listener error: {e}")
+                await asyncio.sleep(1.0)
+                continue
+
+            if message and message.get("type") == "message":
+                try:
+                    self._dispatch(json.loads(message["data"]))
+                except (TypeError, ValueError) as e:
+                    logger.warning(f"Invalid status event: {e}")
+
+    def _dispatch(self, event: Dict[str, Any]):
+        self.events += 1
+        event = format_status(event)
+        for subscription in self._all | self._by_document.get(event.get("document_id"), set()):
+            subscription.push(event)
+
+    @asynccontextmanager
+    async def subscribe(
+        self, document_ids: Optional[Iterable[str]] = None
+    ) -> AsyncIterator[StatusSubscription]:
+        """Events abonnieren, solange der Kontext offen ist"""
+        await self._start()
+        subscription = StatusSubscription(document_ids, self.buffer_size)
+
+        if subscription.document_ids:
+            for document_id in subscription.document_ids:
+                self._by_document.setdefault(document_id, set()).add(subscription)
+        else:
+            self._all.add(subscription)
+
+        try:
+            yield subscription
+        finally:
+            self._all.discard(subscription)
+            for document_id in subscription.document_ids:
+                subscribers = self._by_document.get(document_id)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._by_document[document_id]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": len(self._all)
+            + len({s for subscribers in self._by_document.values() for s in subscribers}),
+            "documents": len(self._by_document),
+            "events": self.events,
+        }
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._pubsub is not None:
+            await self._pubsub.reset()
+            self._pubsub = None
@@ -0,0 +1,328 @@
+"""
+Stream Queue
+Queue-Backend auf Redis Streams: ein Stream pro Prioritätsklasse, eine Consumer Group für alle Worker
+"""
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from redis.exceptions import ResponseError
+
+from src.queue import scripts
+from src.queue.queue_manager import (
+    PRIORITY_BULK,
+    PRIORITY_CLASSES,
+    QueueManager,
+    UnsupportedOperationError,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class StreamQueueManager(QueueManager):
+    """Queue Manager auf Redis Streams (ab Redis 7).
+
+    Worker lesen per XREADGROUP, Redis verteilt die Einträge auf die Consumer; Ack ist ein XACK.
+    Einträge mit abgelaufener Lease holt der Reaper per XAUTOCLAIM zurück und kürzt die Streams
+    per XTRIM MINID. Status, Statistik, Batches, Retries und Dead-Letter-Liste wie beim
+    Listen-Backend; Fair Share und Rate-Limits pro Knowledge Space gibt es nicht.
+    """
+
+    SCRIPTS = {
+        **QueueManager.SCRIPTS,
+        "enqueue": scripts.STREAM_ENQUEUE,
+        "migrate": scripts.STREAM_MIGRATE_LEGACY,
+        "promote": scripts.STREAM_PROMOTE_DELAYED,
+        "requeue_dead": scripts.STREAM_REQUEUE_DEAD,
+    }
+    GROUP = "workers"
+    # Consumer, dem der Reaper abgelaufene Einträge bis zum erneuten Einreihen zuweist
+    REAPER = "reaper"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.space_concurrency:
+            logger.warning(
+                "KNOWLEDGE_SPACE_CONCURRENCY is not supported by the redis-streams backend, "
+                "ignoring it"
+            )
+            self.space_concurrency = 0
+        self._ticks = 0
+        # Pro Worker: bereits zugestellte, noch nicht übernommene Einträge (Stream, ID, Felder)
+        self._buffered: Dict[str, List[Tuple[str, str, Dict[str, Any]]]] = {}
+
+    def _stream_key(self, priority: str) -> str:
+        return f"{self.prefix}stream:{priority}"
+
+    async def _migrate_legacy_queue(self):
+        """Consumer Groups anlegen und Jobs der früheren FIFO-Liste in die Streams übernehmen"""
+        for priority in PRIORITY_CLASSES:
+            stream = self._stream_key(priority)
+            if await self.redis_client.exists(stream):
+                groups = await self.redis_client.xinfo_groups(stream)
+                if any(group["name"] == self.GROUP for group in groups):
+                    continue
+            try:
+                await self.redis_client.xgroup_create(stream, self.GROUP, id="0", mkstream=True)
+            except ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+
+        depth = await self.redis_client.hgetall(f"{self.queue_name}:depth")
+        if any(int(count) > 0 for count in depth.values()):
+            logger.warning(
+                "List-based queue still has jobs that the redis-streams backend does not read; "
+                "drain it with QUEUE_BACKEND=redis first"
+            )
+        await super()._migrate_legacy_queue()
+
+    async def _receive(self, worker_id: str) -> tuple:
+        """Nächsten Eintrag per XREADGROUP lesen: erst ohne Warten in Prioritätsreihenfolge,
+        dann blockierend über alle Streams. Rückgabe (raw, (Stream, Entry-ID)) bzw. ('', None)
+        """
+        buffered = await self._take_buffered(worker_id)
+        if buffered[0]:
+            return buffered
+
+        classes = list(PRIORITY_CLASSES)
+        # Wie beim Listen-Backend: jeder n-te Dequeue (pro Prozess) bedient zuerst Bulk-Jobs
+        self._ticks += 1
+        if self.bulk_every > 0 and self._ticks % self.bulk_every == 0:
+            classes.reverse()
+
+        for priority in classes:
+            response = await self.redis_client.xreadgroup(
+                self.GROUP, worker_id, {self._stream_key(priority): ">"}, count=1
+            )
+            if response and response[0][1]:
+                return self._select(worker_id, response, classes)
+
+        response = await self.blocking_client.xreadgroup(
+            self.GROUP,
+            worker_id,
+            {self._stream_key(priority): ">" for priority in classes},
+            count=1,
+            block=max(1, int(self.dequeue_timeout * 1000)),
+        )
+        if response:
+            return self._select(worker_id, response, classes)
+        return "", None
+
+    def _select(self, worker_id: str, response: List[Any], classes: List[str]) -> tuple:
+        """Eintrag der höchsten Klasse übernehmen; weitere (selten: mehrere Streams in einer
+        Antwort) bleiben dem Worker zugestellt und werden bei den nächsten Dequeues übernommen,
+        ohne ihre Position im Stream zu verlieren
+        """
+        entries = {stream: items[0] for stream, items in response if items}
+        ordered = [
+            (stream, *entries[stream])
+            for stream in (self._stream_key(priority) for priority in classes)
+            if stream in entries
+        ]
+        if not ordered:
+            return "", None
+
+        if len(ordered) > 1:
+            self._buffered.setdefault(worker_id, []).extend(ordered[1:])
+
+        stream, entry_id, fields = ordered[0]
+        return fields["job"], (stream, entry_id)
+
+    async def _take_buffered(self, worker_id: str) -> tuple:
+        """Zuvor mitgelieferten Eintrag übernehmen und seine Lease erneuern; hat der Reaper ihn
+        inzwischen zurückgeholt, ist er nicht mehr ausstehend und wird übersprungen
+        """
+        buffered = self._buffered.get(worker_id)
+        while buffered:
+            stream, entry_id, fields = buffered.pop(0)
+            claimed = await self.redis_client.xclaim(
+                stream, self.GROUP, worker_id, 0, [entry_id], justid=True
+            )
+            if claimed:
+                return fields["job"], (stream, entry_id)
+        self._buffered.pop(worker_id, None)
+        return "", None
+
+    def _release(self, pipe, job_id: str, worker_id: str, raw: str, position: Any):
+        stream, entry_id = position
+        pipe.xack(stream, self.GROUP, entry_id)
+
+    def _free_slot(self, pipe, job: Dict[str, Any]):
+        """Streams begrenzen Knowledge Spaces nicht"""
+
+    async def extend_lease(self, job: Dict[str, Any]):
+        """Idle-Zeit des Eintrags zurücksetzen (XCLAIM an denselben Consumer, Heartbeat)"""
+        if not self.redis_client:
+            await self.connect()
+
+        inflight = self._inflight.get(job["id"])
+        if not inflight:
+            return
+
+        worker_id, _, (stream, entry_id) = inflight
+        await self.redis_client.xclaim(stream, self.GROUP, worker_id, 0, [entry_id], justid=True)
+
+    async def reap(self, limit: int = 100) -> Dict[str, int]:
+        """Einträge mit abgelaufener Lease per XAUTOCLAIM zurückholen, fällige Retries einreihen
+        und bestätigte Einträge aus den Streams entfernen
+        """
+        if not self.redis_client:
+            await self.connect()
+
+        now = time.time()
+        requeued: List[str] = []
+        dead: List[str] = []
+        min_idle = int(self.visibility_timeout * 1000)
+
+        for priority in PRIORITY_CLASSES:
+            stream = self._stream_key(priority)
+            # XAUTOCLAIM prüft je Aufruf höchstens limit ausstehende Einträge; dem Cursor
+            # folgen, bis die ganze Pending-Liste durchlaufen ist
+            cursor = "0-0"
+            while True:
+                result = await self.redis_client.xautoclaim(
+                    stream, self.GROUP, self.REAPER, min_idle, cursor, count=limit
+                )
+                cursor, entries = result[0], result[1]
+                # Ab Redis 7: IDs, die noch ausstanden, aber schon aus dem Stream entfernt sind
+                deleted = result[2] if len(result) > 2 else []
+                if entries or deleted:
+                    await self._requeue_expired(stream, entries, deleted, requeued, dead)
+                if cursor == "0-0":
+                    break
+
+        promoted = await self._scripts["promote"](
+            keys=[f"{self.queue_name}:delayed"],
+            args=[now, limit, self.prefix, PRIORITY_BULK],
+        )
+        await self._trim_streams()
+
+        for job_id in requeued:
+            logger.warning(f"Visibility timeout expired, job requeued: {job_id}")
+            await self.update_status(job_id, "queued", error="visibility timeout expired")
+        for job_id in dead:
+            logger.error(f"Visibility timeout expired too often, job dead-lettered: {job_id}")
+            await self.update_status(job_id, "failed", error="visibility timeout expired")
+
+        return {"requeued": len(requeued), "dead": len(dead), "promoted": promoted}
+
+    async def _requeue_expired(
+        self,
+        stream: str,
+        entries: List[Any],
+        deleted: List[str],
+        requeued: List[str],
+        dead: List[str],
+    ):
+        """Vom Reaper übernommene Einträge bestätigen und neu anhängen bzw. in die Dead Letters"""
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            for entry_id, fields in entries:
+                pipe.xack(stream, self.GROUP, entry_id)
+                raw = (fields or {}).get("job")
+                if not raw:
+                    continue
+
+                header = self.codec.header(raw)
+                attempts = int(header.get("attempts") or 0) + 1
+                raw = self.codec.replace_fields(
+                    raw, {"attempts": attempts, "last_error": "visibility timeout expired"}
+                )
+                if attempts > self.max_retries:
+                    pipe.lpush(f"{self.queue_name}:dead", raw)
+                    dead.append(header["id"])
+                else:
+                    pipe.xadd(stream, {"job": raw})
+                    requeued.append(header["id"])
+            if deleted:
+                pipe.xack(stream, self.GROUP, *deleted)
+            await pipe.execute()
+
+    async def _trim_streams(self):
+        """Bestätigte Einträge entfernen: alles vor dem ältesten unbestätigten bzw. (ohne
+        ausstehende Einträge) vor dem zuletzt ausgelieferten (XTRIM MINID, approximativ)
+        """
+        for priority in PRIORITY_CLASSES:
+            stream = self._stream_key(priority)
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.xinfo_groups(stream)
+                pipe.xpending(stream, self.GROUP)
+                groups, pending = await pipe.execute()
+
+            group = next((group for group in groups if group["name"] == self.GROUP), None)
+            if group is None:
+                continue
+            min_id = pending["min"] if pending["pending"] else group["last-delivered-id"]
+            await self.redis_client.xtrim(stream, minid=min_id, approximate=True)
+
+    async def recover_worker(self, worker_id: str) -> int:
+        """Unbestätigte Einträge eines neu gestarteten Workers erneut einreihen"""
+        if not self.redis_client:
+            await self.connect()
+
+        recovered: List[str] = []
+        for priority in PRIORITY_CLASSES:
+            stream = self._stream_key(priority)
+            # ID 0 liest die eigene Pending-Liste des Consumers statt neuer Einträge
+            response = await self.redis_client.xreadgroup(
+                self.GROUP, worker_id, {stream: "0"}, count=1000
+            )
+            entries = response[0][1] if response else []
+            if not entries:
+                continue
+
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                for entry_id, fields in entries:
+                    pipe.xack(stream, self.GROUP, entry_id)
+                    raw = (fields or {}).get("job")
+                    if raw:
+                        pipe.xadd(stream, {"job": raw})
+                        recovered.append(self.codec.header(raw)["id"])
+                await pipe.execute()
+
+        for job_id in recovered:
+            await self.update_status(job_id, "queued")
+
+        if recovered:
+            logger.warning(f"Recovered {len(recovered)} unfinished jobs of worker {worker_id}")
+        return len(recovered)
+
+    def _depth_commands(self, pipe):
+        for priority in PRIORITY_CLASSES:
+            pipe.xinfo_groups(self._stream_key(priority))
+            pipe.xlen(self._stream_key(priority))
+
+    def _parse_depths(self, results: List[Any]) -> tuple:
+        classes = {}
+        in_flight = 0
+        for index, priority in enumerate(PRIORITY_CLASSES):
+            groups, length = results[2 * index], results[2 * index + 1]
+            group = next((group for group in groups if group["name"] == self.GROUP), {})
+            pending = group.get("pending") or 0
+            in_flight += pending
+            # lag: noch nicht ausgelieferte Einträge; nach XDEL/XTRIM meldet Redis ihn als
+            # unbekannt (nil). Dann obere Schranke aus der Stream-Länge: der Reaper kürzt den
+            # Stream bis zum ältesten ausstehenden Eintrag, übrig bleiben also ausstehende,
+            # noch nicht ausgelieferte und wenige bereits bestätigte Einträge
+            lag = group.get("lag")
+            depth = lag if lag is not None else max(0, (length or 0) - pending)
+            # Knowledge Spaces werden nicht geführt
+            classes[priority] = {"depth": depth, "knowledge_spaces": None}
+        return classes, in_flight
+
+    async def get_space_depth(self, knowledge_space_id: Optional[str]) -> Optional[int]:
+        """Streams führen keine Tiefe pro Knowledge Space (keine Quota möglich)"""
+        return None
+
+    async def get_knowledge_space_stats(self) -> List[Dict[str, Any]]:
+        """Streams planen nicht pro Knowledge Space"""
+        return []
+
+    async def set_knowledge_space_limits(
+        self,
+        knowledge_space_id: Optional[str],
+        weight: Optional[float] = None,
+        rate_limit: Optional[float] = None,
+    ):
+        raise UnsupportedOperationError(
+            "Knowledge space weights and rate limits require QUEUE_BACKEND=redis or memory"
+        )
@@ -0,0 +1,114 @@
+"""
+Archive
+Entpackt ZIP-/TAR-Archive eintragsweise (gestreamt) in den Blob-Spool
+"""
+import fnmatch
+import logging
+import posixpath
+import tarfile
+import zipfile
+import zlib
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
+
+from src.storage.blob_spool import BlobSpool, BlobTooLargeError
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+# Metadaten von Packprogrammen und versteckte Dateien
+IGNORED_MEMBERS = ("__MACOSX/*", ".*", "*/.*", "*~", "Thumbs.db", "*/Thumbs.db", "desktop.ini")
+
+
+class ArchiveLimitError(Exception):
+    """Archiv überschreitet die erlaubte Anzahl Dateien bzw. Gesamtgröße; blobs sind gespoolte,
+    nicht mehr ausgelieferte Einträge (vom Aufrufer freizugeben)"""
+
+    def __init__(self, message: str, blob: Optional[Dict[str, Any]] = None):
+        super().__init__(message)
+        self.blobs: List[Dict[str, Any]] = [blob] if blob else []
+
+
+def is_archive(filename: Optional[str]) -> bool:
+    return bool(filename) and filename.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def _ignored(name: str) -> bool:
+    return any(fnmatch.fnmatch(name, pattern) for pattern in IGNORED_MEMBERS)
+
+
+def _members(fileobj: IO[bytes], filename: str) -> Iterator[Tuple[str, IO[bytes]]]:
+    """(Name, Dateiobjekt) aller regulären Dateien des Archivs"""
+    if filename.lower().endswith(".zip"):
+        # ZIP braucht das zentrale Verzeichnis am Dateiende, daher wahlfreier Zugriff
+        with zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                if not info.is_dir():
+                    with archive.open(info) as member:
+                        yield info.filename, member
+        return
+
+    # TAR wird rein sequenziell gelesen (auch komprimiert)
+    with tarfile.open(fileobj=fileobj, mode="r|*") as archive:
+        for info in archive:
+            if info.isfile():
+                member = archive.extractfile(info)
+                if member is not None:
+                    yield info.name, member
+
+
+def extract_to_spool(
+    spool: BlobSpool,
+    fileobj: IO[bytes],
+    filename: str,
+    max_files: int = 0,
+    max_bytes: int = 0,
+) -> Iterator[Dict[str, Any]]:
+    """Einträge nacheinander in den Spool streamen (blockierend, im Thread aufrufen).
+
+    Liefert pro Datei {"name", "blob"} bzw. {"name", "error"} für abgelehnte Einträge. Ein
+    ungültiges oder defektes Archiv endet mit einem Fehler-Eintrag unter dem Archivnamen;
+    die bis dahin gelieferten Einträge bleiben gültig.
+    """
+    files = 0
+    total = 0
+
+    try:
+        for name, member in _members(fileobj, filename):
+            name = posixpath.normpath(name).lstrip("/")
+            if _ignored(name):
+                continue
+
+            files += 1
+            if max_files and files > max_files:
+                raise ArchiveLimitError(f"Archive {filename} contains more than {max_files} files")
+
+            try:
+                blob = spool.copy_stream(member)
+            except BlobTooLargeError as e:
+                yield {"name": name, "error": str(e)}
+                continue
+
+            total += blob["size"]
+            if max_bytes and total > max_bytes:
+                # Freigabe durch den Aufrufer, zusammen mit den übrigen nicht eingereihten Blobs
+                raise ArchiveLimitError(f"Archive {filename} exceeds {max_bytes} bytes", blob)
+
+            yield {"name": name, "blob": blob}
+    except (zipfile.BadZipFile, tarfile.TarError, EOFError, zlib.error) as e:
+        yield {"name": filename, "error": f"Invalid archive: {e}"}
+
+
+def take(entries: Iterator[Dict[str, Any]], count: int) -> List[Dict[str, Any]]:
+    """Die nächsten count Einträge (für schrittweises Entpacken aus dem Thread)"""
+    batch = []
+    try:
+        for entry in entries:
+            batch.append(entry)
+            if len(batch) >= count:
+                break
+    except ArchiveLimitError as e:
+        # Bereits entnommene Einträge erreichen den Aufrufer nicht mehr
+        e.blobs.extend(entry["blob"] for entry in batch if "blob" in entry)
+        raise
+    return batch
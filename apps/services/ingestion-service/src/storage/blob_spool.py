@@ -0,0 +1,146 @@
+"""
+Blob Spool
+Streamt Uploads/Dateien content-adressiert auf Disk; die Queue enthält nur Referenzen
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import uuid
+from pathlib import Path
+from typing import Any, Awaitable, BinaryIO, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class BlobTooLargeError(Exception):
+    """Blob überschreitet die maximale Größe"""
+
+
+class BlobSpool:
+    """Content-adressierter Blob-Spool (Pfad, Größe, SHA-256) mit einem Link pro Blob"""
+
+    def __init__(self, directory: str, chunk_size: int = 1024 * 1024, max_bytes: int = 0):
+        self.directory = Path(directory)
+        self.chunk_size = chunk_size
+        self.max_bytes = max_bytes
+        (self.directory / "tmp").mkdir(parents=True, exist_ok=True)
+
+    async def write_stream(self, read: Callable[[int], Awaitable[bytes]]) -> Dict[str, Any]:
+        """Stream blockweise lesen, dabei hashen und in den Spool schreiben"""
+        tmp_path = self.directory / "tmp" / uuid.uuid4().hex
+        digest = hashlib.sha256()
+        size = 0
+
+        try:
+            with open(tmp_path, "wb") as f:
+                while True:
+                    block = await read(self.chunk_size)
+                    if not block:
+                        break
+                    size += len(block)
+                    if self.max_bytes and size > self.max_bytes:
+                        raise BlobTooLargeError(f"Blob exceeds {self.max_bytes} bytes")
+                    digest.update(block)
+                    await asyncio.to_thread(f.write, block)
+
+            return await asyncio.to_thread(self._commit, tmp_path, digest.hexdigest(), size)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    async def write_upload(self, upload) -> Dict[str, Any]:
+        """FastAPI-UploadFile streamen"""
+        return await self.write_stream(upload.read)
+
+    async def write_file(self, path: str) -> Dict[str, Any]:
+        """Lokale Datei in den Spool kopieren (im Thread, blockweise gehasht)"""
+        return await asyncio.to_thread(self._copy_file, Path(path))
+
+    async def write_bytes(self, content: bytes) -> Dict[str, Any]:
+        """Bereits geladenen Inhalt in den Spool schreiben"""
+        position = 0
+
+        async def read(size: int) -> bytes:
+            nonlocal position
+            block = content[position:position + size]
+            position += len(block)
+            return block
+
+        return await self.write_stream(read)
+
+    def _copy_file(self, source: Path) -> Dict[str, Any]:
+        with open(source, "rb") as src:
+            return self.copy_stream(src)
+
+    def copy_stream(self, src: BinaryIO) -> Dict[str, Any]:
+        """Dateiobjekt blockweise in den Spool kopieren (blockierend)"""
+        tmp_path = self.directory / "tmp" / uuid.uuid4().hex
+        digest = hashlib.sha256()
+        size = 0
+
+        try:
+            with open(tmp_path, "wb") as dst:
+                while True:
+                    block = src.read(self.chunk_size)
+                    if not block:
+                        break
+                    size += len(block)
+                    if self.max_bytes and size > self.max_bytes:
+                        raise BlobTooLargeError(f"Blob exceeds {self.max_bytes} bytes")
+                    digest.update(block)
+                    dst.write(block)
+
+            return self._commit(tmp_path, digest.hexdigest(), size)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def _canonical_path(self, sha256: str) -> Path:
+        return self.directory / sha256[:2] / sha256
+
+    def _commit(self, tmp_path: Path, sha256: str, size: int) -> Dict[str, Any]:
+        """Temporäre Datei als eigenen Blob übernehmen.
+
+        Jeder Blob hat einen eigenen Pfad (<sha256>.<id>), sodass das Löschen eines Blobs nie
+        die Eingabe eines anderen Jobs entfernt. Gleiche Inhalte teilen sich per Hardlink auf
+        den kanonischen Pfad <sha256> den Speicher; dieser dient nur als Fundstelle.
+        """
+        canonical = self._canonical_path(sha256)
+        path = canonical.with_name(f"{sha256}.{uuid.uuid4().hex[:12]}")
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        try:
+            # Atomar: entweder existiert die Datei noch und bleibt über den neuen Link erhalten,
+            # oder der Link scheitert und der eigene Inhalt wird verwendet
+            os.link(canonical, path)
+        except OSError:
+            os.replace(tmp_path, path)
+            try:
+                os.link(path, canonical)
+            except OSError:
+                # Schon vorhanden (paralleler Upload) bzw. Dateisystem ohne Hardlinks
+                pass
+
+        return {"path": str(path), "size": size, "sha256": sha256}
+
+    def delete(self, blob: Dict[str, Any]):
+        """Blob entfernen; der kanonische Pfad geht mit dem letzten Blob desselben Inhalts.
+
+        Ein paralleler Link auf den kanonischen Pfad ist unkritisch: der neue Blob hält den
+        Inhalt über seinen eigenen Link.
+        """
+        try:
+            os.remove(blob["path"])
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Failed to delete blob {blob['path']}: {e}")
+            return
+
+        canonical = self._canonical_path(blob["sha256"])
+        try:
+            if os.stat(canonical).st_nlink <= 1:
+                os.remove(canonical)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Failed to delete blob {canonical}: {e}")
@@ -3,52 +3,127 @@ File Watcher
 Überwacht Dateisystem auf neue/geänderte Dokumente
 """
 import asyncio
-from pathlib import Path
-from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler, FileSystemEvent
-from typing import Optional, Set
+import fnmatch
 import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from watchdog.events import FileSystemEvent, FileSystemEventHandler
+from watchdog.observers import Observer
+from watchdog.observers.api import ObservedWatch
+
+from src.config import get_settings
+from src.watcher.registry import Fingerprint, WatchRegistry
 
 logger = logging.getLogger(__name__)
 
 
 class DocumentEventHandler(FileSystemEventHandler):
-    """Event Handler für Dokument-Änderungen"""
+    """Event Handler für Dokument-Änderungen (läuft im Observer-Thread)"""
 
-    def __init__(self, processor):
-        self.processor = processor
+    def __init__(self, watcher: "FileWatcher"):
+        self.watcher = watcher
         super().__init__()
 
     def on_created(self, event: FileSystemEvent):
         """Neue Datei erstellt"""
         if not event.is_directory:
-            asyncio.create_task(self.processor.handle_file(event.src_path))
+            self.watcher.notify(event.src_path)
 
     def on_modified(self, event: FileSystemEvent):
         """Datei geändert"""
         if not event.is_directory:
-            asyncio.create_task(self.processor.handle_file(event.src_path))
+            self.watcher.notify(event.src_path)
+
+    def on_moved(self, event: FileSystemEvent):
+        """Datei verschoben bzw. umbenannt (z.B. atomares Speichern über eine Temp-Datei)"""
+        if not event.is_directory:
+            self.watcher.notify(event.dest_path)
 
 
 class FileWatcher:
-    """File Watcher Service"""
+    """File Watcher Service
 
-    def __init__(self, processor):
+    Events aus dem Observer-Thread werden thread-sicher an den Event Loop übergeben und pro
+    Pfad entprellt: erst wenn eine Datei `debounce` Sekunden lang kein Event mehr ausgelöst
+    hat, wird sie verarbeitet. Dateien mit unverändertem Fingerprint (mtime, Größe, Hash)
+    werden übersprungen. Pfade und Fingerprints werden in der Watch-Registry gespeichert;
+    nach einem Neustart werden nur Dateien verarbeitet, die sich inzwischen geändert haben.
+    """
+
+    def __init__(
+        self,
+        processor,
+        debounce: Optional[float] = None,
+        concurrency: Optional[int] = None,
+        ignore_patterns: Optional[str] = None,
+        registry: Optional[WatchRegistry] = None,
+    ):
+        settings = get_settings()
         self.processor = processor
+        self.debounce = settings.watcher_debounce if debounce is None else debounce
+        self.concurrency = max(1, concurrency or settings.watcher_concurrency)
+        patterns = settings.watcher_ignore_patterns if ignore_patterns is None else ignore_patterns
+        self.ignore_patterns = [p.strip() for p in patterns.split(",") if p.strip()]
         self.observer: Optional[Observer] = None
         self.watch_paths: Set[str] = set()
-        self.event_handler = DocumentEventHandler(processor)
+        self.event_handler = DocumentEventHandler(self)
+        # Eigenes Handle pro Pfad, damit er einzeln entfernt werden kann
+        self._watches: Dict[str, ObservedWatch] = {}
+        self._last_scan: Dict[str, Optional[float]] = {}
+
+        if registry is None and settings.watch_registry_path:
+            registry = WatchRegistry(settings.watch_registry_path)
+        self.registry = registry
+        self.registry_flush_interval = settings.watch_registry_flush_interval
+        self._flusher: Optional[asyncio.Task] = None
+        # Noch nicht persistierte Änderungen: Pfad -> (Watch-Pfad, Fingerprint) bzw. gelöschte Pfade
+        self._unsaved: Dict[str, Tuple[str, Fingerprint]] = {}
+        self._deleted: Set[str] = set()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._work: Optional[asyncio.Queue] = None
+        self._consumers: List[asyncio.Task] = []
+        self._scans: Set[asyncio.Task] = set()
+        # Pfade, die eingereiht bzw. in Arbeit sind; Events währenddessen lösen einen Nachlauf aus
+        self._queued: Set[str] = set()
+        self._running: Set[str] = set()
+        self._dirty: Set[str] = set()
+        # Pfad -> (mtime_ns, Größe, sha256) der zuletzt verarbeiteten Version
+        self._fingerprints: Dict[str, Fingerprint] = {}
+        self.metrics = {
+            "events": 0,
+            "scanned": 0,
+            "enqueued": 0,
+            "unchanged": 0,
+            "ignored": 0,
+            "errors": 0,
+        }
 
     def start(self):
-        """Watcher starten"""
+        """Watcher starten (im laufenden Event Loop aufrufen)"""
         if self.observer and self.observer.is_alive():
             logger.warning("File watcher already running")
             return
 
+        self._loop = asyncio.get_running_loop()
+        self._work = asyncio.Queue()
+        self._consumers = [
+            self._loop.create_task(self._consume(), name=f"file-watcher-{i}")
+            for i in range(self.concurrency)
+        ]
+
         self.observer = Observer()
         self.observer.start()
         logger.info("File watcher started")
 
+        if self.registry:
+            self._flusher = self._loop.create_task(self._flush_registry())
+            self._spawn(self._restore())
+
     def stop(self):
         """Watcher stoppen"""
         if self.observer:
@@ -56,10 +131,55 @@ class FileWatcher:
             self.observer.join()
             logger.info("File watcher stopped")
 
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        for task in [*self._consumers, *self._scans]:
+            task.cancel()
+        self._consumers = []
+        self._scans.clear()
+
+        if self.registry:
+            if self._flusher:
+                self._flusher.cancel()
+                self._flusher = None
+            # Letzte Änderungen synchron schreiben (der Loop läuft ggf. nicht mehr lange)
+            try:
+                self.registry.flush(self._unsaved, self._deleted)
+                self._unsaved, self._deleted = {}, set()
+            except Exception as e:
+                logger.error(f"Failed to persist watch registry: {e}")
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = self._loop.create_task(coro)
+        self._scans.add(task)
+        task.add_done_callback(self._scans.discard)
+        return task
+
+    async def _restore(self):
+        """Pfade aus der Registry wieder überwachen und verpasste Änderungen nachholen"""
+        try:
+            paths = await self.registry.paths()
+        except Exception as e:
+            logger.error(f"Failed to load watch registry: {e}")
+            return
+
+        for path, last_scan in paths.items():
+            if not os.path.exists(path):
+                logger.warning(f"Registered watch path no longer exists: {path}")
+                continue
+            self._fingerprints.update(await self.registry.fingerprints(path))
+            self._last_scan[path] = last_scan
+            self._watch(path)
+            await self._initial_scan(path)
+
+        if paths:
+            logger.info(f"Restored {len(paths)} watch paths from registry")
+
     def add_watch_path(self, path: str):
-        """Pfad zum Überwachen hinzufügen"""
-        path_obj = Path(path)
-        if not path_obj.exists():
+        """Pfad zum Überwachen hinzufügen und vorhandene Dateien einlesen"""
+        path = os.path.abspath(path)
+        if not os.path.exists(path):
             logger.warning(f"Watch path does not exist: {path}")
             return
 
@@ -68,29 +188,231 @@ class FileWatcher:
             return
 
         if self.observer:
-            self.observer.schedule(self.event_handler, path, recursive=True)
-            self.watch_paths.add(path)
-            logger.info(f"Started watching path: {path}")
+            # Erst beobachten, dann scannen: Dateien, die währenddessen entstehen, gehen nicht
+            # verloren; doppelte Meldungen werden pro Pfad zusammengefasst
+            self._watch(path)
+            self._spawn(self._register(path))
+
+    def _watch(self, path: str):
+        self._watches[path] = self.observer.schedule(self.event_handler, path, recursive=True)
+        self.watch_paths.add(path)
+        logger.info(f"Started watching path: {path}")
+
+    async def _register(self, path: str):
+        if self.registry:
+            await self.registry.add_path(path)
+        await self._initial_scan(path)
 
     def remove_watch_path(self, path: str):
-        """Pfad aus Überwachung entfernen"""
+        """Pfad aus Überwachung entfernen (nur dessen Watch, die übrigen laufen weiter)"""
+        path = os.path.abspath(path)
         if path not in self.watch_paths:
             logger.warning(f"Path not being watched: {path}")
             return
 
-        # Observer unterstützt kein direktes Entfernen, daher neu starten
-        if self.observer:
-            self.observer.stop()
-            self.observer.join()
+        # Ausstehende Events und Fingerprints des Pfads verwerfen; Dateien unter einem separat
+        # überwachten, verschachtelten Pfad gehören zu diesem und bleiben erhalten
+        for file_path in [p for p in self._timers if self._root_of(p) == path]:
+            self._timers.pop(file_path).cancel()
+        for file_path in [p for p in self._fingerprints if self._root_of(p) == path]:
+            del self._fingerprints[file_path]
+            self._unsaved.pop(file_path, None)
+
+        watch = self._watches.pop(path, None)
+        if self.observer and watch:
+            self.observer.unschedule(watch)
+        self.watch_paths.remove(path)
+        self._last_scan.pop(path, None)
+        if self.registry:
+            self._spawn(self.registry.remove_path(path))
+
+        logger.info(f"Stopped watching path: {path}")
+
+    def _root_of(self, path: str) -> Optional[str]:
+        """Überwachter Pfad, zu dem eine Datei gehört (längster Präfix)"""
+        roots = [
+            root for root in self.watch_paths
+            if path == root or path.startswith(os.path.join(root, ""))
+        ]
+        return max(roots, key=len) if roots else None
+
+    def notify(self, path: str):
+        """Event aus dem Observer-Thread an den Event Loop übergeben"""
+        if self._loop is None or self._loop.is_closed():
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._debounce, path)
+        except RuntimeError:
+            # Loop wurde zwischenzeitlich beendet
+            pass
+
+    def _ignored(self, path: str) -> bool:
+        name = os.path.basename(path)
+        return any(fnmatch.fnmatch(name, pattern) for pattern in self.ignore_patterns)
+
+    def _debounce(self, path: str):
+        """Verarbeitung bis zum Ende des Ruhefensters verschieben (pro Pfad)"""
+        self.metrics["events"] += 1
+        if self._ignored(path):
+            self.metrics["ignored"] += 1
+            return
+
+        timer = self._timers.pop(path, None)
+        if timer:
+            timer.cancel()
+        self._timers[path] = self._loop.call_later(self.debounce, self._submit, path)
+
+    def _submit(self, path: str):
+        """Pfad zur Verarbeitung einreihen (höchstens einmal gleichzeitig pro Pfad)"""
+        self._timers.pop(path, None)
+        if path in self._running:
+            self._dirty.add(path)
+        elif path not in self._queued:
+            self._queued.add(path)
+            self._work.put_nowait(path)
+
+    async def _initial_scan(self, root: str):
+        """Vorhandene Dateien des Verzeichnisbaums einreihen (ohne Entprellung)"""
+        try:
+            paths = await asyncio.to_thread(self._walk, root)
+        except Exception as e:
+            logger.error(f"Initial scan failed: {root} - {e}")
+            return
+
+        for path in paths:
+            self._submit(path)
+        self.metrics["scanned"] += len(paths)
+
+        # Während der Downtime gelöschte Dateien aus den Fingerprints entfernen
+        found = set(paths)
+        prefix = os.path.join(root, "")
+        missing = [p for p in self._fingerprints if p.startswith(prefix) and p not in found]
+        for path in missing:
+            self._forget(path)
+
+        self._last_scan[root] = time.time()
+        if self.registry:
+            await self.registry.mark_scanned(root)
+        logger.info(f"Initial scan of {root}: {len(paths)} files, {len(missing)} removed")
+
+    def _walk(self, root: str) -> List[str]:
+        """Dateien rekursiv auflisten (os.scandir, ohne stat pro Datei)"""
+        if os.path.isfile(root):
+            return [] if self._ignored(root) else [root]
+
+        files: List[str] = []
+        directories = [root]
+        while directories:
+            directory = directories.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            directories.append(entry.path)
+                        elif entry.is_file() and not self._ignored(entry.path):
+                            files.append(entry.path)
+            except OSError as e:
+                logger.warning(f"Cannot scan directory {directory}: {e}")
+        return files
+
+    async def _consume(self):
+        while True:
+            path = await self._work.get()
+            self._queued.discard(path)
+            self._running.add(path)
+            try:
+                await self._process(path)
+            except Exception as e:
+                self.metrics["errors"] += 1
+                logger.error(f"Error handling file: {path} - {e}")
+            finally:
+                self._running.discard(path)
+
+            # Während der Verarbeitung erneut geändert: nach dem Ruhefenster nochmal prüfen
+            if path in self._dirty:
+                self._dirty.discard(path)
+                self._debounce(path)
+
+    async def _process(self, path: str):
+        """Datei einreihen, sofern sich ihr Fingerprint geändert hat"""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self._forget(path)
+            return
+
+        known = self._fingerprints.get(path)
+        if known and known[:2] == (stat.st_mtime_ns, stat.st_size):
+            self.metrics["unchanged"] += 1
+            return
+
+        # Gerade erst geschrieben (z.B. beim Initial-Scan eines laufenden Kopiervorgangs):
+        # erst nach dem Ruhefenster einlesen
+        if time.time() - stat.st_mtime < self.debounce:
+            self._dirty.add(path)
+            return
+
+        content_hash = await self.processor.handle_file(
+            path, known_hash=known[2] if known else None
+        )
+        if content_hash is None:
+            self.metrics["errors"] += 1
+            return
+
+        # Datei wurde während des Einlesens weiter geschrieben: später erneut prüfen
+        try:
+            after = os.stat(path)
+        except FileNotFoundError:
+            return
+        if (after.st_mtime_ns, after.st_size) != (stat.st_mtime_ns, stat.st_size):
+            self._dirty.add(path)
+            return
 
-            self.watch_paths.remove(path)
+        if known and known[2] == content_hash:
+            self.metrics["unchanged"] += 1
+        else:
+            self.metrics["enqueued"] += 1
 
-            # Neu starten mit verbleibenden Pfaden
-            self.observer = Observer()
-            for watch_path in self.watch_paths:
-                self.observer.schedule(self.event_handler, watch_path, recursive=True)
-            self.observer.start()
+        fingerprint = (stat.st_mtime_ns, stat.st_size, content_hash)
+        self._fingerprints[path] = fingerprint
+        root = self._root_of(path)
+        if root:
+            self._unsaved[path] = (root, fingerprint)
+            self._deleted.discard(path)
 
-            logger.info(f"Stopped watching path: {path}")
+    def _forget(self, path: str):
+        if self._fingerprints.pop(path, None) is not None:
+            self._unsaved.pop(path, None)
+            self._deleted.add(path)
 
+    async def _flush_registry(self):
+        """Geänderte Fingerprints periodisch gebündelt persistieren"""
+        while True:
+            await asyncio.sleep(self.registry_flush_interval)
+            unsaved, deleted = self._unsaved, self._deleted
+            self._unsaved, self._deleted = {}, set()
+            try:
+                await self.registry.write(unsaved, list(deleted))
+            except Exception as e:
+                logger.error(f"Failed to persist watch registry: {e}")
+                # Beim nächsten Lauf erneut versuchen (neuere Änderungen haben Vorrang)
+                self._unsaved = {**unsaved, **self._unsaved}
+                self._deleted |= deleted - set(self._unsaved)
 
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "watch_paths": {
+                path: {
+                    "last_scan_at": (
+                        datetime.fromtimestamp(self._last_scan[path], timezone.utc).isoformat()
+                        if self._last_scan.get(path) else None
+                    ),
+                }
+                for path in sorted(self.watch_paths)
+            },
+            "pending": len(self._timers),
+            "queued": len(self._queued),
+            "running": len(self._running),
+            "tracked_files": len(self._fingerprints),
+            **self.metrics,
+        }
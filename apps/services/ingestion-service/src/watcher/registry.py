@@ -0,0 +1,111 @@
+"""
+Watch Registry
+Persistiert überwachte Pfade und Datei-Fingerprints (SQLite), damit ein Neustart nur Änderungen nachholt
+"""
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Fingerprint = Tuple[int, int, str]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS watch_paths (
+    path TEXT PRIMARY KEY,
+    added_at REAL NOT NULL,
+    last_scan_at REAL
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    root TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_root ON files (root);
+"""
+
+
+class WatchRegistry:
+    """Überwachte Pfade und Fingerprints (mtime_ns, Größe, SHA-256) pro Datei"""
+
+    def __init__(self, path: str):
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    def _paths(self) -> Dict[str, Optional[float]]:
+        with self._lock:
+            rows = self._db.execute("SELECT path, last_scan_at FROM watch_paths").fetchall()
+        return dict(rows)
+
+    def _fingerprints(self, root: str) -> Dict[str, Fingerprint]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT path, mtime_ns, size, sha256 FROM files WHERE root = ?", (root,)
+            ).fetchall()
+        return {path: (mtime_ns, size, sha256) for path, mtime_ns, size, sha256 in rows}
+
+    def _add_path(self, path: str):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR IGNORE INTO watch_paths (path, added_at) VALUES (?, ?)",
+                (path, time.time()),
+            )
+
+    def _remove_path(self, path: str):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM watch_paths WHERE path = ?", (path,))
+            self._db.execute("DELETE FROM files WHERE root = ?", (path,))
+
+    def _mark_scanned(self, path: str):
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE watch_paths SET last_scan_at = ? WHERE path = ?", (time.time(), path)
+            )
+
+    def flush(self, updates: Dict[str, Tuple[str, Fingerprint]], removed: Iterable[str]):
+        """Fingerprints synchron schreiben (z.B. beim Shutdown, wenn der Loop nicht mehr läuft)"""
+        now = time.time()
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO files (path, root, mtime_ns, size, sha256, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(path, root, *fingerprint, now) for path, (root, fingerprint) in updates.items()],
+            )
+            self._db.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in removed])
+
+    async def paths(self) -> Dict[str, Optional[float]]:
+        """Überwachte Pfade -> Zeitpunkt des letzten vollständigen Scans"""
+        return await asyncio.to_thread(self._paths)
+
+    async def fingerprints(self, root: str) -> Dict[str, Fingerprint]:
+        return await asyncio.to_thread(self._fingerprints, root)
+
+    async def add_path(self, path: str):
+        await asyncio.to_thread(self._add_path, path)
+
+    async def remove_path(self, path: str):
+        await asyncio.to_thread(self._remove_path, path)
+
+    async def mark_scanned(self, path: str):
+        await asyncio.to_thread(self._mark_scanned, path)
+
+    async def write(self, updates: Dict[str, Tuple[str, Fingerprint]], removed: List[str]):
+        """Geänderte Fingerprints gebündelt schreiben (eine Transaktion)"""
+        if updates or removed:
+            await asyncio.to_thread(self.flush, updates, removed)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
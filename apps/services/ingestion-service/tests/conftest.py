@@ -0,0 +1,64 @@
+"""
+Test-Fixtures
+Queue-Backends gegen fakeredis (inkl. Lua über lupa) bzw. im Prozess, mit kurzen Timeouts
+"""
+import fakeredis
+import pytest
+import redis.asyncio as redis
+
+from src.config import get_settings
+from src.queue.queue_manager import create_queue_manager
+
+# Kurze Timeouts, damit Leases, Backoff und blockierendes Dequeue in Millisekunden ablaufen
+QUEUE_SETTINGS = {
+    "QUEUE_DEQUEUE_TIMEOUT": "0.05",
+    "QUEUE_VISIBILITY_TIMEOUT": "0.2",
+    "QUEUE_MAX_RETRIES": "2",
+    "QUEUE_RETRY_BACKOFF": "0.01",
+    "QUEUE_RETRY_BACKOFF_MAX": "0.01",
+    "QUEUE_BULK_EVERY": "0",
+    "STATUS_FLUSH_INTERVAL": "0",
+}
+
+BACKENDS = ("redis", "redis-streams", "memory")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    for name, value in QUEUE_SETTINGS.items():
+        monkeypatch.setenv(name, value)
+    get_settings.cache_clear()
+    yield get_settings()
+    get_settings.cache_clear()
+
+
+@pytest.fixture
+def redis_server(monkeypatch):
+    """Eigener fakeredis-Server pro Test; QueueManager.connect() verbindet sich mit ihm"""
+    server = fakeredis.FakeServer(version=(7,))
+
+    def from_url(url, **kwargs):
+        kwargs.pop("max_connections", None)
+        return fakeredis.FakeAsyncRedis(server=server, **kwargs).connection_pool
+
+    monkeypatch.setattr(redis.BlockingConnectionPool, "from_url", from_url)
+    return server
+
+
+async def open_queue(backend: str, settings):
+    settings.queue_backend = backend
+    queue = create_queue_manager(settings)
+    await queue.connect()
+    return queue
+
+
+@pytest.fixture(params=BACKENDS)
+async def queue(request, settings, redis_server):
+    queue = await open_queue(request.param, settings)
+    yield queue
+    await queue.close()
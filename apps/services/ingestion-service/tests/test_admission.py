@@ -0,0 +1,203 @@
+"""
+Admission Control: Gründe für 429, Retry-After, Durchsatz-Schätzung, Bulk-Uploads mit Archiven
+"""
+import io
+import zipfile
+from types import SimpleNamespace
+
+import pytest
+
+from src.processing.processor import DocumentProcessor
+from src.queue import admission as admission_module
+from src.queue.admission import (
+    DEFAULT_RETRY_AFTER,
+    MAX_RETRY_AFTER,
+    AdmissionController,
+    AdmissionRejectedError,
+)
+from tests.conftest import open_queue
+
+pytestmark = pytest.mark.anyio
+
+
+class StubQueue:
+    """Last wie get_load/get_space_depth der Queue-Backends"""
+
+    def __init__(self, queued=0, finished=0, space_depth=0, memory_used=0, memory_max=0):
+        self.queued = queued
+        self.finished = finished
+        self.space_depth = space_depth
+        self.memory_used = memory_used
+        self.memory_max = memory_max
+        self.samples = 0
+
+    async def get_load(self, memory: bool = True):
+        self.samples += 1
+        return {
+            "queued": self.queued,
+            "finished": {"2026-01-01T00:00:00+00:00": self.finished},
+            "memory_used": self.memory_used,
+            "memory_max": self.memory_max,
+        }
+
+    async def get_space_depth(self, knowledge_space_id):
+        return self.space_depth
+
+
+def make_settings(**overrides):
+    values = {
+        "admission_max_queued": 0,
+        "admission_max_wait": 0.0,
+        "admission_space_max_queued": 0,
+        "admission_redis_memory_ratio": 0.0,
+        "admission_gateway_latency_max": 0.0,
+        "admission_refresh_interval": 0.0,
+        **overrides,
+    }
+    return SimpleNamespace(**values)
+
+
+async def rejection(controller, knowledge_space_id="ks_a", count=1) -> AdmissionRejectedError:
+    with pytest.raises(AdmissionRejectedError) as info:
+        await controller.check(knowledge_space_id, count)
+    return info.value
+
+
+async def test_disabled_does_not_measure():
+    queue = StubQueue(queued=10**6, space_depth=10**6)
+    controller = AdmissionController(queue, make_settings())
+
+    assert not controller.enabled
+    await controller.check("ks_a", 100)
+    assert queue.samples == 0
+    assert controller.stats()["admitted"] == 0
+
+
+async def test_queue_full():
+    queue = StubQueue(queued=99)
+    controller = AdmissionController(queue, make_settings(admission_max_queued=100))
+
+    await controller.check("ks_a", 10)  # Bestand unter der Grenze: auch große Uploads
+    queue.queued = 100
+    error = await rejection(controller)
+    assert error.reason == "queue_full"
+    assert error.retry_after == DEFAULT_RETRY_AFTER  # noch keine Durchsatz-Schätzung
+    assert controller.stats()["rejected"] == {"queue_full": 1}
+
+
+def test_retry_after_from_drain_rate():
+    controller = AdmissionController(StubQueue(), make_settings(admission_max_queued=100))
+    assert controller._retry_after(10) == DEFAULT_RETRY_AFTER
+
+    controller.drain_rate = 2.0
+    assert controller._retry_after(9) == 5
+    assert controller._retry_after(0) == 1
+    controller.drain_rate = 0.01
+    assert controller._retry_after(10) == MAX_RETRY_AFTER
+
+
+async def test_admitted_jobs_count_until_next_sample():
+    queue = StubQueue(queued=0)
+    controller = AdmissionController(
+        queue, make_settings(admission_max_queued=100, admission_refresh_interval=60)
+    )
+
+    for _ in range(4):
+        await controller.check("ks_a", 25)
+    assert queue.samples == 1
+    assert (await rejection(controller)).reason == "queue_full"
+    assert controller.stats()["admitted"] == 100
+
+
+async def test_queue_wait_uses_drain_rate(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(admission_module.time, "monotonic", lambda: clock[0])
+    queue = StubQueue(queued=50, finished=0)
+    controller = AdmissionController(queue, make_settings(admission_max_wait=30))
+
+    await controller.check("ks_a")  # erste Messung: noch kein Durchsatz
+    assert controller.drain_rate is None
+
+    clock[0] = 10.0
+    queue.finished = 20  # 2 Jobs/s
+    await controller.check("ks_a")  # Wartezeit 50 / 2 = 25s
+    assert controller.drain_rate == 2.0
+    assert controller.stats()["queued"] == 51
+
+    clock[0] = 20.0
+    queue.queued = 80
+    queue.finished = 40
+    error = await rejection(controller, count=2)
+    assert error.reason == "queue_wait"
+    assert error.retry_after == 11  # (80 + 2 - 30 * 2) / 2
+
+
+async def test_space_quota():
+    queue = StubQueue(space_depth=10)
+    controller = AdmissionController(queue, make_settings(admission_space_max_queued=10))
+    controller.drain_rate = 1.0
+
+    error = await rejection(controller, count=3)
+    assert error.reason == "space_quota"
+    assert error.retry_after == 3
+
+    queue.space_depth = 9
+    await controller.check("ks_a")
+
+
+async def test_redis_memory_and_gateway_latency():
+    queue = StubQueue(memory_used=95, memory_max=100)
+    controller = AdmissionController(queue, make_settings(admission_redis_memory_ratio=0.9))
+    assert (await rejection(controller)).reason == "redis_memory"
+    queue.memory_max = 0  # ohne maxmemory keine Grenze
+    await controller.check("ks_a")
+
+    limiter = SimpleNamespace(latency=12.4, stats=lambda: {})
+    controller = AdmissionController(
+        StubQueue(), make_settings(admission_gateway_latency_max=2.0), limiter=limiter
+    )
+    error = await rejection(controller)
+    assert error.reason == "gateway_latency"
+    assert error.retry_after == 13
+
+
+async def test_measurement_failure_admits():
+    class BrokenQueue(StubQueue):
+        async def get_load(self, memory: bool = True):
+            raise ConnectionError("redis down")
+
+    controller = AdmissionController(BrokenQueue(), make_settings(admission_max_queued=1))
+    await controller.check("ks_a", 5)
+
+
+def zip_upload(filename: str, count: int):
+    data = io.BytesIO()
+    with zipfile.ZipFile(data, "w") as archive:
+        for i in range(count):
+            archive.writestr(f"docs/{i}.txt", f"Dokument {i}")
+    data.seek(0)
+    return SimpleNamespace(filename=filename, file=data)
+
+
+async def test_bulk_archive_is_admitted_per_group(settings, tmp_path):
+    settings.spool_dir = str(tmp_path / "spool")
+    settings.embedding_cache_backend = "memory"
+    settings.bulk_enqueue_batch_size = 4
+    queue = await open_queue("memory", settings)
+    processor = DocumentProcessor(queue)
+    controller = AdmissionController(
+        queue, make_settings(admission_max_queued=10, admission_refresh_interval=60)
+    )
+    try:
+        # Ein einziger Upload mit 20 Dokumenten: nach drei Gruppen (12 Jobs) ist die Queue voll
+        with pytest.raises(AdmissionRejectedError):
+            await processor.ingest_bulk([zip_upload("docs.zip", 20)], "ks_a", admission=controller)
+
+        assert (await queue.get_stats())["queue_length"] == 12
+        assert controller.stats()["admitted"] == 12
+        # Abgelehnte Einträge bleiben nicht im Spool (nur die Links der eingereihten Jobs)
+        links = [path for path in (tmp_path / "spool").rglob("*.*") if path.is_file()]
+        assert len(links) == 12
+    finally:
+        await processor.close()
+        await queue.close()
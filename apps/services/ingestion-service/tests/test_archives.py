@@ -0,0 +1,174 @@
+"""
+Archive: ZIP/TAR eintragsweise in den Spool, ignorierte Einträge, Grenzen, Bulk-Upload
+"""
+import io
+import tarfile
+import zipfile
+from types import SimpleNamespace
+
+import pytest
+
+from src.processing.processor import DocumentProcessor
+from src.storage.archives import ArchiveLimitError, extract_to_spool, is_archive, take
+from src.storage.blob_spool import BlobSpool
+from tests.conftest import open_queue
+
+MEMBERS = {
+    "docs/a.txt": b"Dokument A",
+    "docs/sub/b.txt": b"Dokument B",
+    "__MACOSX/docs/._a.txt": b"resource fork",
+    "docs/.DS_Store": b"finder",
+    ".hidden": b"versteckt",
+    "docs/Thumbs.db": b"thumbs",
+    "docs/notes.txt~": b"backup",
+}
+
+
+def make_zip(members=MEMBERS) -> io.BytesIO:
+    data = io.BytesIO()
+    with zipfile.ZipFile(data, "w") as archive:
+        archive.writestr("docs/", "")
+        for name, content in members.items():
+            archive.writestr(name, content)
+    data.seek(0)
+    return data
+
+
+def make_tar(members=MEMBERS, mode: str = "w:gz") -> io.BytesIO:
+    data = io.BytesIO()
+    with tarfile.open(fileobj=data, mode=mode) as archive:
+        for name, content in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+    data.seek(0)
+    return data
+
+
+def spool_files(directory) -> list:
+    """Links im Spool (<sha256>.<id>), ohne die geteilten Inhalte"""
+    return [path for path in directory.rglob("*.*") if path.is_file()]
+
+
+@pytest.fixture
+def spool(tmp_path):
+    return BlobSpool(str(tmp_path / "spool"), chunk_size=4)
+
+
+def test_is_archive():
+    assert is_archive("Export.ZIP")
+    assert is_archive("backup.tar.gz")
+    assert is_archive("daten.tgz")
+    assert not is_archive("bericht.pdf")
+    assert not is_archive(None)
+
+
+@pytest.mark.parametrize("name, data", [
+    ("docs.zip", make_zip),
+    ("docs.tar.gz", make_tar),
+    ("docs.tar", lambda: make_tar(mode="w")),
+])
+def test_extracts_regular_files_and_skips_metadata(spool, name, data):
+    entries = list(extract_to_spool(spool, data(), name))
+
+    assert [entry["name"] for entry in entries] == ["docs/a.txt", "docs/sub/b.txt"]
+    with open(entries[0]["blob"]["path"], "rb") as f:
+        assert f.read() == b"Dokument A"
+    assert entries[1]["blob"]["size"] == len(b"Dokument B")
+
+
+def test_member_names_are_normalized(spool):
+    entries = list(extract_to_spool(spool, make_zip({"/abs/./x.txt": b"x"}), "a.zip"))
+    assert [entry["name"] for entry in entries] == ["abs/x.txt"]
+
+
+def test_max_files_counts_only_regular_members(spool, tmp_path):
+    entries = extract_to_spool(spool, make_zip(), "docs.zip", max_files=2)
+    assert len(list(entries)) == 2
+
+    members = {f"f{i}.txt": b"x" for i in range(3)}
+    with pytest.raises(ArchiveLimitError):
+        list(extract_to_spool(spool, make_zip(members), "many.zip", max_files=2))
+
+
+def test_max_bytes_hands_back_last_blob(spool, tmp_path):
+    members = {"a.txt": b"a" * 6, "b.txt": b"b" * 6}
+    entries = extract_to_spool(spool, make_zip(members), "big.zip", max_bytes=10)
+
+    assert next(entries)["name"] == "a.txt"
+    with pytest.raises(ArchiveLimitError) as info:
+        next(entries)
+    assert [blob["size"] for blob in info.value.blobs] == [6]
+    assert len(spool_files(tmp_path / "spool")) == 2
+
+
+def test_oversized_member_is_rejected_individually(tmp_path):
+    spool = BlobSpool(str(tmp_path / "spool"), max_bytes=5)
+    members = {"small.txt": b"klein", "large.txt": b"zu gross"}
+    entries = list(extract_to_spool(spool, make_zip(members), "mixed.zip"))
+
+    assert entries[0]["name"] == "small.txt" and "blob" in entries[0]
+    assert entries[1]["name"] == "large.txt" and "error" in entries[1]
+
+
+def test_truncated_archive_keeps_extracted_entries(spool):
+    members = {f"f{i}.txt": bytes([65 + i]) * 5000 for i in range(4)}
+    data = make_tar(members, mode="w").getvalue()
+
+    entries = list(extract_to_spool(spool, io.BytesIO(data[:len(data) // 2]), "cut.tar"))
+
+    assert [entry["name"] for entry in entries] == ["f0.txt", "f1.txt", "cut.tar"]
+    assert entries[-1]["error"].startswith("Invalid archive")
+
+
+def test_take_reads_incrementally(spool):
+    entries = extract_to_spool(spool, make_zip(), "docs.zip")
+    assert [entry["name"] for entry in take(entries, 1)] == ["docs/a.txt"]
+    assert [entry["name"] for entry in take(entries, 5)] == ["docs/sub/b.txt"]
+    assert take(entries, 5) == []
+
+
+@pytest.fixture
+async def processor(settings, tmp_path):
+    settings.spool_dir = str(tmp_path / "spool")
+    settings.embedding_cache_backend = "memory"
+    settings.bulk_enqueue_batch_size = 2
+    settings.bulk_max_bytes = 0
+    queue = await open_queue("memory", settings)
+    processor = DocumentProcessor(queue)
+    yield processor
+    await processor.close()
+    await queue.close()
+
+
+def upload(filename: str, data: io.BytesIO):
+    return SimpleNamespace(filename=filename, file=data)
+
+
+@pytest.mark.anyio
+async def test_bulk_upload_reports_each_member(processor):
+    result = await processor.ingest_bulk(
+        [upload("docs.zip", make_zip()), upload("broken.zip", io.BytesIO(b"PK kaputt"))], "ks_a"
+    )
+
+    assert result["queued"] == 2
+    assert result["rejected"] == 1
+    assert [(d["filename"], d["status"]) for d in result["documents"]] == [
+        ("a.txt", "queued"), ("b.txt", "queued"), ("broken.zip", "rejected")
+    ]
+    batch = await processor.queue_manager.get_batch(result["batch_id"])
+    assert batch["total"] == 2
+    assert batch["rejected"] == 1
+
+
+@pytest.mark.anyio
+async def test_bulk_limit_frees_unqueued_blobs(processor, tmp_path):
+    processor.bulk_max_bytes = 25
+    members = {f"f{i}.txt": f"Inhalt {i}".encode() for i in range(5)}
+
+    with pytest.raises(ArchiveLimitError):
+        await processor.ingest_bulk([upload("big.zip", make_zip(members))], "ks_a")
+
+    # Die erste Gruppe (2 Dokumente) ist eingereiht, der Rest ist aus dem Spool entfernt
+    assert (await processor.queue_manager.get_stats())["queue_length"] == 2
+    assert len(spool_files(tmp_path / "spool")) == 2
@@ -0,0 +1,144 @@
+"""
+Chunking: Offsets und Grenzen der Strategien, stabile Chunk-IDs, Registrierung
+"""
+import re
+
+import pytest
+
+from src.processing.chunking import (
+    CHUNKERS,
+    Chunker,
+    ChunkIds,
+    FixedChunker,
+    SentenceChunker,
+    TokenChunker,
+    batched,
+    create_chunker,
+    register_chunker,
+)
+
+PARAGRAPHS = [
+    " ".join(f"Absatz {p} hat den Satz Nummer {s} mit etwas Text." for s in range(6))
+    for p in range(8)
+]
+TEXT = "\n\n".join(PARAGRAPHS)
+
+
+def covered(text: str, spans) -> str:
+    """Zeichen außerhalb aller Spans (ohne Leerraum)"""
+    mask = [False] * len(text)
+    for start, end in spans:
+        for i in range(start, end):
+            mask[i] = True
+    return "".join(c for c, hit in zip(text, mask) if not hit and not c.isspace())
+
+
+@pytest.mark.parametrize("strategy", ["fixed", "sentence", "token"])
+def test_spans_cover_text_in_order(strategy):
+    chunker = create_chunker(strategy, 120, 30)
+    spans = list(chunker.spans(TEXT))
+
+    assert covered(TEXT, spans) == ""
+    assert all(start < end for start, end in spans)
+    assert [start for start, _ in spans] == sorted(start for start, _ in spans)
+
+    chunks = list(chunker.chunk(TEXT, "doc_1"))
+    assert [chunk.index for chunk in chunks] == list(range(len(spans)))
+    assert all(chunk.content == TEXT[chunk.start:chunk.end] for chunk in chunks)
+    assert all(chunk.metadata["strategy"] == strategy for chunk in chunks)
+
+
+def test_fixed_window_and_overlap():
+    spans = list(FixedChunker(100, 20).spans("x" * 250))
+    assert spans == [(0, 100), (80, 180), (160, 250)]
+    assert list(FixedChunker(10, 0).spans("")) == []
+
+
+def test_overlap_is_clamped_below_chunk_size():
+    chunker = FixedChunker(10, 50)
+    assert chunker.overlap == 9
+    spans = list(chunker.spans("x" * 12))
+    assert spans == [(0, 10), (1, 11), (2, 12)]
+
+
+def test_sentence_chunks_respect_size_and_sentence_boundaries():
+    chunker = SentenceChunker(120, 50)
+    starts = {0} | {match.end() for match in re.finditer(r"\s+", TEXT)}
+
+    for start, end in chunker.spans(TEXT):
+        assert end - start <= 120
+        assert start in starts
+        assert TEXT[end - 1] == "."
+
+
+def test_sentence_chunker_splits_overlong_sentence():
+    text = "a" * 250 + ". Kurz."
+    spans = list(SentenceChunker(100, 0).spans(text))
+    assert spans[:2] == [(0, 100), (100, 200)]
+    assert all(end - start <= 100 for start, end in spans)
+    assert covered(text, spans) == ""
+
+
+def test_sentence_chunk_ids_survive_edit_in_other_paragraph():
+    chunker = SentenceChunker(400, 0)
+    before = [chunk.id for chunk in chunker.chunk(TEXT, "doc_1")]
+
+    edited = PARAGRAPHS.copy()
+    edited[0] = edited[0].replace("Satz Nummer 2", "geänderte Satz Nummer 2")
+    after = [chunk.id for chunk in chunker.chunk("\n\n".join(edited), "doc_1")]
+
+    # Nur der Chunk des geänderten Absatzes bekommt eine neue ID
+    assert before[0] != after[0]
+    assert before[1:] == after[1:]
+
+
+def test_token_chunker_aligns_to_words():
+    chunker = TokenChunker(20, 5)
+    text = "wort " * 100 + "x" * (chunker.max_chars * 2 + 3) + " ende"
+    spans = list(chunker.spans(text))
+
+    for start, end in spans:
+        assert end - start <= chunker.max_chars
+        assert not text[start].isspace() and not text[end - 1].isspace()
+    assert covered(text, spans) == ""
+    # Überlanges Wort wird hart geteilt
+    long_start = text.index("x")
+    assert (long_start, long_start + chunker.max_chars) in spans
+
+
+def test_chunk_ids_are_content_based_and_numbered():
+    ids = ChunkIds("doc_1")
+    first = ids("gleich")
+    second = ids("gleich")
+    other = ids("anders")
+
+    assert first.startswith("doc_1_chunk_")
+    assert second == f"{first}_1"
+    assert other != first
+    assert ChunkIds("doc_1")("gleich") == first
+
+
+def test_create_and_register_chunker():
+    with pytest.raises(ValueError):
+        create_chunker("unknown", 100, 10)
+
+    @register_chunker
+    class LineChunker(Chunker):
+        name = "lines-test"
+
+        def spans(self, text):
+            start = 0
+            for line in text.split("\n"):
+                yield start, start + len(line)
+                start += len(line) + 1
+
+    try:
+        chunks = list(create_chunker("lines-test", 100, 0).chunk("a\nb", "doc_1"))
+        assert [chunk.content for chunk in chunks] == ["a", "b"]
+    finally:
+        del CHUNKERS["lines-test"]
+
+
+def test_batched():
+    assert list(batched(iter(range(5)), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(batched(iter([]), 2)) == []
@@ -0,0 +1,125 @@
+"""
+Job Codec: Round-Trip in Python und Header-Änderungen durch die Lua-Skripte
+"""
+import json
+
+import fakeredis
+import pytest
+
+from src.queue import scripts
+from src.queue.codec import JobCodec, JobCodecError
+
+CODECS = {
+    "json-v1": JobCodec(encoding="json-v1"),
+    "json": JobCodec(encoding="json", compression="none"),
+    "msgpack": JobCodec(encoding="msgpack", compression="none"),
+    "msgpack+zstd": JobCodec(encoding="msgpack", compression="zstd", compression_threshold=64),
+    "json+zlib": JobCodec(encoding="json", compression="zlib", compression_threshold=64),
+}
+
+JOB_HEADER = scripts.JOB_FORMAT + "return cjson.encode(job_header(ARGV[1]))"
+WITH_FIELDS = scripts.JOB_FORMAT + """
+return with_fields(ARGV[1], {attempts = tonumber(ARGV[2]), last_error = ARGV[3]})
+"""
+
+
+def make_job(**extra):
+    return {
+        "id": "job_1",
+        "priority": "bulk",
+        "attempts": 0,
+        "created_at": "2026-01-01T00:00:00+00:00",
+        "data": {
+            "document_id": "doc_1",
+            "knowledge_space_id": "ks_a",
+            "blob": {"path": "/spool/ab/ab12", "size": 3},
+            "text": "Grüße aus Köln " * 20,
+        },
+        **extra,
+    }
+
+
+@pytest.fixture
+def lua():
+    return fakeredis.FakeRedis(server=fakeredis.FakeServer(version=(7,)))
+
+
+@pytest.mark.parametrize("name", CODECS)
+def test_round_trip(name):
+    codec = CODECS[name]
+    job = make_job()
+
+    raw = codec.encode(job)
+    assert codec.decode(raw) == job
+    # Redis-Clients liefern Einträge als str (surrogateescape)
+    assert codec.decode(raw.decode("utf-8", "surrogateescape")) == job
+
+
+def test_large_payload_is_compressed():
+    codec = CODECS["msgpack+zstd"]
+    raw = codec.encode(make_job())
+    assert codec.header(raw)["codec"] == "msgpack+zstd"
+    assert len(raw) < len(CODECS["msgpack"].encode(make_job()))
+
+
+def test_msgpack_keeps_binary_data():
+    codec = CODECS["msgpack+zstd"]
+    job = make_job()
+    job["data"]["raw"] = b"\x00\x1e\x1f\xff" * 32
+    assert codec.decode(codec.encode(job).decode("utf-8", "surrogateescape")) == job
+
+
+def test_reads_all_formats_regardless_of_setting():
+    reader = JobCodec(encoding="json-v1")
+    for name, codec in CODECS.items():
+        job = make_job()
+        assert reader.decode(codec.encode(job)) == job, name
+
+
+def test_replace_fields_keeps_payload():
+    codec = CODECS["msgpack+zstd"]
+    raw = codec.encode(make_job())
+    updated = codec.replace_fields(raw, {"attempts": 2, "last_error": "boom\x1ebad"})
+
+    job = codec.decode(updated)
+    assert job["attempts"] == 2
+    assert job["last_error"] == "boom bad"
+    assert job["data"] == make_job()["data"]
+    assert updated.endswith(raw[raw.index(b"\x1e") + 1:])
+
+
+def test_rejects_unknown_format():
+    with pytest.raises(JobCodecError):
+        CODECS["json"].decode(b"\x07whatever")
+    with pytest.raises(JobCodecError):
+        CODECS["json"].decode(b"\x02attempts=0")
+
+
+@pytest.mark.parametrize("name", CODECS)
+def test_lua_job_header(lua, name):
+    raw = CODECS[name].encode(make_job(attempts=3))
+
+    header = json.loads(lua.eval(JOB_HEADER, 0, raw))
+    assert header["id"] == "job_1"
+    assert header["priority"] == "bulk"
+    assert header["knowledge_space_id"] == "ks_a"
+    assert int(header["attempts"]) == 3
+
+
+@pytest.mark.parametrize("name", CODECS)
+def test_lua_with_fields(lua, name):
+    codec = CODECS[name]
+    job = make_job()
+
+    raw = lua.eval(WITH_FIELDS, 0, codec.encode(job), 2, "timeout\x1fafter 30s")
+    decoded = codec.decode(raw)
+    assert decoded["attempts"] == 2
+    assert decoded["data"] == job["data"]
+    assert decoded["id"] == job["id"]
+    assert decoded["priority"] == job["priority"]
+    if name == "json-v1":
+        assert decoded["last_error"] == "timeout\x1fafter 30s"
+    else:
+        # Trennzeichen im Header werden ersetzt
+        assert decoded["last_error"] == "timeout after 30s"
+
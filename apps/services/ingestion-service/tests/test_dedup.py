@@ -0,0 +1,70 @@
+"""
+Deduplizierung beim Einreihen: nur dasselbe Dokument wird übersprungen
+"""
+import pytest
+
+from src.processing.processor import DocumentProcessor
+from tests.conftest import open_queue
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def processor(settings, tmp_path):
+    settings.spool_dir = str(tmp_path / "spool")
+    settings.embedding_cache_backend = "memory"
+    queue = await open_queue("memory", settings)
+    processor = DocumentProcessor(queue)
+    yield processor
+    await processor.close()
+    await queue.close()
+
+
+async def process(processor, document_id: str, content_hash: str):
+    """Erfolgreiche Verarbeitung im Content-Index vermerken"""
+    await processor.content_index.commit(document_id, content_hash, "ks_a", ["c1"], [])
+
+
+async def test_same_document_is_skipped(processor):
+    document_id = await processor.enqueue_document(
+        "a.txt", b"Inhalt", "ks_a", source="share/a.txt"
+    )
+    job = await processor.queue_manager.dequeue("worker-1")
+    await process(processor, document_id, job["data"]["content_hash"])
+
+    again = await processor.enqueue_document("a.txt", b"Inhalt", "ks_a", source="share/a.txt")
+    assert again == document_id
+    assert await processor.queue_manager.dequeue("worker-1") is None
+
+
+async def test_other_source_with_same_content_is_queued(processor):
+    first_id = await processor.enqueue_document("a.txt", b"Inhalt", "ks_a", source="share/a.txt")
+    job = await processor.queue_manager.dequeue("worker-1")
+    await process(processor, first_id, job["data"]["content_hash"])
+
+    second_id = await processor.enqueue_document(
+        "b.txt", b"Inhalt", "ks_a", source="share/b.txt"
+    )
+    explicit_id = await processor.enqueue_document(
+        "c.txt", b"Inhalt", "ks_a", document_id="doc_explicit"
+    )
+    assert second_id != first_id
+    assert explicit_id == "doc_explicit"
+    queued = [await processor.queue_manager.dequeue("worker-1") for _ in range(2)]
+    assert [job["data"]["document_id"] for job in queued] == [second_id, "doc_explicit"]
+
+
+async def test_enqueue_blobs_skips_only_same_document(processor):
+    first_id = await processor.enqueue_document("a.txt", b"Inhalt", "ks_a", source="x.zip/a.txt")
+    job = await processor.queue_manager.dequeue("worker-1")
+    await process(processor, first_id, job["data"]["content_hash"])
+
+    entries = [
+        ("a.txt", await processor.spool.write_bytes(b"Inhalt"), "x.zip/a.txt"),
+        ("b.txt", await processor.spool.write_bytes(b"Inhalt"), "x.zip/b.txt"),
+    ]
+    results = await processor.enqueue_blobs(entries, "ks_a")
+
+    assert [result["status"] for result in results] == ["skipped", "queued"]
+    assert results[0]["document_id"] == first_id
+    assert results[1]["document_id"] != first_id
@@ -0,0 +1,113 @@
+"""
+Batch Embedder: Batch-Planung, Zuordnung über index, Retries und Halbierung, Cache
+"""
+import pytest
+
+from src.processing.embedder import CHARS_PER_TOKEN, BatchEmbedder
+from src.processing.embedding_cache import EmbeddingCache
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeResponse:
+    def __init__(self, status: int, data=None):
+        self.status = status
+        self.data = data
+
+    async def json(self):
+        return self.data
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeGateway:
+    """Antwortet mit [len(text)] pro Input, in umgekehrter Reihenfolge (Zuordnung über index)"""
+
+    def __init__(self, fail=None):
+        # fail(inputs, call) -> Status-Code oder None
+        self.fail = fail or (lambda inputs, call: None)
+        self.requests = []
+
+    def post(self, path, json, headers):
+        inputs = json["input"]
+        self.requests.append(list(inputs))
+        status = self.fail(inputs, len(self.requests))
+        if status:
+            return FakeResponse(status)
+        items = [{"index": i, "embedding": [float(len(text))]} for i, text in enumerate(inputs)]
+        return FakeResponse(200, {"data": list(reversed(items))})
+
+
+def embedder(gateway, **options):
+    return BatchEmbedder(gateway, **{"retry_backoff": 0, **options})
+
+
+async def test_batches_keep_input_order():
+    gateway = FakeGateway()
+    texts = [f"text {i:03}" + "x" * i for i in range(10)]
+
+    vectors = await embedder(gateway, max_batch_items=3, concurrency=2).embed(texts)
+
+    assert vectors == [[float(len(text))] for text in texts]
+    assert [len(request) for request in gateway.requests] == [3, 3, 3, 1]
+
+
+def test_token_budget_splits_batches():
+    instance = embedder(FakeGateway(), max_batch_items=100, max_batch_tokens=10)
+    texts = ["a" * 4 * CHARS_PER_TOKEN] * 5 + ["b" * 20 * CHARS_PER_TOKEN]
+
+    # 4 Tokens je Text: zwei pro Batch; ein zu großer Text bildet einen eigenen Batch
+    assert instance._plan_batches(texts) == [[0, 1], [2, 3], [4], [5]]
+
+
+async def test_duplicate_texts_requested_once():
+    gateway = FakeGateway()
+    vectors = await embedder(gateway).embed(["a", "bb", "a", "bb"])
+
+    assert vectors == [[1.0], [2.0], [1.0], [2.0]]
+    assert gateway.requests == [["a", "bb"]]
+
+
+async def test_retryable_error_retries_same_batch():
+    gateway = FakeGateway(fail=lambda inputs, call: 503 if call == 1 else None)
+    vectors = await embedder(gateway, max_retries=2).embed(["a", "bb"])
+
+    assert vectors == [[1.0], [2.0]]
+    assert gateway.requests == [["a", "bb"], ["a", "bb"]]
+
+
+async def test_non_retryable_error_splits_batch():
+    # Ein einzelner Input ist ungültig: nur die Hälften ohne ihn werden erfolgreich
+    gateway = FakeGateway(fail=lambda inputs, call: 400 if "bad" in inputs else None)
+    texts = ["a", "bb", "bad", "cccc"]
+
+    vectors = await embedder(gateway).embed(texts)
+
+    assert vectors == [[1.0], [2.0], [], [4.0]]
+    assert gateway.requests[0] == texts
+    assert ["bad"] in gateway.requests
+    assert ["a", "bb"] in gateway.requests
+
+
+async def test_gives_up_after_retries():
+    gateway = FakeGateway(fail=lambda inputs, call: 500)
+    vectors = await embedder(gateway, max_retries=2).embed(["a", "bb"])
+
+    assert vectors == [[], []]
+    assert len(gateway.requests) == 3
+
+
+async def test_cache_skips_known_texts_and_stores_new():
+    cache = EmbeddingCache(1024 * 1024)
+    await cache.put_many("text-embedding-3-small", ["a"], [[9.0]])
+    gateway = FakeGateway()
+    instance = embedder(gateway, cache=cache)
+
+    assert await instance.embed(["a", "bb"]) == [[9.0], [2.0]]
+    assert gateway.requests == [["bb"]]
+    assert await instance.embed(["bb"]) == [[2.0]]
+    assert len(gateway.requests) == 1
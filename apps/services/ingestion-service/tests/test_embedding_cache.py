@@ -0,0 +1,45 @@
+"""
+Embedding-Cache: Standard-Backend außerhalb der Queue-Redis, Treffer aus der zweiten Stufe
+"""
+import pytest
+
+from src.processing.embedding_cache import (
+    DiskEmbeddingStore,
+    RedisEmbeddingStore,
+    create_embedding_cache,
+)
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_default_is_disk_for_every_queue_backend(settings, tmp_path):
+    settings.embedding_cache_dir = str(tmp_path)
+    for backend in ("redis", "redis-streams", "memory"):
+        settings.queue_backend = backend
+        cache = create_embedding_cache(settings)
+        assert isinstance(cache.store, DiskEmbeddingStore)
+        await cache.close()
+
+
+async def test_redis_cache_uses_own_url(settings):
+    settings.embedding_cache_backend = "redis"
+    assert create_embedding_cache(settings).store.redis_url == settings.redis_url
+
+    settings.embedding_cache_redis_url = "redis://cache:6379/1"
+    store = create_embedding_cache(settings).store
+    assert isinstance(store, RedisEmbeddingStore)
+    assert store.redis_url == "redis://cache:6379/1"
+
+
+async def test_disk_hits_survive_new_process(settings, tmp_path):
+    settings.embedding_cache_dir = str(tmp_path)
+    cache = create_embedding_cache(settings)
+    await cache.put_many("model", ["eins", "zwei"], [[0.5, 1.0], []])
+    await cache.close()
+
+    # Neue Instanz: leerer LRU, Treffer kommen von Disk
+    cache = create_embedding_cache(settings)
+    assert await cache.get_many("model", ["eins", "zwei"]) == [[0.5, 1.0], None]
+    assert cache.stats()["store_hits"] == 1
+    assert cache.stats()["misses"] == 1
+    await cache.close()
@@ -0,0 +1,156 @@
+"""
+Text-Extraktion: Formaterkennung, Extractor pro Format, Zeitlimit im Prozess-Pool
+"""
+import time
+import zipfile
+
+import pytest
+
+from src.processing.extraction import (
+    MIME_DOCX,
+    MIME_HTML,
+    MIME_PDF,
+    MIME_TEXT,
+    ExtractionError,
+    ExtractionPool,
+    ExtractionTimeoutError,
+    _run_extractor,
+    detect_mime_type,
+    extract_docx,
+    extract_html,
+)
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Override PartName="/word/document.xml" ContentType="application/'
+    'vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    "</Types>"
+)
+
+DOCUMENT = (
+    '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+    "<w:body>"
+    "<w:p><w:r><w:t>Erster</w:t><w:tab/><w:t>Absatz</w:t></w:r></w:p>"
+    "<w:p><w:r><w:t>Zweiter Absatz</w:t></w:r></w:p>"
+    "</w:body></w:document>"
+)
+
+
+def write_docx(path, padding: int = 0, content_types: str = CONTENT_TYPES):
+    """DOCX schreiben; padding Bytes in docProps/ vor [Content_Types].xml und word/"""
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED) as archive:
+        if padding:
+            archive.writestr("docProps/custom.xml", "<Properties>" + "x" * padding + "</Properties>")
+        archive.writestr("[Content_Types].xml", content_types)
+        archive.writestr("word/document.xml", DOCUMENT)
+    return str(path)
+
+
+def head_of(path) -> bytes:
+    with open(path, "rb") as f:
+        return f.read(4096)
+
+
+def slow_extract(path: str) -> str:
+    time.sleep(5)
+    return "never"
+
+
+def test_sniffs_magic_bytes_before_extension(tmp_path):
+    pdf = tmp_path / "report.txt"
+    pdf.write_bytes(b"%PDF-1.7\n...")
+    html = tmp_path / "page.txt"
+    html.write_bytes(b"\xef\xbb\xbf  <!DOCTYPE html><html><body>Hallo</body></html>")
+
+    assert detect_mime_type(head_of(pdf), "report.txt", str(pdf)) == MIME_PDF
+    assert detect_mime_type(head_of(html), "page.txt", str(html)) == MIME_HTML
+    assert detect_mime_type(b"plain", "notes.html") == MIME_HTML
+    assert detect_mime_type(b"plain", "notes.unknown") == MIME_TEXT
+    assert detect_mime_type(b"plain") == MIME_TEXT
+
+
+def test_sniffs_docx_with_late_word_part(tmp_path):
+    path = write_docx(tmp_path / "upload.bin", padding=8192)
+    head = head_of(path)
+    assert b"word/" not in head
+
+    assert detect_mime_type(head, "upload.bin", path) == MIME_DOCX
+
+
+def test_plain_zip_is_not_docx(tmp_path):
+    path = tmp_path / "archive.bin"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("word/readme.txt", "kein Word-Dokument")
+
+    assert detect_mime_type(head_of(path), "archive.bin", str(path)) == MIME_TEXT
+
+
+def test_extract_docx_paragraphs(tmp_path):
+    path = write_docx(tmp_path / "doc.docx")
+    assert extract_docx(path) == "Erster\tAbsatz\nZweiter Absatz"
+
+
+def test_extract_docx_rejects_broken_file(tmp_path):
+    path = tmp_path / "broken.docx"
+    path.write_bytes(b"PK\x03\x04 not really a zip")
+    with pytest.raises(ExtractionError):
+        extract_docx(str(path))
+
+
+def test_extract_html_skips_scripts(tmp_path):
+    path = tmp_path / "page.html"
+    path.write_text(
+        "<html><head><title>T</title><style>p{}</style></head>"
+        "<body><p>Eins &amp; zwei</p><script>alert(1)</script><div>drei</div></body></html>"
+    )
+    assert extract_html(str(path)) == "Eins & zwei\n\ndrei"
+
+
+def test_run_extractor_times_out(tmp_path):
+    start = time.monotonic()
+    with pytest.raises(ExtractionTimeoutError):
+        _run_extractor(slow_extract, str(tmp_path), 0.1)
+    assert time.monotonic() - start < 2
+
+
+@pytest.mark.anyio
+async def test_pool_extracts_and_times_out(tmp_path):
+    path = write_docx(tmp_path / "upload.bin", padding=8192)
+    pool = ExtractionPool(processes=1, timeout=0.5)
+    try:
+        blob = {"path": path, "size": 1}
+        assert await pool.extract(blob, "upload.bin") == (
+            MIME_DOCX, "Erster\tAbsatz\nZweiter Absatz"
+        )
+
+        with pytest.raises(ExtractionTimeoutError):
+            await pool._run_in_pool(slow_extract, path, "upload.bin")
+
+        assert await pool.extract({"path": path, "size": 0}) == (MIME_TEXT, "")
+        assert pool.stats()["extracted"] == {MIME_DOCX: 1}
+    finally:
+        pool.close()
+
+
+@pytest.mark.anyio
+async def test_reset_discards_pool(tmp_path):
+    path = write_docx(tmp_path / "doc.docx")
+    pool = ExtractionPool(processes=1, timeout=5)
+    try:
+        await pool.extract({"path": path, "size": 1}, "doc.docx")
+        executor = pool._executor
+        processes = list(executor._processes.values())
+
+        pool._reset(executor)
+        pool._reset(executor)  # nur einmal pro Pool
+        for process in processes:
+            process.join(5)
+            assert not process.is_alive()
+        assert pool.stats()["restarts"] == 1
+        assert not pool.stats()["running"]
+
+        # Der nächste Job startet einen neuen Pool
+        assert (await pool.extract({"path": path, "size": 1}, "doc.docx"))[0] == MIME_DOCX
+    finally:
+        pool.close()
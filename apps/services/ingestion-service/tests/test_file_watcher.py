@@ -0,0 +1,171 @@
+"""
+File Watcher: Entprellung pro Pfad, ignorierte Dateien, Fingerprints, Nachlauf, Initial-Scan
+"""
+import asyncio
+import hashlib
+import os
+import time
+
+import pytest
+
+from src.watcher.file_watcher import FileWatcher
+
+pytestmark = pytest.mark.anyio
+
+DEBOUNCE = 0.05
+
+
+class StubProcessor:
+    """handle_file wie DocumentProcessor: Hash zurückgeben, bei known_hash nichts einreihen"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = []
+        self.enqueued = []
+
+    async def handle_file(self, path, known_hash=None):
+        self.calls.append(path)
+        await asyncio.sleep(self.delay)
+        with open(path, "rb") as f:
+            content_hash = hashlib.sha256(f.read()).hexdigest()
+        if content_hash != known_hash:
+            self.enqueued.append(path)
+        return content_hash
+
+
+def write(path, content: str, age: float = 10.0):
+    """Datei schreiben; mtime liegt age Sekunden zurück (außerhalb des Ruhefensters)"""
+    path.write_text(content)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    return str(path)
+
+
+async def settle(watcher, timeout: float = 2.0):
+    """Warten, bis keine Timer, eingereihten oder laufenden Pfade mehr offen sind"""
+    deadline = asyncio.get_running_loop().time() + timeout
+    await asyncio.sleep(DEBOUNCE * 2)
+    while watcher._timers or watcher._queued or watcher._running:
+        assert asyncio.get_running_loop().time() < deadline, "watcher did not settle"
+        await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+async def make_watcher(settings):
+    settings.watch_registry_path = ""
+    watchers = []
+
+    def make(processor, **options):
+        watcher = FileWatcher(processor, debounce=DEBOUNCE, concurrency=2, **options)
+        watcher.start()
+        watchers.append(watcher)
+        return watcher
+
+    yield make
+    for watcher in watchers:
+        watcher.stop()
+
+
+async def test_burst_of_events_yields_one_job(make_watcher, tmp_path):
+    processor = StubProcessor()
+    watcher = make_watcher(processor)
+    path = write(tmp_path / "a.txt", "eins")
+
+    for _ in range(20):
+        watcher._debounce(path)
+        await asyncio.sleep(DEBOUNCE / 10)
+    assert processor.calls == []
+    await settle(watcher)
+
+    assert processor.calls == [path]
+    assert watcher.stats()["events"] == 20
+    assert watcher.stats()["enqueued"] == 1
+
+
+async def test_ignored_files_are_not_processed(make_watcher, tmp_path):
+    processor = StubProcessor()
+    watcher = make_watcher(processor)
+    for name in (".hidden", "upload.part", "notes.txt~"):
+        watcher._debounce(write(tmp_path / name, "x"))
+    await settle(watcher)
+
+    assert processor.calls == []
+    assert watcher.stats()["ignored"] == 3
+
+
+async def test_fingerprint_skips_unchanged_files(make_watcher, tmp_path):
+    processor = StubProcessor()
+    watcher = make_watcher(processor)
+    path = write(tmp_path / "a.txt", "eins")
+
+    watcher._debounce(path)
+    await settle(watcher)
+    # mtime und Größe unverändert: kein erneutes Einlesen
+    watcher._debounce(path)
+    await settle(watcher)
+    assert processor.calls == [path]
+    assert watcher.stats()["unchanged"] == 1
+
+    # Nur mtime geändert: eingelesen, aber derselbe Hash wird nicht erneut eingereiht
+    write(tmp_path / "a.txt", "eins", age=5)
+    watcher._debounce(path)
+    await settle(watcher)
+    assert processor.calls == [path, path]
+    assert processor.enqueued == [path]
+
+    write(tmp_path / "a.txt", "zwei", age=4)
+    watcher._debounce(path)
+    await settle(watcher)
+    assert processor.enqueued == [path, path]
+
+
+async def test_event_during_processing_runs_again(make_watcher, tmp_path):
+    processor = StubProcessor(delay=0.1)
+    watcher = make_watcher(processor)
+    path = write(tmp_path / "a.txt", "eins")
+
+    watcher._debounce(path)
+    await asyncio.sleep(DEBOUNCE + 0.03)
+    assert watcher.stats()["running"] == 1
+
+    # Datei ändert sich, während sie eingelesen wird
+    write(tmp_path / "a.txt", "zwei", age=5)
+    watcher._debounce(path)
+    await settle(watcher)
+
+    assert processor.calls == [path, path]
+    assert processor.enqueued == [path, path]
+
+
+async def test_fresh_file_waits_for_quiet_period(make_watcher, tmp_path):
+    processor = StubProcessor()
+    watcher = make_watcher(processor)
+    path = write(tmp_path / "a.txt", "eins", age=0)
+
+    watcher._submit(path)  # wie beim Initial-Scan, ohne Entprellung
+    await settle(watcher)
+
+    assert processor.calls == [path]
+
+
+async def test_add_watch_path_scans_existing_files(make_watcher, tmp_path):
+    processor = StubProcessor()
+    watcher = make_watcher(processor)
+    (tmp_path / "sub").mkdir()
+    paths = {
+        write(tmp_path / "a.txt", "a"),
+        write(tmp_path / "sub" / "b.txt", "b"),
+    }
+    write(tmp_path / "sub" / "c.tmp", "ignoriert")
+
+    watcher.add_watch_path(str(tmp_path))
+    await settle(watcher)
+
+    assert set(processor.calls) == paths
+    stats = watcher.stats()
+    assert stats["scanned"] == 2
+    assert stats["tracked_files"] == 2
+    assert stats["watch_paths"][str(tmp_path)]["last_scan_at"].endswith("+00:00")
+
+    watcher.remove_watch_path(str(tmp_path))
+    assert watcher.stats()["tracked_files"] == 0
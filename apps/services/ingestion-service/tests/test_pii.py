@@ -0,0 +1,101 @@
+"""
+PII-Redaction: Detektoren, Fundstellen im Originaltext, Chunks mit Overlap
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from src.processing.pii import (
+    ANCHOR_DISTANCE,
+    PiiRedactor,
+    create_pii_redactor,
+    summarize_findings,
+)
+
+TEXT = (
+    "max@example.com schrieb: Bitte an DE89 3704 0044 0532 0130 00 überweisen, "
+    "Tel. 030 1234567, Steuer-ID 12 345 678 901, Adresse Musterstraße 12, 10115 Berlin."
+)
+
+
+def test_redacts_all_detectors_in_one_pass():
+    redacted, findings = PiiRedactor().redact(TEXT)
+
+    assert redacted == (
+        "[EMAIL_REDACTED] schrieb: Bitte an [IBAN_REDACTED] überweisen, Tel. [PHONE_REDACTED], "
+        "Steuer-ID [TAX_ID_REDACTED], Adresse [ADDRESS_REDACTED]."
+    )
+    assert [finding.type for finding in findings] == ["email", "iban", "phone", "tax_id", "address"]
+    assert TEXT[findings[1].start:findings[1].end] == "DE89 3704 0044 0532 0130 00"
+    assert TEXT[findings[4].start:findings[4].end] == "Musterstraße 12, 10115 Berlin"
+    assert summarize_findings(findings) == {
+        "email": 1, "iban": 1, "phone": 1, "tax_id": 1, "address": 1
+    }
+
+
+def test_leaves_ordinary_numbers_alone():
+    text = "Version 2.0 kostet 12 Euro am 3.4., Raum B-12 im 2. Stock."
+    assert PiiRedactor().redact(text) == (text, [])
+
+
+def test_matches_only_at_word_start():
+    redacted, findings = PiiRedactor(["phone"]).redact("Artikel X030 1234567 und 030 1234567")
+    assert redacted == "Artikel X030 1234567 und [PHONE_REDACTED]"
+    assert len(findings) == 1
+
+
+def test_far_apart_anchors_use_separate_regions():
+    padding = "Text ohne Anker. " * (ANCHOR_DISTANCE // 4)
+    text = f"a@b.de {padding} Tel. 030 1234567 {padding} c@d.de"
+    redactor = PiiRedactor()
+
+    assert len(list(redactor._regions(text))) == 3
+    assert [f.type for f in redactor.find(text)] == ["email", "phone", "email"]
+
+
+def test_custom_patterns_disable_prefilter():
+    redactor = PiiRedactor(["email", "kundennummer"], {"kundennummer": r"KD-[A-Z]{6}"})
+    assert not redactor.prefilter
+    redacted, _ = redactor.redact("Kunde KD-ABCDEF, Mail x@y.de")
+    assert redacted == "Kunde [KUNDENNUMMER_REDACTED], Mail [EMAIL_REDACTED]"
+
+
+def test_unknown_and_empty_detectors():
+    with pytest.raises(ValueError):
+        PiiRedactor(["email", "passport"])
+
+    redactor = create_pii_redactor(SimpleNamespace(pii_detectors=" , "))
+    assert redactor.redact(TEXT) == (TEXT, [])
+    assert redactor.redact_spans(TEXT, [(0, 10)]) == ([None], [])
+
+
+def test_redact_spans_counts_overlap_once():
+    redactor = PiiRedactor()
+    # Zwei Chunks, deren Overlap die IBAN enthält
+    spans = [(0, 70), (30, len(TEXT))]
+
+    results, findings = redactor.redact_spans(TEXT, spans)
+
+    # Jede Fundstelle genau einmal, mit Offsets im Originaltext
+    expected = redactor.redact(TEXT)[1]
+    assert [f.to_dict() for f in findings] == [f.to_dict() for f in expected]
+    assert results[0] == "[EMAIL_REDACTED] schrieb: Bitte an [IBAN_REDACTED] überweis"
+    assert results[1].startswith(" an [IBAN_REDACTED] überweisen, Tel. [PHONE_REDACTED]")
+
+
+def test_redact_spans_cuts_findings_at_span_edges():
+    redactor = PiiRedactor(["iban"])
+    iban = TEXT.index("DE89")
+    # Chunk endet mitten in der IBAN, der nächste beginnt darin
+    spans = [(iban - 5, iban + 10), (iban + 10, iban + 40)]
+
+    results, findings = redactor.redact_spans(TEXT, spans)
+
+    assert len(findings) == 1
+    assert results == ["e an [IBAN_REDACTED]", "[IBAN_REDACTED] überweisen, "]
+
+
+def test_redact_spans_without_findings():
+    results, findings = PiiRedactor().redact_spans("kein Treffer hier", [(0, 4), (2, 17)])
+    assert results == [None, None]
+    assert findings == []
@@ -0,0 +1,110 @@
+"""
+Stage Pipeline: Reihenfolge, Verwerfen, Backpressure, Fehler und Abbruch
+"""
+import asyncio
+
+import pytest
+
+from src.processing.pipeline import StagePipeline
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_items_pass_stages_in_order():
+    stored = []
+
+    async def double(item):
+        await asyncio.sleep(0)
+        return item * 2
+
+    async def drop_odd(item):
+        return item if item % 4 == 0 else None
+
+    async def store(item):
+        stored.append(item)
+
+    pipeline = (
+        StagePipeline(queue_size=1)
+        .add_stage("double", double)
+        .add_stage("filter", drop_odd)
+        .add_stage("store", store)
+    )
+    await pipeline.run(range(10))
+
+    assert stored == [0, 4, 8, 12, 16]
+    assert set(pipeline.stats()) == {"source", "double", "filter", "store"}
+
+
+async def test_stages_overlap_with_bounded_lead():
+    produced = []
+    events = []
+
+    def source():
+        for i in range(6):
+            produced.append(i)
+            yield i
+
+    async def slow(item):
+        # Die Quelle liegt höchstens Queue-Größe (+ je ein Element in Arbeit) voraus
+        events.append((item, len(produced)))
+        await asyncio.sleep(0.01)
+
+    await StagePipeline(queue_size=2).add_stage("slow", slow).run(source())
+
+    assert [item for item, _ in events] == list(range(6))
+    assert all(seen - item <= 4 for item, seen in events)
+    # Während die Stage arbeitet, liest die Quelle bereits voraus
+    assert max(seen - item for item, seen in events) >= 2
+
+
+async def test_stage_error_cancels_other_stages():
+    cancelled = asyncio.Event()
+
+    async def fail(item):
+        if item == 2:
+            raise ValueError("kaputt")
+        return item
+
+    async def wait_forever(item):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    pipeline = StagePipeline().add_stage("fail", fail).add_stage("wait", wait_forever)
+    with pytest.raises(ValueError, match="kaputt"):
+        await asyncio.wait_for(pipeline.run(range(5)), 2)
+    assert cancelled.is_set()
+
+
+async def test_source_error_propagates():
+    def source():
+        yield 1
+        raise OSError("Lesefehler")
+
+    async def passthrough(item):
+        return item
+
+    with pytest.raises(OSError, match="Lesefehler"):
+        await StagePipeline().add_stage("pass", passthrough).run(source())
+
+
+async def test_cancelling_run_cancels_stage_tasks():
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def block(item):
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    run = asyncio.create_task(StagePipeline().add_stage("block", block).run(range(3)))
+    await started.wait()
+    run.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await run
+    assert cancelled.is_set()
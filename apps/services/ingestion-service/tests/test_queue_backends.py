@@ -0,0 +1,294 @@
+"""
+Queue-Semantik aller Backends: Enqueue/Dequeue/Ack, Retries, Dead Letters, Leases, Recovery
+"""
+import asyncio
+
+import pytest
+
+from src.queue.queue_manager import PRIORITY_BULK, PRIORITY_INTERACTIVE
+from tests.conftest import open_queue
+
+pytestmark = pytest.mark.anyio
+
+
+def job_data(document_id: str, knowledge_space_id: str = "ks_a", **extra):
+    return {"document_id": document_id, "knowledge_space_id": knowledge_space_id, **extra}
+
+
+async def wait_for_retry(queue):
+    """Backoff abwarten und fällige Retries einreihen"""
+    await asyncio.sleep(0.05)
+    return await queue.reap()
+
+
+async def test_enqueue_dequeue_ack(queue):
+    job_ids = await queue.enqueue_many([job_data("doc_1"), job_data("doc_2")])
+
+    first = await queue.dequeue("worker-1")
+    assert first["id"] == job_ids[0]
+    assert first["data"] == job_data("doc_1")
+    assert first["attempts"] == 0
+    status = await queue.get_status(first["id"])
+    assert status["status"] == "processing"
+    assert status["started_at"].endswith("+00:00")
+    assert first["created_at"].endswith("+00:00")
+
+    await queue.ack(first)
+    await queue.update_status(first["id"], "completed", progress=1.0)
+
+    second = await queue.dequeue("worker-1")
+    assert second["id"] == job_ids[1]
+    await queue.ack(second)
+
+    assert await queue.dequeue("worker-1") is None
+    stats = await queue.get_stats()
+    assert stats["queue_length"] == 0
+    assert stats["in_flight"] == 0
+    assert (await queue.get_document_statuses(["doc_1"]))["doc_1"]["status"] == "completed"
+
+
+async def test_payload_round_trip(queue):
+    data = job_data("doc_1", blob={"path": "/spool/ab/ab12", "size": 3, "sha256": "ab12"})
+    data["text"] = "Grüße " * 1000  # über der Kompressionsschwelle
+    await queue.enqueue(data)
+
+    job = await queue.dequeue("worker-1")
+    assert job["data"] == data
+
+
+async def test_interactive_before_bulk(queue):
+    await queue.enqueue(job_data("doc_bulk"), PRIORITY_BULK)
+    await queue.enqueue(job_data("doc_interactive"), PRIORITY_INTERACTIVE)
+
+    first = await queue.dequeue("worker-1")
+    second = await queue.dequeue("worker-1")
+    assert first["data"]["document_id"] == "doc_interactive"
+    assert first["priority"] == PRIORITY_INTERACTIVE
+    assert second["data"]["document_id"] == "doc_bulk"
+
+
+async def test_nack_schedules_retry_with_backoff(queue):
+    job_id = await queue.enqueue(job_data("doc_1"))
+    job = await queue.dequeue("worker-1")
+    await queue.nack(job, "gateway timeout")
+
+    status = await queue.get_status(job_id)
+    assert status["status"] == "retrying"
+    assert status["attempts"] == 1
+    assert await queue.dequeue("worker-1") is None
+
+    assert (await wait_for_retry(queue))["promoted"] == 1
+    retried = await queue.dequeue("worker-1")
+    assert retried["id"] == job_id
+    assert retried["attempts"] == 1
+    assert retried["last_error"] == "gateway timeout"
+    assert retried["data"] == job_data("doc_1")
+
+
+async def test_dead_letter_after_max_retries_and_requeue(queue):
+    job_id = await queue.enqueue(job_data("doc_1"))
+
+    # QUEUE_MAX_RETRIES=2: erster Versuch plus zwei Retries
+    for _ in range(3):
+        await wait_for_retry(queue)
+        job = await queue.dequeue("worker-1")
+        assert job["id"] == job_id
+        await queue.nack(job, "broken")
+
+    await wait_for_retry(queue)
+    assert await queue.dequeue("worker-1") is None
+    assert (await queue.get_status(job_id))["status"] == "failed"
+    dead = await queue.list_dead_letters()
+    assert [job["id"] for job in dead] == [job_id]
+    assert dead[0]["attempts"] == 3
+    assert dead[0]["data"] == job_data("doc_1")
+    assert (await queue.get_stats())["dead_letters"] == 1
+
+    assert await queue.requeue_dead_letters(job_id) == [job_id]
+    assert await queue.list_dead_letters() == []
+    requeued = await queue.dequeue("worker-1")
+    assert requeued["id"] == job_id
+    assert requeued["attempts"] == 0
+
+
+async def test_nack_without_retry_goes_to_dead_letters(queue):
+    job_id = await queue.enqueue(job_data("doc_1"))
+    job = await queue.dequeue("worker-1")
+    await queue.nack(job, "unreadable", retry=False)
+
+    assert (await queue.get_status(job_id))["status"] == "failed"
+    assert [job["id"] for job in await queue.list_dead_letters()] == [job_id]
+    await wait_for_retry(queue)
+    assert await queue.dequeue("worker-1") is None
+
+
+async def test_reaper_requeues_expired_lease(queue):
+    job_id = await queue.enqueue(job_data("doc_1"))
+    assert (await queue.dequeue("worker-1"))["id"] == job_id
+
+    assert (await queue.reap())["requeued"] == 0
+    await asyncio.sleep(0.3)  # QUEUE_VISIBILITY_TIMEOUT=0.2
+    assert (await queue.reap())["requeued"] == 1
+    assert (await queue.get_status(job_id))["status"] == "queued"
+
+    job = await queue.dequeue("worker-2")
+    assert job["id"] == job_id
+    assert job["attempts"] == 1
+    assert job["last_error"] == "visibility timeout expired"
+    await queue.ack(job)
+    assert (await queue.get_stats())["in_flight"] == 0
+
+
+async def test_reaper_dead_letters_after_max_retries(queue):
+    job_id = await queue.enqueue(job_data("doc_1"))
+
+    for _ in range(3):
+        assert (await queue.dequeue("worker-1"))["id"] == job_id
+        await asyncio.sleep(0.3)
+        await queue.reap()
+
+    assert await queue.dequeue("worker-1") is None
+    assert (await queue.get_status(job_id))["status"] == "failed"
+    assert [job["id"] for job in await queue.list_dead_letters()] == [job_id]
+
+
+async def test_extend_lease_keeps_job(queue):
+    await queue.enqueue(job_data("doc_1"))
+    job = await queue.dequeue("worker-1")
+
+    for _ in range(3):
+        await asyncio.sleep(0.1)
+        await queue.extend_lease(job)
+        assert (await queue.reap())["requeued"] == 0
+
+    await queue.ack(job)
+    assert await queue.dequeue("worker-1") is None
+
+
+async def test_recover_worker(queue):
+    job_ids = await queue.enqueue_many([job_data("doc_1"), job_data("doc_2")])
+    job = await queue.dequeue("worker-1")
+    other = await queue.dequeue("worker-2")
+
+    assert await queue.recover_worker("worker-1") == 1
+    assert (await queue.get_status(job["id"]))["status"] == "queued"
+
+    recovered = await queue.dequeue("worker-3")
+    assert recovered["id"] == job_ids[0]
+    assert recovered["data"] == job_data("doc_1")
+    assert await queue.recover_worker("worker-1") == 0
+
+    await queue.ack(recovered)
+    await queue.ack(other)
+    assert (await queue.get_stats())["in_flight"] == 0
+
+
+async def test_batch_progress(queue):
+    await queue.create_batch("batch_1", knowledge_space_id="ks_a", priority=PRIORITY_BULK)
+    await queue.enqueue_many([job_data("doc_1"), job_data("doc_2")], batch_id="batch_1")
+    await queue.update_batch("batch_1", {"skipped": 1})
+
+    job = await queue.dequeue("worker-1")
+    await queue.ack(job)
+    await queue.update_status(job["id"], "completed", progress=1.0)
+
+    batch = await queue.get_batch("batch_1")
+    assert batch["total"] == 2
+    assert batch["skipped"] == 1
+    assert batch["statuses"]["completed"] == 1
+    assert batch["statuses"]["queued"] == 1
+    assert batch["progress"] == 0.5
+    assert not batch["done"]
+
+
+async def drain_order(backend: str, settings) -> list:
+    """Gemischte Klassen, Spaces, Gewichte und Retries; Reihenfolge der Auslieferung"""
+    queue = await open_queue(backend, settings)
+    try:
+        await queue.set_knowledge_space_limits("ks_b", weight=2.0)
+        await queue.enqueue_many([job_data(f"a{i}", "ks_a") for i in range(4)])
+        await queue.enqueue_many([job_data(f"b{i}", "ks_b") for i in range(4)])
+        await queue.enqueue_many([job_data(f"c{i}", "ks_c") for i in range(2)], PRIORITY_BULK)
+        await queue.enqueue(job_data("i0", "ks_c"), PRIORITY_INTERACTIVE)
+
+        order = []
+        while (job := await queue.dequeue("worker-1")) is not None:
+            name = job["data"]["document_id"]
+            order.append(name)
+            if name == "a1" and not job["attempts"]:
+                await queue.nack(job, "boom")
+                await wait_for_retry(queue)
+            else:
+                await queue.ack(job)
+        return order
+    finally:
+        await queue.close()
+
+
+async def test_memory_backend_matches_redis(settings, redis_server):
+    redis_order = await drain_order("redis", settings)
+    memory_order = await drain_order("memory", settings)
+
+    assert memory_order == redis_order
+    assert redis_order[0] == "i0"
+    assert sorted(redis_order) == sorted(
+        ["i0", "a0", "a1", "a1", "a2", "a3", "b0", "b1", "b2", "b3", "c0", "c1"]
+    )
+    # Fair Share: ks_b (Gewicht 2) kommt früh an die Reihe, nicht erst nach allen Jobs von ks_a
+    assert redis_order.index("b1") < redis_order.index("a2")
+
+
+@pytest.mark.parametrize("backend", ["redis", "memory"])
+async def test_knowledge_space_concurrency_at_dequeue(backend, settings, redis_server):
+    settings.knowledge_space_concurrency = 1
+    queue = await open_queue(backend, settings)
+    try:
+        await queue.enqueue_many([job_data(f"a{i}", "ks_a") for i in range(3)])
+        await queue.enqueue(job_data("b0", "ks_b"))
+
+        first = await queue.dequeue("worker-1")
+        second = await queue.dequeue("worker-2")
+        assert first["data"]["document_id"] == "a0"
+        # ks_a ist ausgelastet: der nächste Worker bekommt ks_b statt zu warten
+        assert second["data"]["document_id"] == "b0"
+        assert await queue.dequeue("worker-3") is None
+
+        spaces = {
+            entry["knowledge_space_id"]: entry for entry in await queue.get_knowledge_space_stats()
+        }
+        assert spaces["ks_a"]["running"] == 1
+        assert spaces["ks_a"]["depth"] == 2
+
+        await queue.ack(first)
+        third = await queue.dequeue("worker-3")
+        assert third["data"]["document_id"] == "a1"
+
+        # Nack und abgelaufene Leases geben den Platz ebenfalls frei
+        await queue.nack(third, "boom", retry=False)
+        fourth = await queue.dequeue("worker-3")
+        assert fourth["data"]["document_id"] == "a2"
+        await asyncio.sleep(0.3)
+        assert (await queue.reap())["requeued"] == 2
+        assert (await queue.dequeue("worker-4"))["data"]["document_id"] in ("a2", "b0")
+    finally:
+        await queue.close()
+
+
+@pytest.mark.parametrize("backend", ["redis", "memory"])
+async def test_released_slot_wakes_waiting_worker(backend, settings, redis_server):
+    settings.knowledge_space_concurrency = 1
+    settings.queue_dequeue_timeout = 5
+    queue = await open_queue(backend, settings)
+    try:
+        await queue.enqueue_many([job_data("a0", "ks_a"), job_data("a1", "ks_a")])
+        first = await queue.dequeue("worker-1")
+
+        waiting = asyncio.create_task(queue.dequeue("worker-2"))
+        await asyncio.sleep(0.1)
+        assert not waiting.done()
+
+        await queue.ack(first)
+        second = await asyncio.wait_for(waiting, 1)
+        assert second["data"]["document_id"] == "a1"
+    finally:
+        await queue.close()
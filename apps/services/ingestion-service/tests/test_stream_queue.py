@@ -0,0 +1,107 @@
+"""
+Streams-Backend: mehrere Streams in einer XREADGROUP-Antwort, nicht unterstützte Operationen
+"""
+import asyncio
+
+import pytest
+
+from src.queue.queue_manager import (
+    PRIORITY_BULK,
+    PRIORITY_CLASSES,
+    PRIORITY_INTERACTIVE,
+    UnsupportedOperationError,
+)
+from tests.conftest import open_queue
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def streams(settings, redis_server):
+    queue = await open_queue("redis-streams", settings)
+    yield queue
+    await queue.close()
+
+
+async def read_all_streams(queue, worker_id: str):
+    """Eine Antwort mit je einem Eintrag pro Stream, wie sie das blockierende Dequeue liefern kann"""
+    return await queue.redis_client.xreadgroup(
+        queue.GROUP,
+        worker_id,
+        {queue._stream_key(priority): ">" for priority in PRIORITY_CLASSES},
+        count=1,
+    )
+
+
+async def stream_lengths(queue):
+    return [await queue.redis_client.xlen(queue._stream_key(p)) for p in PRIORITY_CLASSES]
+
+
+async def test_select_keeps_extra_entries_in_place(streams):
+    bulk_id = await streams.enqueue({"document_id": "doc_bulk"}, PRIORITY_BULK)
+    interactive_id = await streams.enqueue({"document_id": "doc_interactive"}, PRIORITY_INTERACTIVE)
+    lengths = await stream_lengths(streams)
+
+    response = await read_all_streams(streams, "worker-1")
+    assert len(response) == 2
+    raw, position = streams._select("worker-1", response, list(PRIORITY_CLASSES))
+    assert streams.codec.header(raw)["id"] == interactive_id
+    assert position[0] == streams._stream_key(PRIORITY_INTERACTIVE)
+
+    # Der Bulk-Eintrag wird nicht erneut angehängt, sondern beim nächsten Dequeue übernommen
+    assert await stream_lengths(streams) == lengths
+    job = await streams.dequeue("worker-1")
+    assert job["id"] == bulk_id
+    assert job["data"] == {"document_id": "doc_bulk"}
+    await streams.ack(job)
+    assert await streams.dequeue("worker-1") is None
+
+
+async def test_buffered_entry_reclaimed_by_reaper_is_skipped(streams):
+    bulk_id = await streams.enqueue({"document_id": "doc_bulk"}, PRIORITY_BULK)
+    await streams.enqueue({"document_id": "doc_interactive"}, PRIORITY_INTERACTIVE)
+
+    response = await read_all_streams(streams, "worker-1")
+    streams._select("worker-1", response, list(PRIORITY_CLASSES))
+
+    await asyncio.sleep(0.3)  # QUEUE_VISIBILITY_TIMEOUT=0.2
+    assert (await streams.reap())["requeued"] == 2
+
+    # Der gepufferte Eintrag gehört nicht mehr worker-1; die Kopie des Reapers wird ausgeliefert
+    received = [await streams.dequeue("worker-1"), await streams.dequeue("worker-1")]
+    assert sorted(job["data"]["document_id"] for job in received) == ["doc_bulk", "doc_interactive"]
+    assert next(job for job in received if job["id"] == bulk_id)["attempts"] == 1
+    assert await streams.dequeue("worker-1") is None
+
+
+async def test_knowledge_space_limits_unsupported(streams):
+    with pytest.raises(UnsupportedOperationError):
+        await streams.set_knowledge_space_limits("ks_a", weight=2.0)
+    assert await streams.get_space_depth("ks_a") is None
+
+
+async def test_reap_follows_the_cursor(streams):
+    job_ids = await streams.enqueue_many([{"document_id": f"doc_{i}"} for i in range(3)])
+    for _ in job_ids:
+        await streams.dequeue("worker-1")
+
+    await asyncio.sleep(0.3)
+    assert (await streams.reap(limit=1))["requeued"] == 3
+    assert (await streams.get_stats())["in_flight"] == 0
+
+
+async def test_depth_with_unknown_lag(streams):
+    await streams.enqueue_many([{"document_id": f"doc_{i}"} for i in range(4)])
+    job = await streams.dequeue("worker-1")
+    # Nach XDEL meldet Redis den Lag der Consumer Group als unbekannt
+    stream = streams._stream_key(PRIORITY_BULK)
+    last_id = (await streams.redis_client.xrevrange(stream, count=1))[0][0]
+    await streams.redis_client.xdel(stream, last_id)
+    groups = await streams.redis_client.xinfo_groups(stream)
+    assert groups[0]["lag"] is None
+
+    stats = await streams.get_stats()
+    assert stats["queue_length"] == 2
+    assert stats["in_flight"] == 1
+    assert (await streams.get_load(memory=False))["queued"] == 2
+    await streams.ack(job)
@@ -0,0 +1,106 @@
+"""
+Vector Uploader: Batches nach Anzahl und Bytes, Kodierung, Retries, Halbierung bei 413
+"""
+import base64
+import gzip
+import json
+from array import array
+
+import pytest
+
+from src.processing.vector_uploader import VectorUploader, encode_float32
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeResponse:
+    def __init__(self, status: int):
+        self.status = status
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeRag:
+    """Nimmt Upserts an; status(ids, call) -> HTTP-Status"""
+
+    def __init__(self, status=None):
+        self.status = status or (lambda ids, call: 200)
+        self.requests = []
+
+    def post(self, path, data, headers):
+        if headers.get("Content-Encoding") == "gzip":
+            data = gzip.decompress(data)
+        body = json.loads(data)
+        ids = [vector["id"] for vector in body["vectors"]]
+        self.requests.append(body)
+        return FakeResponse(self.status(ids, len(self.requests)))
+
+
+def vectors(count: int, dims: int = 4):
+    return [
+        {"id": f"chunk_{i}", "embedding": [float(i)] * dims, "metadata": {"index": i}}
+        for i in range(count)
+    ]
+
+
+def uploader(rag, **options):
+    return VectorUploader(rag, **{"retry_backoff": 0, **options})
+
+
+async def test_batches_by_items_and_bytes():
+    rag = FakeRag()
+    stored = await uploader(rag, max_batch_items=4).upsert(vectors(10))
+
+    assert stored == [f"chunk_{i}" for i in range(10)]
+    assert [len(body["vectors"]) for body in rag.requests] == [4, 4, 2]
+
+    size = len(uploader(rag)._encode(vectors(1)[0]))
+    instance = uploader(rag, max_batch_bytes=size * 3)
+    assert [len(ids) for ids, _ in instance._plan_batches(vectors(7))] == [2, 2, 2, 1]
+
+
+async def test_float32_encoding():
+    rag = FakeRag()
+    await uploader(rag, encoding="float32", compression="none").upsert(vectors(1))
+
+    body = rag.requests[0]
+    assert body["embedding_encoding"] == "float32-base64"
+    values = array("f", base64.b64decode(body["vectors"][0]["embedding"]))
+    assert list(values) == [0.0] * 4
+    assert encode_float32([1.5]) == base64.b64encode(array("f", [1.5]).tobytes()).decode()
+
+
+async def test_retryable_error_retries_batch():
+    rag = FakeRag(status=lambda ids, call: 503 if call == 1 else 200)
+    assert len(await uploader(rag, max_retries=1).upsert(vectors(3))) == 3
+    assert len(rag.requests) == 2
+
+
+async def test_too_large_batch_is_halved():
+    # Der RAG-Service nimmt höchstens zwei Vektoren pro Request an
+    rag = FakeRag(status=lambda ids, call: 413 if len(ids) > 2 else 200)
+    stored = await uploader(rag).upsert(vectors(5))
+
+    assert sorted(stored) == [f"chunk_{i}" for i in range(5)]
+    # 5 -> 413, Hälften 2 (ok) und 3 -> 413, deren Hälften 1 und 2 (ok)
+    assert [len(body["vectors"]) for body in rag.requests] == [5, 2, 3, 1, 2]
+
+
+async def test_failed_batch_reports_only_stored_ids():
+    rag = FakeRag(status=lambda ids, call: 400 if "chunk_3" in ids else 200)
+    stored = await uploader(rag, max_batch_items=2).upsert(vectors(5))
+
+    # 400 wird weder wiederholt noch halbiert: der ganze Batch fehlt
+    assert stored == ["chunk_0", "chunk_1", "chunk_4"]
+    assert len(rag.requests) == 3
+
+
+def test_rejects_unknown_options():
+    with pytest.raises(ValueError):
+        VectorUploader(FakeRag(), encoding="bfloat16")
+    with pytest.raises(ValueError):
+        VectorUploader(FakeRag(), compression="brotli")
@@ -0,0 +1,85 @@
+"""
+Worker-Pool: Limit pro Knowledge Space ohne Head-of-Line-Blocking, Drain beim Stop
+"""
+import asyncio
+
+import pytest
+
+from src.processing.workers import WorkerPool
+from tests.conftest import open_queue
+
+pytestmark = pytest.mark.anyio
+
+
+class StubProcessor:
+    """Verarbeitet Jobs, bis ihr Knowledge Space freigegeben wird"""
+
+    def __init__(self, queue):
+        self.queue = queue
+        self.started = []
+        self.done = []
+        self.release = {"ks_a": asyncio.Event(), "ks_b": asyncio.Event()}
+
+    async def process_job(self, job):
+        data = job["data"]
+        self.started.append(data["document_id"])
+        await self.release[data["knowledge_space_id"]].wait()
+        await self.queue.ack(job)
+        self.done.append(data["document_id"])
+        return True
+
+
+async def wait_until(condition, timeout: float = 2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "condition not reached"
+        await asyncio.sleep(0.01)
+
+
+async def test_saturated_space_does_not_block_workers(settings):
+    settings.knowledge_space_concurrency = 1
+    queue = await open_queue("memory", settings)
+    processor = StubProcessor(queue)
+    pool = WorkerPool(queue, processor, workers=3, reaper_interval=60)
+    try:
+        await queue.enqueue_many(
+            [{"document_id": f"a{i}", "knowledge_space_id": "ks_a"} for i in range(5)]
+        )
+        await pool.start()
+        await wait_until(lambda: processor.started == ["a0"])
+
+        # Ein Job aus ks_b wird sofort bearbeitet, obwohl ks_a noch vier Jobs wartend hat
+        processor.release["ks_b"].set()
+        await queue.enqueue({"document_id": "b0", "knowledge_space_id": "ks_b"})
+        await wait_until(lambda: "b0" in processor.done)
+        assert processor.started == ["a0", "b0"]
+        assert pool.stats()["active"] == 1
+
+        processor.release["ks_a"].set()
+        await wait_until(lambda: len(processor.done) == 6)
+        assert processor.done[1:] == ["a0", "a1", "a2", "a3", "a4"]
+    finally:
+        await pool.stop(drain=False)
+        await queue.close()
+
+
+async def test_stop_drains_running_jobs(settings):
+    queue = await open_queue("memory", settings)
+    processor = StubProcessor(queue)
+    pool = WorkerPool(queue, processor, workers=2, drain_timeout=2, reaper_interval=60)
+    try:
+        await queue.enqueue({"document_id": "a0", "knowledge_space_id": "ks_a"})
+        await pool.start()
+        await wait_until(lambda: processor.started == ["a0"])
+
+        stopping = asyncio.create_task(pool.stop(drain=True))
+        await asyncio.sleep(0.1)
+        assert not stopping.done()
+        processor.release["ks_a"].set()
+        await stopping
+
+        assert processor.done == ["a0"]
+        assert pool.stats()["processed"] == 1
+        assert not pool.running
+    finally:
+        await queue.close()